@@ -0,0 +1,31 @@
+"""add token blacklist expiry
+
+Revision ID: 2d7a9e4b6c15
+Revises: 8c4f2a6e1d93
+Create Date: 2026-10-18 11:26:05.114873
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2d7a9e4b6c15'
+down_revision: Union[str, None] = '8c4f2a6e1d93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing rows keep a NULL expiry: they stay blacklisted and are never purged
+    op.add_column('token_blacklist', sa.Column('expires_at', sa.DateTime(), nullable=True))
+    op.create_index(op.f('ix_token_blacklist_expires_at'), 'token_blacklist', ['expires_at'], unique=False)
+    op.create_index(op.f('ix_token_blacklist_blacklisted_on'), 'token_blacklist', ['blacklisted_on'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_token_blacklist_blacklisted_on'), table_name='token_blacklist')
+    op.drop_index(op.f('ix_token_blacklist_expires_at'), table_name='token_blacklist')
+    op.drop_column('token_blacklist', 'expires_at')
@@ -0,0 +1,31 @@
+"""add post previews
+
+Revision ID: 3d5b7f9a1c26
+Revises: c7d3e9f1a482
+Create Date: 2026-10-18 17:12:05.418392
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3d5b7f9a1c26'
+down_revision: Union[str, None] = 'c7d3e9f1a482'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing rows are filled in by backfill_post_summaries.py
+    op.add_column('posts', sa.Column('excerpt', sa.String(length=300), nullable=True))
+    op.add_column('posts', sa.Column('word_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('posts', sa.Column('reading_time_minutes', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('posts', 'reading_time_minutes')
+    op.drop_column('posts', 'word_count')
+    op.drop_column('posts', 'excerpt')
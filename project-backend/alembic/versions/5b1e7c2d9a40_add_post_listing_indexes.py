@@ -0,0 +1,28 @@
+"""add post listing indexes
+
+Revision ID: 5b1e7c2d9a40
+Revises: 471398a9a2f9
+Create Date: 2026-10-18 09:12:44.381920
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b1e7c2d9a40'
+down_revision: Union[str, None] = '471398a9a2f9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_posts_published_at_id', 'posts', ['published_at', 'id'], unique=False)
+    op.create_index('ix_posts_author_id_published_at_id', 'posts', ['author_id', 'published_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_posts_author_id_published_at_id', table_name='posts')
+    op.drop_index('ix_posts_published_at_id', table_name='posts')
@@ -0,0 +1,44 @@
+"""index foreign keys
+
+Revision ID: 5f1c9e3a7d42
+Revises: 8e4a2c6f0b57
+Create Date: 2026-10-18 18:20:44.617530
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f1c9e3a7d42'
+down_revision: Union[str, None] = '8e4a2c6f0b57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Foreign key access paths left uncovered by the existing indexes. posts.author_id,
+# comments.post_id and notifications(user_id, timestamp) are already the leading
+# columns of the listing indexes.
+INDEXES = [
+    ('ix_post_tag_tag_id_post_id', 'post_tag', ['tag_id', 'post_id']),
+    ('ix_likes_post_id_user_id', 'likes', ['post_id', 'user_id']),
+    ('ix_comments_author_id', 'comments', ['author_id']),
+    ('ix_posts_category_id', 'posts', ['category_id']),
+    ('ix_refresh_tokens_user_id', 'refresh_tokens', ['user_id']),
+    ('ix_notifications_post_id', 'notifications', ['post_id']),
+]
+
+
+def upgrade() -> None:
+    # CONCURRENTLY builds without blocking writes, but cannot run inside a transaction.
+    # A build that fails leaves an invalid index behind: drop it before re-running.
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,34 @@
+"""add post like and comment counters
+
+Revision ID: 6e3b9d1c4f27
+Revises: 2d7a9e4b6c15
+Create Date: 2026-10-18 12:04:41.392518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6e3b9d1c4f27'
+down_revision: Union[str, None] = '2d7a9e4b6c15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('posts', sa.Column('like_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('posts', sa.Column('comment_count', sa.Integer(), server_default='0', nullable=False))
+    # Backfill existing posts; reconcile_counters.py does the same in batches on a live database
+    op.execute(
+        "UPDATE posts SET "
+        "like_count = (SELECT count(*) FROM likes WHERE likes.post_id = posts.id), "
+        "comment_count = (SELECT count(*) FROM comments WHERE comments.post_id = posts.id)"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('posts', 'comment_count')
+    op.drop_column('posts', 'like_count')
@@ -0,0 +1,39 @@
+"""thread comments
+
+Revision ID: 8e4a2c6f0b57
+Revises: 3d5b7f9a1c26
+Create Date: 2026-10-18 17:48:31.905217
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e4a2c6f0b57'
+down_revision: Union[str, None] = '3d5b7f9a1c26'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('comments', sa.Column('parent_id', sa.Integer(), nullable=True))
+    op.add_column('comments', sa.Column('path', sa.String(collation='C'), nullable=True))
+    op.create_foreign_key('comments_parent_id_fkey', 'comments', 'comments', ['parent_id'], ['id'], ondelete='CASCADE')
+    # Existing comments are all top-level: their path is their own zero-padded ID
+    op.execute("UPDATE comments SET path = lpad(id::text, 10, '0')")
+    op.alter_column('comments', 'path', nullable=False)
+    op.create_index(op.f('ix_comments_parent_id'), 'comments', ['parent_id'], unique=False)
+    op.create_index('ix_comments_post_id_path', 'comments', ['post_id', 'path'], unique=False)
+    op.create_index('ix_comments_post_id_top_level', 'comments', ['post_id', 'id'], unique=False, postgresql_where=sa.text('parent_id IS NULL'))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_comments_post_id_top_level', table_name='comments', postgresql_where=sa.text('parent_id IS NULL'))
+    op.drop_index('ix_comments_post_id_path', table_name='comments')
+    op.drop_index(op.f('ix_comments_parent_id'), table_name='comments')
+    op.drop_constraint('comments_parent_id_fkey', 'comments', type_='foreignkey')
+    op.drop_column('comments', 'path')
+    op.drop_column('comments', 'parent_id')
@@ -0,0 +1,35 @@
+"""backfill post published_at
+
+Revision ID: a1f4c8e2b736
+Revises: 5f1c9e3a7d42
+Create Date: 2026-10-18 19:42:37.204815
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a1f4c8e2b736'
+down_revision: Union[str, None] = '5f1c9e3a7d42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Posts created before published_at existed hold NULL, which sorts first in the
+    # (published_at DESC, id DESC) listings and cannot be encoded in a page cursor.
+    # They carry no date, so they are dated as the oldest post and keep their id order.
+    op.execute("""
+        UPDATE posts
+        SET published_at = coalesce((SELECT min(published_at) FROM posts), timezone('utc', now()))
+        WHERE published_at IS NULL
+    """)
+    op.alter_column('posts', 'published_at', existing_type=sa.DateTime(), nullable=False,
+                    server_default=sa.text("timezone('utc', now())"))
+
+
+def downgrade() -> None:
+    op.alter_column('posts', 'published_at', existing_type=sa.DateTime(), nullable=True, server_default=None)
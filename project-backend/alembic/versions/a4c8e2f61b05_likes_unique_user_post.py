@@ -0,0 +1,36 @@
+"""likes unique user and post
+
+Revision ID: a4c8e2f61b05
+Revises: 6e3b9d1c4f27
+Create Date: 2026-10-18 12:31:17.804215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4c8e2f61b05'
+down_revision: Union[str, None] = '6e3b9d1c4f27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Keep the oldest like of every duplicated (user_id, post_id) pair, then fix the counters
+    op.execute(
+        "DELETE FROM likes a USING likes b "
+        "WHERE a.user_id = b.user_id AND a.post_id = b.post_id AND a.id > b.id"
+    )
+    op.execute("UPDATE posts SET like_count = (SELECT count(*) FROM likes WHERE likes.post_id = posts.id)")
+    op.drop_constraint('likes_pkey', 'likes', type_='primary')
+    op.create_primary_key('likes_pkey', 'likes', ['id'])
+    op.create_unique_constraint('uq_likes_user_id_post_id', 'likes', ['user_id', 'post_id'])
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_likes_user_id_post_id', 'likes', type_='unique')
+    op.drop_constraint('likes_pkey', 'likes', type_='primary')
+    op.create_primary_key('likes_pkey', 'likes', ['id', 'user_id', 'post_id'])
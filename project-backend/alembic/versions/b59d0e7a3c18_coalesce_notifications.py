@@ -0,0 +1,37 @@
+"""coalesce notifications
+
+Revision ID: b59d0e7a3c18
+Revises: f3a7c5e9b214
+Create Date: 2026-10-18 14:22:09.731846
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b59d0e7a3c18'
+down_revision: Union[str, None] = 'f3a7c5e9b214'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing notifications keep their message and no kind, so they are never merged
+    op.add_column('notifications', sa.Column('kind', sa.String(length=20), nullable=True))
+    op.add_column('notifications', sa.Column('actor_count', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('notifications', sa.Column('recent_actor_ids', postgresql.ARRAY(sa.Integer()), server_default='{}', nullable=False))
+    op.alter_column('notifications', 'message', existing_type=sa.String(), nullable=True)
+    op.create_index('uq_notifications_unread_user_id_post_id_kind', 'notifications', ['user_id', 'post_id', 'kind'], unique=True, postgresql_where=sa.text('is_read = false'))
+
+
+def downgrade() -> None:
+    op.drop_index('uq_notifications_unread_user_id_post_id_kind', table_name='notifications')
+    op.execute("UPDATE notifications SET message = '' WHERE message IS NULL")
+    op.alter_column('notifications', 'message', existing_type=sa.String(), nullable=False)
+    op.drop_column('notifications', 'recent_actor_ids')
+    op.drop_column('notifications', 'actor_count')
+    op.drop_column('notifications', 'kind')
@@ -0,0 +1,37 @@
+"""add notification delivery seq
+
+Revision ID: c4e9a2d7f318
+Revises: a1f4c8e2b736
+Create Date: 2026-10-18 20:05:12.538104
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e9a2d7f318'
+down_revision: Union[str, None] = 'a1f4c8e2b736'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Streams used to resume on the notification ID, which merges reassigned.
+    # Existing rows get seq = id, so a Last-Event-ID sent before the upgrade
+    # still resumes at the right place; the sequence continues after them.
+    op.execute(sa.schema.CreateSequence(sa.Sequence('notifications_seq_seq')))
+    op.add_column('notifications', sa.Column('seq', sa.Integer(), nullable=True))
+    op.execute("UPDATE notifications SET seq = id")
+    op.execute("SELECT setval('notifications_seq_seq', (SELECT coalesce(max(id), 0) + 1 FROM notifications), false)")
+    op.alter_column('notifications', 'seq', existing_type=sa.Integer(), nullable=False,
+                    server_default=sa.text("nextval('notifications_seq_seq')"))
+    op.create_index('ix_notifications_user_id_seq', 'notifications', ['user_id', 'seq'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_notifications_user_id_seq', table_name='notifications')
+    op.drop_column('notifications', 'seq')
+    op.execute(sa.schema.DropSequence(sa.Sequence('notifications_seq_seq')))
@@ -0,0 +1,26 @@
+"""add posts slug pattern index
+
+Revision ID: c7d3e9f1a482
+Revises: e6f2b8d4a731
+Create Date: 2026-10-18 15:37:20.940513
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7d3e9f1a482'
+down_revision: Union[str, None] = 'e6f2b8d4a731'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_posts_slug_pattern', 'posts', ['slug'], unique=False, postgresql_ops={'slug': 'varchar_pattern_ops'})
+
+
+def downgrade() -> None:
+    op.drop_index('ix_posts_slug_pattern', table_name='posts')
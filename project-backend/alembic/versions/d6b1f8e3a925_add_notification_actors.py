@@ -0,0 +1,44 @@
+"""add notification actors
+
+Revision ID: d6b1f8e3a925
+Revises: c4e9a2d7f318
+Create Date: 2026-10-18 20:41:55.160273
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd6b1f8e3a925'
+down_revision: Union[str, None] = 'c4e9a2d7f318'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('notification_actors',
+    sa.Column('notification_id', sa.Integer(), nullable=False),
+    sa.Column('actor_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['notification_id'], ['notifications.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['actor_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('notification_id', 'actor_id')
+    )
+    op.create_index(op.f('ix_notification_actors_actor_id'), 'notification_actors', ['actor_id'], unique=False)
+    # Unread notifications only remember their three most recent actors: an older
+    # actor who acts again is counted once more, after which counts are exact
+    op.execute("""
+        INSERT INTO notification_actors (notification_id, actor_id)
+        SELECT DISTINCT notifications.id, users.id
+        FROM notifications
+        CROSS JOIN LATERAL unnest(notifications.recent_actor_ids) AS actor(id)
+        JOIN users ON users.id = actor.id
+        WHERE NOT notifications.is_read AND notifications.kind IS NOT NULL
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_notification_actors_actor_id'), table_name='notification_actors')
+    op.drop_table('notification_actors')
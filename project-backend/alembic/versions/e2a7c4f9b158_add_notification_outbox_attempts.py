@@ -0,0 +1,26 @@
+"""add notification outbox attempts
+
+Revision ID: e2a7c4f9b158
+Revises: d6b1f8e3a925
+Create Date: 2026-10-18 21:36:12.482917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2a7c4f9b158'
+down_revision: Union[str, None] = 'd6b1f8e3a925'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('notification_outbox', sa.Column('attempts', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('notification_outbox', 'attempts')
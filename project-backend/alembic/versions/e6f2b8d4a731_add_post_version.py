@@ -0,0 +1,26 @@
+"""add post version
+
+Revision ID: e6f2b8d4a731
+Revises: b59d0e7a3c18
+Create Date: 2026-10-18 15:03:48.226157
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6f2b8d4a731'
+down_revision: Union[str, None] = 'b59d0e7a3c18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('posts', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('posts', 'version')
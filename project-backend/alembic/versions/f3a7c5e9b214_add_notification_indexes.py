@@ -0,0 +1,28 @@
+"""add notification indexes
+
+Revision ID: f3a7c5e9b214
+Revises: d81f5a3e2c69
+Create Date: 2026-10-18 13:40:12.508361
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a7c5e9b214'
+down_revision: Union[str, None] = 'd81f5a3e2c69'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_notifications_user_id_timestamp_id', 'notifications', ['user_id', 'timestamp', 'id'], unique=False)
+    op.create_index('ix_notifications_user_id_unread', 'notifications', ['user_id'], unique=False, postgresql_where=sa.text('is_read = false'))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_notifications_user_id_unread', table_name='notifications')
+    op.drop_index('ix_notifications_user_id_timestamp_id', table_name='notifications')
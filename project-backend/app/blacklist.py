@@ -0,0 +1,180 @@
+import asyncio
+import hashlib
+import logging
+import math
+import time
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+from sqlalchemy import delete, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+# import models [UVICORN]
+import app.models as models
+# from config import settings [UVICORN]
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Rows are re-read this far back on every sync, to cover commits that land out
+# of order and clock skew between workers
+SYNC_OVERLAP = timedelta(seconds=60)
+
+
+class BloomFilter:
+    """
+    A fixed-size Bloom filter over strings.
+
+    `item in bloom` is never False for an added item, and is wrongly True for
+    roughly `error_rate` of the others while fewer than `capacity` items were added.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        capacity = max(capacity, 1)
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        # Double hashing: k positions derived from two independent 64-bit hashes
+        digest = hashlib.sha256(item.encode()).digest()
+        first = int.from_bytes(digest[:8], "big")
+        second = int.from_bytes(digest[8:16], "big") | 1
+        return ((first + i * second) % self.size for i in range(self.hash_count))
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class TokenBlacklistFilter:
+    """
+    In-memory Bloom filter in front of the `token_blacklist` table.
+
+    A token that is not in the filter was certainly never blacklisted (as of the
+    last sync), so the database only has to be consulted on a probable hit.
+    Until the filter has been built, every token counts as a probable hit.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.bloom: Optional[BloomFilter] = None
+        self.synced_at: Optional[datetime] = None
+        # Tokens added locally since the last rebuild; re-added after the next one in
+        # case their row was committed after the rebuild query started
+        self.added_since_rebuild = []
+
+    @property
+    def ready(self):
+        return self.bloom is not None
+
+    def might_contain(self, token: str):
+        """
+        Tell whether a token may be blacklisted.
+
+        Args:
+            token (str): The token to check.
+
+        Returns:
+            bool: False only if the token is certainly not blacklisted.
+        """
+        return self.bloom is None or token in self.bloom
+
+    def add(self, token: str):
+        """
+        Add a freshly blacklisted token to the filter.
+
+        Args:
+            token (str): The blacklisted token.
+        """
+        if self.bloom is not None:
+            self.bloom.add(token)
+        self.added_since_rebuild.append(token)
+
+    def _load(self, tokens: Iterable[str], count: int):
+        bloom = BloomFilter(max(self.capacity, 2 * count), self.error_rate)
+        for token in tokens:
+            bloom.add(token)
+        return bloom
+
+    async def rebuild(self, db: AsyncSession):
+        """
+        Rebuild the filter from every blacklist row that has not expired yet.
+
+        Args:
+            db (AsyncSession): The database session.
+        """
+        started = datetime.utcnow()
+        stmt = select(models.TokenBlacklist.token).where(or_(models.TokenBlacklist.expires_at.is_(None), models.TokenBlacklist.expires_at > started))
+        tokens = (await db.scalars(stmt)).all()
+        bloom = self._load(tokens, len(tokens))
+        for token in self.added_since_rebuild:
+            bloom.add(token)
+        self.bloom = bloom
+        self.added_since_rebuild = []
+        self.synced_at = started
+
+    async def sync(self, db: AsyncSession):
+        """
+        Add the tokens blacklisted (possibly by other workers) since the last sync.
+
+        Args:
+            db (AsyncSession): The database session.
+        """
+        if self.bloom is None:
+            return await self.rebuild(db)
+        started = datetime.utcnow()
+        stmt = select(models.TokenBlacklist.token).where(models.TokenBlacklist.blacklisted_on >= self.synced_at - SYNC_OVERLAP)
+        for token in (await db.scalars(stmt)).all():
+            self.bloom.add(token)
+        self.synced_at = started
+
+
+# The blacklist filter of this worker
+token_blacklist = TokenBlacklistFilter(settings.token_blacklist_bloom_capacity, settings.token_blacklist_bloom_error_rate)
+
+
+async def purge_expired(db: AsyncSession):
+    """
+    Delete blacklist rows whose token has expired: an expired token is rejected anyway.
+
+    Args:
+        db (AsyncSession): The database session.
+
+    Returns:
+        int: The number of deleted rows.
+    """
+    result = await db.execute(delete(models.TokenBlacklist).where(models.TokenBlacklist.expires_at <= datetime.utcnow()))
+    await db.commit()
+    return result.rowcount
+
+
+async def maintain(session_factory):
+    """
+    Background task keeping the blacklist filter in sync and the table pruned.
+
+    Every `token_blacklist_sync_seconds` it picks up tokens blacklisted by other
+    workers; every `token_blacklist_purge_seconds` it deletes expired rows and
+    rebuilds the filter, since a Bloom filter cannot forget entries.
+
+    Args:
+        session_factory (async_sessionmaker): Factory for the sessions used by the task.
+    """
+    last_purge = time.monotonic()
+    while True:
+        await asyncio.sleep(settings.token_blacklist_sync_seconds)
+        try:
+            async with session_factory() as db:
+                if time.monotonic() - last_purge >= settings.token_blacklist_purge_seconds:
+                    purged = await purge_expired(db)
+                    await token_blacklist.rebuild(db)
+                    last_purge = time.monotonic()
+                    logger.info("Purged %s expired blacklisted tokens", purged)
+                else:
+                    await token_blacklist.sync(db)
+        except Exception:
+            logger.exception("Token blacklist maintenance failed")
@@ -0,0 +1,130 @@
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Hashable, Optional
+# from config import settings [UVICORN]
+from app.config import settings
+
+
+class TTLCache:
+    """
+    A small in-process LRU cache whose entries expire after a time-to-live.
+
+    The cache is bounded: once `maxsize` entries are stored, the least recently
+    used one is evicted. It is meant to be used from the event loop, so it does
+    no locking, and it is local to each worker process.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Any = None):
+        """
+        Return the value stored under `key`, or `default` if it is missing or expired.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return default
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """
+        Store `value` under `key` for `ttl` seconds (the cache's default TTL when omitted).
+        """
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0 or self.maxsize <= 0:
+            return
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None):
+        """
+        Remove `key` from the cache and return its value (or `default`).
+        """
+        entry = self._entries.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def values(self):
+        """
+        Return the values of the entries that have not expired.
+        """
+        now = time.monotonic()
+        return [value for expires_at, value in self._entries.values() if expires_at > now]
+
+    def pop_matching(self, predicate: Callable[[Hashable, Any], bool]):
+        """
+        Remove every entry for which `predicate(key, value)` is true.
+
+        Returns:
+            int: The number of removed entries.
+        """
+        keys = [key for key, (_, value) in self._entries.items() if predicate(key, value)]
+        for key in keys:
+            del self._entries[key]
+        return len(keys)
+
+    def clear(self):
+        """
+        Remove every entry.
+        """
+        self._entries.clear()
+
+
+# Rendered `/one-post/{id}/` responses of this worker: post id -> (ETag, JSON body).
+# Writes handled by this worker invalidate entries at once; writes handled by
+# other workers are picked up when the entry expires.
+post_cache = TTLCache(settings.post_cache_size, settings.post_cache_ttl_seconds)
+
+# Posts being rendered: post id -> [renders in flight, invalidations since the first
+# of them started]. Only the invalidations of the post itself keep a render out of
+# the cache, and the entry goes away with the last render.
+_rendering = {}
+
+
+@contextmanager
+def rendering(post_id: int):
+    """
+    Render the response of a post for the cache.
+
+    Yields a function that caches the rendered response, unless the post was
+    invalidated since the block was entered (the response may predate the change).
+
+    Args:
+        post_id (int): The ID of the post being rendered.
+    """
+    state = _rendering.setdefault(post_id, [0, 0])
+    state[0] += 1
+    generation = state[1]
+
+    def store(value):
+        if state[1] == generation:
+            post_cache.set(post_id, value)
+
+    try:
+        yield store
+    finally:
+        state[0] -= 1
+        if not state[0]:
+            del _rendering[post_id]
+
+
+def invalidate_post(post_id: int):
+    """
+    Drop the cached response of a post after it, its comments or its likes changed.
+    """
+    state = _rendering.get(post_id)
+    if state is not None:
+        state[1] += 1
+    post_cache.pop(post_id)
@@ -1,5 +1,6 @@
 from pydantic.v1 import BaseSettings
 import os
+from typing import Optional
 
 class Settings(BaseSettings):
     """
@@ -17,6 +18,34 @@ class Settings(BaseSettings):
         algorithm (str): Algorithm used for encoding tokens (e.g., "HS256").
         access_token_expire_minutes (int): Expiry time for access tokens in minutes.
         refresh_token_expire_days (int): Expiry time for refresh tokens in days.
+        default_page_size (int): Number of items returned by paginated endpoints when no limit is given.
+        max_page_size (int): Upper bound applied to the `limit` requested by clients on paginated endpoints.
+        db_pool_size (int): Number of connections kept open in each worker's connection pool.
+        db_max_overflow (int): Extra connections a pool may open above `db_pool_size` during bursts.
+        db_pool_timeout (float): Seconds a request waits for a free connection before failing.
+        db_pool_recycle (int): Seconds after which a pooled connection is replaced (-1 disables recycling).
+        db_pool_pre_ping (bool): Whether to test connections with a lightweight ping when they are checked out.
+        db_statement_timeout_ms (int): Server-side statement timeout for API queries in milliseconds (0 disables it).
+        auth_cache_size (int): Maximum number of verified access tokens cached per worker.
+        auth_cache_ttl_seconds (int): How long a verified token and its user are cached (never beyond the token's expiry). A logout, account change or deletion handled by another worker reaches this worker's cache within `token_blacklist_sync_seconds`.
+        token_blacklist_bloom_capacity (int): Number of blacklisted tokens the Bloom filter is sized for.
+        token_blacklist_bloom_error_rate (float): Target false-positive rate of the Bloom filter.
+        token_blacklist_sync_seconds (int): How often each worker picks up tokens blacklisted by other workers.
+        token_blacklist_purge_seconds (int): How often expired blacklist rows are deleted and the filter rebuilt.
+        bcrypt_rounds (int): bcrypt cost factor for new hashes; older hashes are upgraded on login.
+        password_hash_workers (Optional[int]): Number of bcrypt worker processes (defaults to the number of CPUs).
+        max_like_batch_size (int): Maximum number of posts a single batch like/unlike request may target.
+        notification_outbox_batch_size (int): Number of outbox rows turned into notifications per transaction.
+        notification_outbox_poll_seconds (float): How often the outbox worker looks for new rows.
+        notification_outbox_max_attempts (int): Failed deliveries after which an outbox row is left aside (it stays in the table, skipped).
+        notification_stream_heartbeat_seconds (float): Idle time after which the notification stream sends a heartbeat.
+        notification_stream_queue_size (int): Events buffered per stream connection before a slow client is caught up from the database instead.
+        post_cache_size (int): Maximum number of rendered single-post responses cached per worker.
+        post_cache_ttl_seconds (int): How long a rendered post is served from cache (bounds staleness across workers).
+        comment_replies_per_thread (int): Replies returned with each top-level comment before a "load more replies" cursor is given.
+        server_timing_header (bool): Whether responses carry a `Server-Timing` header with the request's DB, dependency, handler and serialization times.
+        slow_request_ms (float): Requests taking at least this long are logged as warnings with their slowest statements.
+        slow_request_statements (int): Number of statements listed in a slow request's log line.
 
     Configuration:
         The `.env` file is located in the parent directory of the current file.
@@ -42,6 +71,34 @@ class Settings(BaseSettings):
         ALGORITHM=HS256
         ACCESS_TOKEN_EXPIRE_MINUTES=30
         REFRESH_TOKEN_EXPIRE_DAYS=7
+        DEFAULT_PAGE_SIZE=20
+        MAX_PAGE_SIZE=100
+        DB_POOL_SIZE=5
+        DB_MAX_OVERFLOW=10
+        DB_POOL_TIMEOUT=30
+        DB_POOL_RECYCLE=1800
+        DB_POOL_PRE_PING=true
+        DB_STATEMENT_TIMEOUT_MS=15000
+        AUTH_CACHE_SIZE=10000
+        AUTH_CACHE_TTL_SECONDS=60
+        TOKEN_BLACKLIST_BLOOM_CAPACITY=100000
+        TOKEN_BLACKLIST_BLOOM_ERROR_RATE=0.001
+        TOKEN_BLACKLIST_SYNC_SECONDS=30
+        TOKEN_BLACKLIST_PURGE_SECONDS=3600
+        BCRYPT_ROUNDS=12
+        PASSWORD_HASH_WORKERS=4
+        MAX_LIKE_BATCH_SIZE=100
+        NOTIFICATION_OUTBOX_BATCH_SIZE=500
+        NOTIFICATION_OUTBOX_POLL_SECONDS=1
+        NOTIFICATION_OUTBOX_MAX_ATTEMPTS=5
+        NOTIFICATION_STREAM_HEARTBEAT_SECONDS=15
+        NOTIFICATION_STREAM_QUEUE_SIZE=100
+        POST_CACHE_SIZE=1000
+        POST_CACHE_TTL_SECONDS=30
+        COMMENT_REPLIES_PER_THREAD=10
+        SERVER_TIMING_HEADER=true
+        SLOW_REQUEST_MS=500
+        SLOW_REQUEST_STATEMENTS=5
     """
     database_hostname: str
     database_port: str
@@ -52,6 +109,34 @@ class Settings(BaseSettings):
     algorithm: str
     access_token_expire_minutes: int
     refresh_token_expire_days: int
+    default_page_size: int = 20
+    max_page_size: int = 100
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    db_statement_timeout_ms: int = 0
+    auth_cache_size: int = 10000
+    auth_cache_ttl_seconds: int = 60
+    token_blacklist_bloom_capacity: int = 100000
+    token_blacklist_bloom_error_rate: float = 0.001
+    token_blacklist_sync_seconds: int = 30
+    token_blacklist_purge_seconds: int = 3600
+    bcrypt_rounds: int = 12
+    password_hash_workers: Optional[int] = None
+    max_like_batch_size: int = 100
+    notification_outbox_batch_size: int = 500
+    notification_outbox_poll_seconds: float = 1.0
+    notification_outbox_max_attempts: int = 5
+    notification_stream_heartbeat_seconds: float = 15.0
+    notification_stream_queue_size: int = 100
+    post_cache_size: int = 1000
+    post_cache_ttl_seconds: int = 30
+    comment_replies_per_thread: int = 10
+    server_timing_header: bool = True
+    slow_request_ms: float = 500
+    slow_request_statements: int = 5
 
     class Config:
         env_file = env_file = f"{os.path.dirname(os.path.abspath(__file__))}/../.env"
@@ -0,0 +1,84 @@
+import asyncio
+from collections import defaultdict
+from typing import Any, Dict, Set
+# from config import settings [UVICORN]
+from app.config import settings
+
+
+class Subscription:
+    """
+    One live connection's view of the hub: a bounded queue of events for a user.
+
+    When the client reads slower than events arrive and the queue fills up, the
+    subscription is marked as overflowed and stops receiving events; the stream
+    then drops the queued events and catches up from the database in place.
+    """
+
+    def __init__(self, user_id: int, maxsize: int):
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.overflowed = False
+
+    def put(self, event: Any):
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class NotificationHub:
+    """
+    In-process publish/subscribe hub pushing new notifications to connected users.
+
+    It is local to each worker process and meant to be used from the event loop,
+    so it does no locking. Events published by another worker are not seen here;
+    the stream endpoint covers them by catching up from the database on every heartbeat.
+    """
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._subscriptions: Dict[int, Set[Subscription]] = defaultdict(set)
+
+    def __len__(self):
+        return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+    def subscribe(self, user_id: int):
+        """
+        Start receiving the events published for a user.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            Subscription: The subscription, to pass to `unsubscribe` once the connection closes.
+        """
+        subscription = Subscription(user_id, self.queue_size)
+        self._subscriptions[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """
+        Stop receiving events on a subscription.
+        """
+        subscriptions = self._subscriptions.get(subscription.user_id)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscriptions[subscription.user_id]
+
+    def publish(self, user_id: int, event: Any):
+        """
+        Push an event to every connection of a user. Never blocks.
+
+        Args:
+            user_id (int): The ID of the user the event is for.
+            event (Any): The event.
+        """
+        for subscription in self._subscriptions.get(user_id, ()):
+            subscription.put(event)
+
+
+# The notification hub of this worker
+notification_hub = NotificationHub(settings.notification_stream_queue_size)
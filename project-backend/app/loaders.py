@@ -0,0 +1,96 @@
+from typing import Iterable
+from sqlalchemy.orm import joinedload, load_only, selectinload
+# import models, schemas [UVICORN]
+import app.models as models, app.schemas as schemas
+
+
+# Loader options for each response schema.
+#
+# Serializing an ORM object touches every relationship its response schema
+# nests. Left to the default lazy loading, that costs one SELECT per row and
+# relationship. Each profile below eagerly loads exactly what the schema reads:
+# many-to-one relationships are joined into the main query and collections are
+# fetched with one `SELECT ... WHERE id IN (...)` each, so a listing takes a
+# fixed number of queries however many rows it returns.
+
+COMMENT_RESPONSE = (
+    joinedload(models.Comment.author),
+)
+
+BLOG_POST_RESPONSE = (
+    joinedload(models.BlogPost.author),
+    joinedload(models.BlogPost.category),
+    selectinload(models.BlogPost.tags),
+    selectinload(models.BlogPost.comments).joinedload(models.Comment.author),
+)
+
+LIKE_RESPONSE = (
+    joinedload(models.Like.user),
+)
+
+PROFILES = {
+    schemas.CommentResponse: COMMENT_RESPONSE,
+    schemas.BlogPostResponse: BLOG_POST_RESPONSE,
+    schemas.BlogPostPage: BLOG_POST_RESPONSE,
+    schemas.BlogPostSparsePage: BLOG_POST_RESPONSE,
+    schemas.LikeResponse: LIKE_RESPONSE,
+}
+
+
+# Sparse fieldsets of BlogPostResponse: how each field is loaded when requested.
+# Columns left out are never fetched (`load_only`); relationships left out are
+# never loaded. The sort key columns are always loaded for keyset pagination.
+BLOG_POST_FIELDS = {
+    "title": models.BlogPost.title,
+    "content": models.BlogPost.content,
+    "id": models.BlogPost.id,
+    "slug": models.BlogPost.slug,
+    "published_at": models.BlogPost.published_at,
+    "is_published": models.BlogPost.is_published,
+    "category": joinedload(models.BlogPost.category),
+    "tags": selectinload(models.BlogPost.tags),
+    "comments": selectinload(models.BlogPost.comments).joinedload(models.Comment.author),
+    "author": joinedload(models.BlogPost.author).load_only(models.User.email),
+    "like_count": models.BlogPost.like_count,
+    "comment_count": models.BlogPost.comment_count,
+    "excerpt": models.BlogPost.excerpt,
+    "word_count": models.BlogPost.word_count,
+    "reading_time_minutes": models.BlogPost.reading_time_minutes,
+}
+
+
+def blog_post_options(fields: Iterable[str]):
+    """
+    Return the loader options fetching only the given BlogPostResponse fields.
+
+    Args:
+        fields (Iterable[str]): Field names, all keys of `BLOG_POST_FIELDS`.
+
+    Returns:
+        tuple: Loader options to pass to `select(models.BlogPost).options(...)`.
+    """
+    columns = [models.BlogPost.id, models.BlogPost.published_at]
+    relationships = []
+    for field in fields:
+        loader = BLOG_POST_FIELDS[field]
+        if field in ("category", "tags", "comments", "author"):
+            relationships.append(loader)
+        else:
+            columns.append(loader)
+    return (load_only(*columns), *relationships)
+
+
+def options_for(schema):
+    """
+    Return the loader options needed to serialize ORM objects with a response schema.
+
+    Args:
+        schema (type): The response schema (e.g. `schemas.BlogPostResponse`).
+
+    Returns:
+        tuple: Loader options to pass to `select(...).options(...)`.
+
+    Raises:
+        KeyError: If no loading profile is registered for the schema.
+    """
+    return PROFILES[schema]
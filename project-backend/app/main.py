@@ -1,14 +1,48 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
 from fastapi import FastAPI
-# from routers import blogs, users, auth, likes, comments, notifications [UVICORN]
-from app.routers import blogs, users, auth, likes, comments, notifications
+# from routers import blogs, users, auth, likes, comments, notifications, health [UVICORN]
+from app.routers import blogs, users, auth, likes, comments, notifications, health
+from app.database import async_engine, AsyncSessionLocal
+from app import blacklist, oauth2, outbox, timing, utils
 # import app.models as models
 # from app.database import engine
 
 # Create all tables in the database (if not already created)
 # models.Base.metadata.create_all(bind=engine)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Application lifespan: runs start-up code before serving and clean-up code on shutdown.
+    """
+    # Build the token blacklist filter, then keep it in sync and the table pruned in the background
+    async with AsyncSessionLocal() as db:
+        await blacklist.token_blacklist.rebuild(db)
+    maintenance = asyncio.create_task(blacklist.maintain(AsyncSessionLocal))
+    # Drop cached tokens of users changed or deleted through other workers
+    revalidation = asyncio.create_task(oauth2.maintain_auth_cache(AsyncSessionLocal))
+    # Turn queued likes and comments into notifications in the background
+    delivery = asyncio.create_task(outbox.deliver(AsyncSessionLocal))
+
+    yield
+
+    for task in (maintenance, revalidation, delivery):
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    # Stop the bcrypt worker processes
+    utils.shutdown_hash_pool()
+    # Close the pooled database connections
+    await async_engine.dispose()
+
+
 # Initialize the FastAPI application
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+
+# Report the query count and DB, handler and serialization times of every request
+app.add_middleware(timing.TimingMiddleware)
+timing.instrument(async_engine.sync_engine)
 
 
 # Include routers for various endpoints
@@ -18,9 +52,10 @@ app.include_router(auth.router)
 app.include_router(likes.router)
 app.include_router(comments.router)
 app.include_router(notifications.router)
+app.include_router(health.router)
 
 @app.get('/')
-def home():
+async def home():
     """
     Root endpoint of the FastAPI application.
 
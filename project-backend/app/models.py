@@ -1,5 +1,6 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Text, DateTime, Table
-from sqlalchemy.orm import relationship
+from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Text, DateTime, Table, Index, Computed, UniqueConstraint, Sequence, false, text
+from sqlalchemy.dialects.postgresql import ARRAY, TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 # from database import Base [UVICORN]
 from app.database import Base
 from datetime import datetime
@@ -35,7 +36,9 @@ post_tag_association = Table(
     'post_tag',
     Base.metadata,
     Column('post_id', ForeignKey('posts.id', ondelete='CASCADE'), primary_key=True),
-    Column('tag_id', ForeignKey('tags.id', ondelete='CASCADE'), primary_key=True)
+    Column('tag_id', ForeignKey('tags.id', ondelete='CASCADE'), primary_key=True),
+    # The primary key serves lookups by post; this one serves lookups by tag
+    Index('ix_post_tag_tag_id_post_id', 'tag_id', 'post_id'),
 )
 
 # User Model to represent users in the application
@@ -61,6 +64,9 @@ class User(Base):
     likes = relationship('Like', back_populates='user', cascade="all, delete")
     notifications = relationship('Notification', back_populates='user', cascade="all, delete")
 
+# Text search configuration used for the posts full-text index and for parsing search queries
+SEARCH_CONFIG = 'english'
+
 # BlogPost Model to represent blog posts in the application
 class BlogPost(Base):
     """
@@ -73,10 +79,26 @@ class BlogPost(Base):
     title = Column(String(255), nullable=False, index=True)
     content = Column(Text, nullable=False)
     slug = Column(String(255), unique=True, nullable=False)
-    published_at = Column(DateTime, default=datetime.utcnow)
+    # Part of the listing sort key, so never NULL: a NULL would sort first and cannot be encoded in a cursor
+    published_at = Column(DateTime, nullable=False, default=datetime.utcnow, server_default=text("timezone('utc', now())"))
     is_published = Column(Boolean, default=False)
     author_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
     category_id = Column(Integer, ForeignKey('categories.id', ondelete='CASCADE'), nullable=True)
+    # Generated by Postgres from title (weight A) and content (weight B); deferred so listings never load it
+    search_vector = deferred(Column(TSVECTOR, Computed(
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(title, '')), 'A') || "
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(content, '')), 'B')",
+        persisted=True
+    )))
+    # Denormalized counters, kept in step by the like and comment endpoints (see reconcile_counters.py)
+    like_count = Column(Integer, nullable=False, default=0, server_default='0')
+    comment_count = Column(Integer, nullable=False, default=0, server_default='0')
+    # Preview columns computed from the content on write (see utils.summarize_content)
+    excerpt = Column(String(300), nullable=True)
+    word_count = Column(Integer, nullable=False, default=0, server_default='0')
+    reading_time_minutes = Column(Integer, nullable=False, default=0, server_default='0')
+    # Bumped by every change to the post, its comments or its likes; identifies the rendered response (ETag)
+    version = Column(Integer, nullable=False, default=1, server_default='1')
 
     # Relationships with other models
     author = relationship('User', back_populates='posts')
@@ -86,6 +108,17 @@ class BlogPost(Base):
     likes = relationship('Like', back_populates='post', cascade="all, delete")
     notifications = relationship('Notification', back_populates='post', cascade="all, delete")
 
+    # Composite indexes backing the keyset pagination of post listings
+    __table_args__ = (
+        Index('ix_posts_published_at_id', 'published_at', 'id'),
+        Index('ix_posts_author_id_published_at_id', 'author_id', 'published_at', 'id'),
+        Index('ix_posts_search_vector', 'search_vector', postgresql_using='gin'),
+        # Prefix matches (`slug LIKE 'base-%'`) used to allocate the next free slug suffix
+        Index('ix_posts_slug_pattern', 'slug', postgresql_ops={'slug': 'varchar_pattern_ops'}),
+        # Foreign key lookups (e.g. when a category is deleted)
+        Index('ix_posts_category_id', 'category_id'),
+    )
+
 # Category Model to represent post categories
 class Category(Base):
     """
@@ -113,10 +146,19 @@ class Tag(Base):
     # Relationship with BlogPost model (many-to-many)
     posts = relationship('BlogPost', secondary=post_tag_association, back_populates='tags')
 
+# Digits of each comment ID in a materialized path: enough for any Integer ID
+COMMENT_PATH_WIDTH = 10
+
 # Comment Model to represent post comments
 class Comment(Base):
     """
     Comment model that represents a comment made by a user on a blog post.
+
+    Replies form a tree: `parent_id` points at the comment replied to, and `path`
+    is the materialized path of the comment, the zero-padded IDs of its ancestors
+    and itself joined with dots (see `COMMENT_PATH_WIDTH`). Sorting on `path`
+    lists a thread depth-first, and a whole subtree is the index range of the
+    paths starting with its root's path.
     """
     __tablename__ = 'comments'
 
@@ -125,6 +167,15 @@ class Comment(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     author_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
     post_id = Column(Integer, ForeignKey('posts.id', ondelete='CASCADE'), nullable=False)
+    parent_id = Column(Integer, ForeignKey('comments.id', ondelete='CASCADE'), nullable=True, index=True)
+    # "C" collation: byte-wise ordering, so the index also serves prefix (LIKE 'path.%') scans
+    path = Column(String(collation='C'), nullable=False)
+
+    __table_args__ = (
+        Index('ix_comments_post_id_path', 'post_id', 'path'),
+        Index('ix_comments_post_id_top_level', 'post_id', 'id', postgresql_where=(parent_id.is_(None))),
+        Index('ix_comments_author_id', 'author_id'),
+    )
 
     # Relationships with User and BlogPost models
     author = relationship('User', back_populates='comments')
@@ -138,13 +189,20 @@ class Like(Base):
     __tablename__ = 'likes'
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False, primary_key=True)
-    post_id = Column(Integer, ForeignKey('posts.id', ondelete='CASCADE'), nullable=False, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    post_id = Column(Integer, ForeignKey('posts.id', ondelete='CASCADE'), nullable=False)
 
     # Relationships with User and BlogPost models
     user = relationship('User', back_populates='likes')
     post = relationship('BlogPost', back_populates='likes')
 
+    # A user likes a post at most once; the like endpoints rely on it with ON CONFLICT
+    __table_args__ = (
+        UniqueConstraint('user_id', 'post_id', name='uq_likes_user_id_post_id'),
+        # The unique constraint serves lookups by user; this one serves lookups by post
+        Index('ix_likes_post_id_user_id', 'post_id', 'user_id'),
+    )
+
 
 # TokenBlacklist Model to store blacklisted tokens (for logout)
 class TokenBlacklist(Base):
@@ -154,7 +212,9 @@ class TokenBlacklist(Base):
     __tablename__ = 'token_blacklist'
     id = Column(Integer, primary_key=True, index=True)
     token = Column(String, index=True, unique=True)
-    blacklisted_on = Column(DateTime, default=datetime.utcnow)
+    blacklisted_on = Column(DateTime, default=datetime.utcnow, index=True)
+    # Expiry of the blacklisted token itself; the row is useless (and purged) after it
+    expires_at = Column(DateTime, nullable=True, index=True)
 
 
 
@@ -166,11 +226,16 @@ class RefreshToken(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     token = Column(String, nullable=False, unique=True)
-    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     expires_at = Column(DateTime)
 
 
+# Delivery order of notifications. Drawn while the recipient's user row is locked
+# (see outbox.drain_outbox), so each user's notifications commit in `seq` order
+# and a stream can resume from the last `seq` it sent.
+notification_seq = Sequence('notifications_seq_seq', metadata=Base.metadata)
+
 # Notification Model to represent notifications for users
 class Notification(Base):
     """
@@ -179,11 +244,59 @@ class Notification(Base):
     __tablename__ = "notifications"
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
-    post_id = Column(Integer, ForeignKey("posts.id"))
-    message = Column(String, nullable=False)
+    post_id = Column(Integer, ForeignKey("posts.id"), index=True)
+    # Only set on notifications written before coalescing; newer ones are rendered from kind and actors when read
+    message = Column(String, nullable=True)
     is_read = Column(Boolean, default=False)
     timestamp = Column(DateTime, default=datetime.utcnow)
+    # Unread notifications of the same kind on the same post are merged into one row
+    kind = Column(String(20), nullable=True)
+    actor_count = Column(Integer, nullable=False, default=1, server_default='1')
+    recent_actor_ids = Column(ARRAY(Integer), nullable=False, default=list, server_default='{}')
+    # Bumped when activity is merged into the notification, so that it streams again
+    seq = Column(Integer, notification_seq, nullable=False, server_default=notification_seq.next_value())
 
     # Relationships with User and BlogPost models
     user = relationship("User", back_populates="notifications")
-    post = relationship("BlogPost", back_populates="notifications")
\ No newline at end of file
+    post = relationship("BlogPost", back_populates="notifications")
+
+    # Keyset pagination of a user's notifications, stream catch-up, and a small partial index for unread counts
+    __table_args__ = (
+        Index('ix_notifications_user_id_timestamp_id', 'user_id', 'timestamp', 'id'),
+        Index('ix_notifications_user_id_seq', 'user_id', 'seq'),
+        Index('ix_notifications_user_id_unread', 'user_id', postgresql_where=(is_read == false())),
+        Index('uq_notifications_unread_user_id_post_id_kind', 'user_id', 'post_id', 'kind', unique=True, postgresql_where=(is_read == false())),
+    )
+
+
+# NotificationActor Model to count the distinct actors of a coalesced notification
+class NotificationActor(Base):
+    """
+    NotificationActor model that records each user who acted on an unread notification.
+
+    `actor_count` is the number of rows a notification has here, kept in step by the
+    outbox worker. The rows are only needed while the notification can still be
+    merged into, so they are deleted once it is read.
+    """
+    __tablename__ = "notification_actors"
+    notification_id = Column(Integer, ForeignKey("notifications.id", ondelete="CASCADE"), primary_key=True)
+    actor_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True, index=True)
+
+
+# NotificationOutbox Model to queue notifications written by the request path
+class NotificationOutbox(Base):
+    """
+    NotificationOutbox model that represents a notification waiting to be delivered.
+
+    Likes and comments only insert a small outbox row in their own transaction;
+    the outbox worker (see app/outbox.py) turns the rows into notifications.
+    """
+    __tablename__ = "notification_outbox"
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(20), nullable=False)
+    actor_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    recipient_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    post_id = Column(Integer, ForeignKey("posts.id", ondelete="CASCADE"), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # Failed deliveries; the worker skips a row once it reaches `notification_outbox_max_attempts`
+    attempts = Column(Integer, nullable=False, default=0, server_default='0')
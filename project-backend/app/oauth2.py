@@ -1,14 +1,26 @@
 from jose import JWTError, jwt
 from datetime import timedelta, datetime
+import asyncio
+import hashlib
+import logging
+import time
 # import schemas, database, models [UVICORN]
 import app.schemas as schemas, app.database as database, app.models as models
 from fastapi import Depends, status, HTTPException
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
 # from config import settings [UVICORN]
 from app.config import settings
+# from cache import TTLCache [UVICORN]
+from app.cache import TTLCache
+# from blacklist import token_blacklist [UVICORN]
+from app.blacklist import token_blacklist
 
 
+logger = logging.getLogger(__name__)
+
 # OAuth2 scheme for handling token-based authentication
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl='login')
 
@@ -18,6 +30,14 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.access_token_expire_minutes
 REFRESH_TOKEN_EXPIRE_DAYS = settings.refresh_token_expire_days
 
+# Verified access tokens mapped to a snapshot of their user's columns, keyed by
+# the SHA-256 of the token. An entry never outlives the token's `exp`. Logouts and
+# user changes made by this worker drop entries at once; those made by other
+# workers are picked up by `maintain_auth_cache` and the blacklist sync.
+auth_cache = TTLCache(maxsize=settings.auth_cache_size, ttl=settings.auth_cache_ttl_seconds)
+
+USER_COLUMNS = [attribute.key for attribute in inspect(models.User).column_attrs]
+
 
 # CREATING ACCESS TOKEN
 def create_access_token(data: dict):
@@ -58,49 +78,150 @@ def create_refresh_token(data: dict):
 
 
 #VERIFY THE ACCESS TOKEN
-def verify_access_token(token: str, credentials_exception, db: Session):
+async def verify_access_token(token: str, credentials_exception, db: AsyncSession):
     """
     Verify the validity of an access token.
 
     Args:
         token (str): The token to verify.
         credentials_exception (HTTPException): Exception to raise if verification fails.
-        db (Session): Database session for checking blacklisted tokens.
+        db (AsyncSession): Database session for checking blacklisted tokens.
 
     Returns:
         schemas.TokenData: Token data if the token is valid.
     """
     try:
 
-        # blacklisted_token = db.query(models.TokenBlacklist).filter(models.TokenBlacklist.token).first()
-        blacklisted_token = db.query(models.TokenBlacklist).filter(models.TokenBlacklist.token == token).first()
-
-        if blacklisted_token:
-            raise credentials_exception
-        
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         # print(payload)
 
+        # The Bloom filter rules out most tokens; the table is only read on a probable hit
+        if token_blacklist.might_contain(token):
+            blacklisted_token = await db.scalar(select(models.TokenBlacklist).where(models.TokenBlacklist.token == token))
+
+            if blacklisted_token:
+                raise credentials_exception
+
         id: int = payload.get("user_id")
 
         if id is None:
             raise credentials_exception
         
-        token_data = schemas.TokenData(id=id)
+        token_data = schemas.TokenData(id=id, exp=payload.get("exp"))
 
     except JWTError as J:
         raise credentials_exception
     
     return token_data
-    
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
+
+def token_expiry(token: str):
+    """
+    Read the expiry of a token that has already been verified.
+
+    Args:
+        token (str): The JWT.
+
+    Returns:
+        datetime: The token's `exp` as a naive UTC datetime, or None if it has none.
+    """
+    exp = jwt.get_unverified_claims(token).get("exp")
+    return datetime.utcfromtimestamp(exp) if exp is not None else None
+
+
+def token_cache_key(token: str):
+    """
+    Derive the auth cache key of a token, so raw tokens are never kept in memory longer than needed.
+
+    Args:
+        token (str): The access token.
+
+    Returns:
+        str: The hex SHA-256 digest of the token.
+    """
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def invalidate_token(token: str):
+    """
+    Drop a token from the auth cache (e.g. on logout).
+
+    Args:
+        token (str): The access token to forget.
+    """
+    auth_cache.pop(token_cache_key(token))
+
+
+def invalidate_user(user_id: int):
+    """
+    Drop every cached token of a user, so that the next request reloads the user.
+
+    Must be called whenever the user's row changes or is deleted.
+
+    Args:
+        user_id (int): The ID of the user.
+    """
+    auth_cache.pop_matching(lambda key, snapshot: snapshot["id"] == user_id)
+
+
+# Users re-read per query by `revalidate_cached_users`
+REVALIDATE_BATCH_SIZE = 1000
+
+async def revalidate_cached_users(db: AsyncSession):
+    """
+    Drop the cached tokens of users that were changed or deleted, possibly by another worker.
+
+    Every cached snapshot is compared with the user's current row.
+
+    Args:
+        db (AsyncSession): The database session.
+
+    Returns:
+        int: The number of users whose cached tokens were dropped.
+    """
+    snapshots = {snapshot["id"]: snapshot for snapshot in auth_cache.values()}
+    ids = list(snapshots)
+    current = {}
+    for start in range(0, len(ids), REVALIDATE_BATCH_SIZE):
+        stmt = select(*(getattr(models.User, column) for column in USER_COLUMNS)).where(models.User.id.in_(ids[start:start + REVALIDATE_BATCH_SIZE]))
+        current.update({row.id: row._asdict() for row in await db.execute(stmt)})
+    stale = [user_id for user_id, snapshot in snapshots.items() if current.get(user_id) != snapshot]
+    for user_id in stale:
+        invalidate_user(user_id)
+    return len(stale)
+
+
+async def maintain_auth_cache(session_factory):
+    """
+    Background task revalidating the cached users every `token_blacklist_sync_seconds`.
+
+    Together with the blacklist sync, this bounds how long a token stays usable on
+    this worker after a logout, account change or deletion handled by another one.
+
+    Args:
+        session_factory (async_sessionmaker): Factory for the sessions used by the task.
+    """
+    while True:
+        await asyncio.sleep(settings.token_blacklist_sync_seconds)
+        try:
+            async with session_factory() as db:
+                await revalidate_cached_users(db)
+        except Exception:
+            logger.exception("Auth cache revalidation failed")
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(database.get_db)):
     """
     Retrieve the current user based on the provided token.
 
+    Tokens verified recently are served from the in-process auth cache: the
+    cached user is attached to the request's session without any SQL, which
+    skips both the blacklist and the user lookups. A cached token the blacklist
+    filter may contain (e.g. logged out on another worker) is verified again.
+
     Args:
         token (str): The authentication token.
-        db (Session): Database session for querying user information.
+        db (AsyncSession): Database session for querying user information.
 
     Returns:
         models.User: The user corresponding to the token.
@@ -110,8 +231,18 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     """
     credentials_exception  = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=f"Could not validate credentials", headers={"WWW-Authenticate": "Berarer"})
 
-    token = verify_access_token(token, credentials_exception, db)
-    user = db.query(models.User).filter(models.User.id == token.id).first()
+    cache_key = token_cache_key(token)
+    snapshot = auth_cache.get(cache_key)
+    if snapshot is not None and not token_blacklist.might_contain(token):
+        user = models.User(**snapshot)
+        make_transient_to_detached(user)
+        return await db.merge(user, load=False)
+
+    token_data = await verify_access_token(token, credentials_exception, db)
+    user = await db.get(models.User, token_data.id)
     if not user:
         raise credentials_exception
+
+    if token_data.exp is not None:
+        auth_cache.set(cache_key, {column: getattr(user, column) for column in USER_COLUMNS}, ttl=token_data.exp - time.time())
     return user
@@ -0,0 +1,290 @@
+import asyncio
+import logging
+from collections import Counter
+from typing import Iterable, Optional
+from sqlalchemy import Integer, column, delete, false, select, text, update, values
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+# import models [UVICORN]
+import app.models as models, app.schemas as schemas
+# from hub import notification_hub [UVICORN]
+from app.hub import notification_hub
+# from config import settings [UVICORN]
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Outbox kinds and the notification message rendered for each
+LIKE = "like"
+COMMENT = "comment"
+MESSAGES = {
+    LIKE: "{actors} liked your post",
+    COMMENT: "{actors} commented on your post",
+}
+
+# Number of actors kept (most recent first) on a coalesced notification
+RECENT_ACTORS = 3
+
+# Merging a batch into an unread notification: the most recent distinct actors come first
+MERGED_RECENT_ACTORS = text(
+    "ARRAY(SELECT actor FROM unnest(excluded.recent_actor_ids || notifications.recent_actor_ids) "
+    f"WITH ORDINALITY AS merged(actor, position) GROUP BY actor ORDER BY min(position) LIMIT {RECENT_ACTORS})"
+)
+
+
+def enqueue(db: AsyncSession, kind: str, actor_id: int, recipient_id: int, post_id: int):
+    """
+    Queue a notification in the caller's transaction.
+
+    Nothing is queued when users act on their own posts.
+
+    Args:
+        db (AsyncSession): The database session of the request.
+        kind (str): The kind of notification (`LIKE` or `COMMENT`).
+        actor_id (int): The ID of the user who acted.
+        recipient_id (int): The ID of the user to notify.
+        post_id (int): The ID of the post acted on.
+    """
+    if actor_id != recipient_id:
+        db.add(models.NotificationOutbox(kind=kind, actor_id=actor_id, recipient_id=recipient_id, post_id=post_id))
+
+
+async def drain_outbox(db: AsyncSession, batch_size: Optional[int] = None):
+    """
+    Turn one batch of outbox rows into notifications.
+
+    The batch is claimed with `FOR UPDATE SKIP LOCKED` and deleted in the same
+    statement, so several workers can drain concurrently without delivering a row
+    twice. If delivering the batch fails, its rows are delivered again one per
+    transaction, so that a row which cannot be delivered does not hold back the
+    others; such a row stays in the outbox with one more attempt recorded, and is
+    given up after `settings.notification_outbox_max_attempts`.
+
+    Args:
+        db (AsyncSession): The database session.
+        batch_size (Optional[int]): The number of rows to claim (defaults to `settings.notification_outbox_batch_size`).
+
+    Returns:
+        int: The number of outbox rows claimed; less than `batch_size` once the outbox is empty.
+    """
+    batch_size = batch_size or settings.notification_outbox_batch_size
+    rows = await claim(db, select(models.NotificationOutbox.id).order_by(models.NotificationOutbox.id).limit(batch_size))
+    if not rows:
+        return 0
+    try:
+        await deliver_rows(db, rows)
+    except Exception:
+        await db.rollback()
+        logger.exception("Delivering %s outbox rows failed, retrying them one at a time", len(rows))
+        for row in rows:
+            await retry_row(db, row.id)
+    return len(rows)
+
+
+async def claim(db: AsyncSession, claimed):
+    """
+    Delete the outbox rows selected by `claimed` that have attempts left, and return them in ID order.
+    """
+    claimed = claimed.where(models.NotificationOutbox.attempts < settings.notification_outbox_max_attempts).with_for_update(skip_locked=True)
+    stmt = (
+        delete(models.NotificationOutbox)
+        .where(models.NotificationOutbox.id.in_(claimed.scalar_subquery()))
+        .returning(models.NotificationOutbox.id, models.NotificationOutbox.kind, models.NotificationOutbox.actor_id, models.NotificationOutbox.recipient_id, models.NotificationOutbox.post_id)
+        .execution_options(synchronize_session=False)
+    )
+    return sorted((await db.execute(stmt)).all())
+
+
+async def retry_row(db: AsyncSession, outbox_id: int):
+    """
+    Deliver a single outbox row in its own transaction, recording a failed attempt if it cannot be.
+    """
+    try:
+        rows = await claim(db, select(models.NotificationOutbox.id).where(models.NotificationOutbox.id == outbox_id))
+        if rows:
+            await deliver_rows(db, rows)
+    except Exception:
+        await db.rollback()
+        attempts = await db.scalar(
+            update(models.NotificationOutbox)
+            .where(models.NotificationOutbox.id == outbox_id)
+            .values(attempts=models.NotificationOutbox.attempts + 1)
+            .returning(models.NotificationOutbox.attempts)
+        )
+        await db.commit()
+        if attempts is not None and attempts >= settings.notification_outbox_max_attempts:
+            logger.exception("Giving up on outbox row %s after %s attempts", outbox_id, attempts)
+        else:
+            logger.exception("Delivering outbox row %s failed", outbox_id)
+
+
+async def deliver_rows(db: AsyncSession, rows):
+    """
+    Write claimed outbox rows as notifications, commit, and push them to connected recipients.
+
+    Rows are grouped by (recipient, post, kind) and written with a single
+    multi-row upsert: a group is merged into the recipient's unread notification
+    for the same post and kind, if there is one, which then gets a fresh `seq` so
+    that it streams as new. The group's actors are recorded in
+    `notification_actors`, and `actor_count` grows by the number of them that
+    were not recorded yet, so an actor is never counted twice.
+
+    The recipients' user rows are locked first, so two workers delivering to the
+    same user take turns and each user's notifications commit in `seq` order: a
+    stream resuming after the last `seq` it sent cannot skip one committed later.
+    Once committed, the notifications are pushed to the recipients connected to
+    this worker's notification stream.
+
+    Args:
+        db (AsyncSession): The database session, in the transaction that claimed the rows.
+        rows (Sequence[Row]): The claimed outbox rows, in ID order.
+    """
+    await lock_recipients(db, {row.recipient_id for row in rows})
+
+    # Distinct actors of every (recipient, post, kind), most recent first
+    groups = {}
+    for row in rows:
+        actors = groups.setdefault((row.recipient_id, row.post_id, row.kind), [])
+        if row.actor_id in actors:
+            actors.remove(row.actor_id)
+        actors.insert(0, row.actor_id)
+
+    upsert = insert(models.Notification).values([
+        {"user_id": user_id, "post_id": post_id, "kind": kind, "actor_count": 0, "recent_actor_ids": actors[:RECENT_ACTORS]}
+        for (user_id, post_id, kind), actors in groups.items()
+    ])
+    upsert = upsert.on_conflict_do_update(
+        index_elements=[models.Notification.user_id, models.Notification.post_id, models.Notification.kind],
+        index_where=models.Notification.is_read == false(),
+        set_={
+            "seq": models.notification_seq.next_value(),
+            "recent_actor_ids": MERGED_RECENT_ACTORS,
+            "timestamp": upsert.excluded.timestamp,
+        },
+    ).returning(models.Notification).execution_options(populate_existing=True)
+    notifications = (await db.scalars(upsert)).all()
+    await count_actors(db, notifications, groups)
+    rendered = await render(db, notifications)
+    await db.commit()
+
+    for notification, response in zip(notifications, rendered):
+        notification_hub.publish(notification.user_id, (notification.seq, response))
+
+
+async def count_actors(db: AsyncSession, notifications: Iterable[models.Notification], groups: dict):
+    """
+    Record the actors of freshly upserted notifications and add the new ones to `actor_count`.
+
+    Args:
+        db (AsyncSession): The database session.
+        notifications (Iterable[models.Notification]): The upserted notifications, refreshed in place.
+        groups (dict): The actor IDs of each (recipient, post, kind).
+    """
+    ids = {(notification.user_id, notification.post_id, notification.kind): notification.id for notification in notifications}
+    recorded = (
+        insert(models.NotificationActor)
+        .values([{"notification_id": ids[key], "actor_id": actor_id} for key, actors in groups.items() for actor_id in actors])
+        .on_conflict_do_nothing()
+        .returning(models.NotificationActor.notification_id)
+    )
+    added = Counter(await db.scalars(recorded))
+    if not added:
+        return
+    counts = values(column("id", Integer), column("added", Integer), name="added").data(list(added.items()))
+    stmt = (
+        update(models.Notification)
+        .where(models.Notification.id == counts.c.id)
+        .values(actor_count=models.Notification.actor_count + counts.c.added)
+        .returning(models.Notification)
+        .execution_options(populate_existing=True, synchronize_session=False)
+    )
+    await db.scalars(stmt)
+
+
+async def lock_recipients(db: AsyncSession, user_ids: Iterable[int]):
+    """
+    Lock the rows of the users about to be notified until the end of the transaction.
+
+    The locks are taken in ID order so that concurrent workers cannot deadlock.
+    They are `FOR NO KEY UPDATE` locks (`key_share=True`), which leave foreign key
+    checks (e.g. a like by the user) unblocked.
+
+    Args:
+        db (AsyncSession): The database session.
+        user_ids (Iterable[int]): The IDs of the recipients.
+    """
+    stmt = select(models.User.id).where(models.User.id.in_(sorted(user_ids))).order_by(models.User.id).with_for_update(key_share=True)
+    await db.execute(stmt)
+
+
+def describe_actors(names, count: int):
+    """
+    Describe who acted, e.g. "ada", "ada and bob" or "ada and 41 others".
+    """
+    if not names:
+        return "Someone" if count <= 1 else f"{count} people"
+    if count <= 1:
+        return names[0]
+    if count == 2 and len(names) >= 2:
+        return f"{names[0]} and {names[1]}"
+    others = count - 1
+    return f"{names[0]} and {others} other{'s' if others > 1 else ''}"
+
+
+async def render(db: AsyncSession, notifications: Iterable[models.Notification]):
+    """
+    Render notifications for the client, building their message from kind and actors.
+
+    The emails of all the listed actors are loaded with one query. Notifications
+    written before coalescing keep their stored message.
+
+    Args:
+        db (AsyncSession): The database session.
+        notifications (Iterable[models.Notification]): The notifications to render.
+
+    Returns:
+        List[schemas.NotificationResponse]: The rendered notifications, in the same order.
+    """
+    notifications = list(notifications)
+    actor_ids = {actor_id for notification in notifications for actor_id in notification.recent_actor_ids or ()}
+    emails = {}
+    if actor_ids:
+        emails = dict((await db.execute(select(models.User.id, models.User.email).where(models.User.id.in_(actor_ids)))).all())
+
+    rendered = []
+    for notification in notifications:
+        message = notification.message
+        if notification.kind in MESSAGES:
+            names = [emails[actor_id] for actor_id in notification.recent_actor_ids if actor_id in emails]
+            message = MESSAGES[notification.kind].format(actors=describe_actors(names, notification.actor_count))
+        rendered.append(schemas.NotificationResponse(
+            id=notification.id,
+            message=message,
+            is_read=notification.is_read,
+            timestamp=notification.timestamp,
+            post_id=notification.post_id,
+            kind=notification.kind,
+            actor_count=notification.actor_count,
+        ))
+    return rendered
+
+
+async def deliver(session_factory):
+    """
+    Background task draining the notification outbox.
+
+    Every `notification_outbox_poll_seconds` it drains full batches until the
+    outbox is empty, so notifications lag behind likes and comments by at most
+    about one poll interval under normal load.
+
+    Args:
+        session_factory (async_sessionmaker): Factory for the sessions used by the task.
+    """
+    while True:
+        await asyncio.sleep(settings.notification_outbox_poll_seconds)
+        try:
+            async with session_factory() as db:
+                while await drain_outbox(db) >= settings.notification_outbox_batch_size:
+                    pass
+        except Exception:
+            logger.exception("Notification outbox delivery failed")
@@ -0,0 +1,104 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Callable, Optional, Sequence
+from fastapi import HTTPException, status
+from sqlalchemy import tuple_
+# from config import settings [UVICORN]
+from app.config import settings
+
+
+def page_size(limit: Optional[int]):
+    """
+    Resolve the number of items to return for a paginated request.
+
+    Args:
+        limit (Optional[int]): The page size requested by the client, if any.
+
+    Returns:
+        int: The requested size capped at `settings.max_page_size`, or the default page size.
+    """
+    if limit is None:
+        return settings.default_page_size
+    return max(1, min(limit, settings.max_page_size))
+
+
+def encode_cursor(values: Sequence[Any]):
+    """
+    Encode the sort key of the last item of a page into an opaque cursor.
+
+    Args:
+        values (Sequence[Any]): The values of the ordering columns for the last item.
+
+    Returns:
+        str: A URL-safe cursor string.
+    """
+    raw = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(raw, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, types: Sequence[type]):
+    """
+    Decode a cursor produced by `encode_cursor`.
+
+    Args:
+        cursor (str): The opaque cursor sent by the client.
+        types (Sequence[type]): The expected type of each ordering column (datetime, int, float or str).
+
+    Returns:
+        tuple: The decoded sort key.
+
+    Raises:
+        HTTPException: If the cursor is malformed.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(raw, list) or len(raw) != len(types):
+            raise ValueError(cursor)
+        return tuple(datetime.fromisoformat(value) if kind is datetime else kind(value) for kind, value in zip(types, raw))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def keyset(stmt, columns: Sequence, cursor: Optional[str], limit: int, types: Sequence[type]):
+    """
+    Apply descending keyset pagination to a select statement.
+
+    The statement is ordered on `columns` (newest first) and, when a cursor is
+    given, restricted to rows that sort strictly after it. One extra row is
+    fetched so that `build_page` can tell whether another page exists.
+
+    Args:
+        stmt (Select): The statement to paginate.
+        columns (Sequence): The ordering columns; the last one must be unique (usually the primary key).
+        cursor (Optional[str]): The cursor returned with the previous page.
+        limit (int): The page size.
+        types (Sequence[type]): The types of the ordering columns, used to decode the cursor.
+
+    Returns:
+        Select: The paginated statement.
+    """
+    if cursor:
+        stmt = stmt.where(tuple_(*columns) < tuple_(*decode_cursor(cursor, types)))
+    return stmt.order_by(*(column.desc() for column in columns)).limit(limit + 1)
+
+
+def build_page(rows: Sequence, limit: int, key: Callable[[Any], Sequence[Any]]):
+    """
+    Build a page response from rows fetched with `keyset`.
+
+    Args:
+        rows (Sequence): The rows returned by the paginated statement.
+        limit (int): The page size used for the statement.
+        key (Callable): Returns the ordering values of a row, used to build the next cursor.
+
+    Returns:
+        dict: The items of the page and the cursor for the next one (None on the last page).
+    """
+    rows = list(rows)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(key(rows[-1]))
+    return {"items": rows, "next_cursor": next_cursor}
@@ -1,25 +1,32 @@
 from fastapi import APIRouter, Depends, status, HTTPException, Response
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 # import database, models, utils, oauth2 [UVICORN]
 import app.database as database, app.models as models, app.utils as utils, app.oauth2 as oauth2
 from fastapi.security.oauth2 import OAuth2PasswordRequestForm
 from jose import JWTError, jwt
 # from oauth2 import SECRET_KEY, ALGORITHM [UVICORN]
 from app.oauth2 import SECRET_KEY, ALGORITHM
+# from blacklist import token_blacklist [UVICORN]
+from app.blacklist import token_blacklist
 
 # Initialize the APIRouter for authentication routes
+# import timing [UVICORN]
+import app.timing as timing
+
 router = APIRouter(
-    tags=['Authentication']
+    tags=['Authentication'],
+    route_class=timing.TimedRoute
 )
 
 @router.post("/login/", status_code=status.HTTP_200_OK)
-def login(user_credentials: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(database.get_db)):
+async def login(user_credentials: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(database.get_db)):
     """
     Logs in a user by validating their email and password.
     
     Parameters:
         user_credentials (OAuth2PasswordRequestForm): Contains the 'username' and 'password'.
-        db (Session): Database session for querying the user.
+        db (AsyncSession): Database session for querying the user.
 
     Returns:
         dict: A dictionary containing access_token, refresh_token, and token_type if successful.
@@ -28,15 +35,22 @@ def login(user_credentials: OAuth2PasswordRequestForm = Depends(), db: Session =
         HTTPException: If the user is not found or the credentials are invalid.
     """
     # Query the database for a user with the provided email (username)
-    user = db.query(models.User).filter(models.User.email == user_credentials.username).first()
+    user = await db.scalar(select(models.User).where(models.User.email == user_credentials.username))
 
     # If no user is found, raise an HTTP 406 error
     if not user:
         raise HTTPException(status_code=status.HTTP_406_NOT_ACCEPTABLE, detail="Invalid Credentials")
     
-    # Verify if the provided password matches the stored hashed password
-    if not utils.verify_password(user_credentials.password, user.password):
+    # Verify if the provided password matches the stored hashed password (in the bcrypt process pool)
+    valid, new_hash = await utils.verify_and_update_password_async(user_credentials.password, user.password)
+    if not valid:
         raise HTTPException(status_code=status.HTTP_406_NOT_ACCEPTABLE, detail="Invalid Credentials")
+
+    # Transparently upgrade hashes made with a different bcrypt cost
+    if new_hash:
+        user.password = new_hash
+        await db.commit()
+        oauth2.invalidate_user(user.id)
     
     # Generate access and refresh tokens for the authenticated user
     access_token = oauth2.create_access_token(data={"user_id": user.id})
@@ -50,35 +64,37 @@ def login(user_credentials: OAuth2PasswordRequestForm = Depends(), db: Session =
     }
 
 @router.post("/logout/", status_code=status.HTTP_200_OK)
-def logout(token: str = Depends(oauth2.oauth2_scheme), db: Session = Depends(database.get_db), current_user: int = Depends(oauth2.get_current_user)):
+async def logout(token: str = Depends(oauth2.oauth2_scheme), db: AsyncSession = Depends(database.get_db), current_user: int = Depends(oauth2.get_current_user)):
     """
     Logs the user out by blacklisting the provided access token.
     
     Parameters:
         token (str): The access token to be blacklisted.
-        db (Session): Database session for adding the blacklisted token.
+        db (AsyncSession): Database session for adding the blacklisted token.
         current_user (int): The currently authenticated user.
 
     Returns:
         dict: A message confirming the successful logout.
     """
-    # Add the current token to the blacklist to prevent its reuse
-    blacklisted_token = models.TokenBlacklist(token=token)
+    # Add the current token to the blacklist to prevent its reuse, until it expires anyway
+    blacklisted_token = models.TokenBlacklist(token=token, expires_at=oauth2.token_expiry(token))
     db.add(blacklisted_token)
-    db.commit()
+    await db.commit()
+    token_blacklist.add(token)
+    oauth2.invalidate_token(token)
 
     # Return a message indicating successful logout
     return {"message": "Successfully logged out"}
 
 
 @router.post("/refresh-token")
-def refresh_token(refresh_token: str = Depends(oauth2.oauth2_scheme), db: Session = Depends(database.get_db)):
+async def refresh_token(refresh_token: str = Depends(oauth2.oauth2_scheme), db: AsyncSession = Depends(database.get_db)):
     """
     Refreshes the access and refresh tokens using a valid refresh token.
     
     Parameters:
         refresh_token (str): The refresh token provided by the user.
-        db (Session): Database session for checking if the token is blacklisted.
+        db (AsyncSession): Database session for checking if the token is blacklisted.
 
     Returns:
         dict: New access token, refresh token, and token type.
@@ -102,10 +118,11 @@ def refresh_token(refresh_token: str = Depends(oauth2.oauth2_scheme), db: Sessio
         if user_id is None:
             raise credentials_exception
 
-        # Check if the token is blacklisted, if it is, raise an exception
-        blacklisted_token = db.query(models.TokenBlacklist).filter(models.TokenBlacklist.token == refresh_token).first()
-        if blacklisted_token:
-            raise credentials_exception
+        # Check if the token is blacklisted, if it is, raise an exception (the table is only read on a probable Bloom filter hit)
+        if token_blacklist.might_contain(refresh_token):
+            blacklisted_token = await db.scalar(select(models.TokenBlacklist).where(models.TokenBlacklist.token == refresh_token))
+            if blacklisted_token:
+                raise credentials_exception
         
     except JWTError:
         # If there is an error decoding the token, raise an exception
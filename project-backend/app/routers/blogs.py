@@ -1,14 +1,22 @@
-from fastapi import FastAPI, APIRouter, Depends, HTTPException, status
-# import models, schemas, oauth2 [UVICORN]
-import app.models as models, app.schemas as schemas, app.oauth2 as oauth2
-from sqlalchemy.orm import Session
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, Query, Request, Response, status
+# import models, schemas, oauth2, pagination, loaders, cache, serializers, utils [UVICORN]
+import app.models as models, app.schemas as schemas, app.oauth2 as oauth2, app.pagination as pagination, app.loaders as loaders, app.cache as cache, app.serializers as serializers, app.utils as utils
+from sqlalchemy import Integer, case, cast, delete, func, or_, select, update
+from sqlalchemy.dialects.postgresql import DOUBLE_PRECISION, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
 # from database import get_db [UVICRON]
 from app.database import get_db
+from datetime import datetime
 import re
-from typing import List
+from typing import List, Optional
+# import timing [UVICORN]
+import app.timing as timing
 
 router = APIRouter(
-    tags=["Blogs Page"]
+    tags=["Blogs Page"],
+    route_class=timing.TimedRoute
 )
 
 
@@ -23,89 +31,298 @@ def generate_slugs(title: str):
     return slug
 
 
-@router.get("/posts/", response_model=List[schemas.BlogPostResponse], status_code=status.HTTP_200_OK)
-def get_all_blogs(db: Session = Depends(get_db), current_user: int = Depends(oauth2.get_current_user)):
+# Allocations retried when a concurrent post takes the same slug between allocation and insert
+SLUG_ATTEMPTS = 3
+
+
+async def allocate_slug(db: AsyncSession, title: str):
+    """
+    Return a free slug for a title, adding the next free `-n` suffix on collisions.
+
+    A single query reads the base slug and its numbered variants through the
+    `varchar_pattern_ops` index on slugs (`slug LIKE 'base-%'`) and returns the
+    highest suffix in use, so no candidate is tried in a loop.
+
+    Args:
+        db (AsyncSession): The database session.
+        title (str): The title of the post.
+
+    Returns:
+        str: `base` if it is free, otherwise `base-n` with `n` one above the highest suffix taken.
+    """
+    base = generate_slugs(title) or "post"
+    numbered = models.BlogPost.slug.like(f"{base}-%") & models.BlogPost.slug.regexp_match(f"^{base}-[0-9]{{1,9}}$")
+    # The base slug counts as suffix 1, so that its first duplicate becomes `base-2`
+    suffix = case((models.BlogPost.slug == base, 1), else_=cast(func.substr(models.BlogPost.slug, len(base) + 2), Integer))
+    base_taken, highest = (await db.execute(select(func.bool_or(models.BlogPost.slug == base), func.max(suffix)).where(or_(models.BlogPost.slug == base, numbered)))).one()
+    return f"{base}-{highest + 1}" if base_taken else base
+
+
+# Posts are listed newest first; the id breaks ties between posts published at the same instant
+POST_ORDER = (models.BlogPost.published_at, models.BlogPost.id)
+POST_CURSOR_TYPES = (datetime, int)
+
+# Every endpoint serializes posts with BlogPostResponse, so they all load posts with its profile
+POST_LOADERS = loaders.options_for(schemas.BlogPostResponse)
+
+
+async def load_post(db: AsyncSession, id: int):
+    """
+    Load a single post with everything BlogPostResponse needs.
+
+    Args:
+        db (AsyncSession): The database session.
+        id (int): The ID of the blog post.
+
+    Returns:
+        models.BlogPost: The post, or None if it does not exist.
+    """
+    stmt = select(models.BlogPost).options(*POST_LOADERS).where(models.BlogPost.id == id).execution_options(populate_existing=True)
+    return (await db.scalars(stmt)).unique().first()
+
+
+def parse_fields(fields: Optional[str], excerpt: bool = False):
+    """
+    Parse the `fields` and `excerpt` query parameters of the post listings.
+
+    Args:
+        fields (Optional[str]): Comma-separated BlogPostResponse field names, e.g. `title,slug,author`.
+        excerpt (bool): Whether to return the excerpt instead of the full content.
+
+    Returns:
+        Optional[List[str]]: The requested fields in schema order, or None when all fields are wanted.
+
+    Raises:
+        HTTPException: If a field is unknown.
+    """
+    if fields is None and not excerpt:
+        return None
+    if fields is None:
+        requested = set(loaders.BLOG_POST_FIELDS)
+    else:
+        requested = {field.strip() for field in fields.split(",") if field.strip()}
+    if excerpt:
+        requested = (requested - {"content"}) | {"excerpt"}
+    unknown = requested - loaders.BLOG_POST_FIELDS.keys()
+    if unknown:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    return [field for field in loaders.BLOG_POST_FIELDS if field in requested]
+
+
+# Help text of the `fields` and `excerpt` query parameters shared by the post listings
+FIELDS_DESCRIPTION = f"Comma-separated subset of {', '.join(loaders.BLOG_POST_FIELDS)}; only these are fetched and returned."
+EXCERPT_DESCRIPTION = "Return the precomputed excerpt instead of the full content."
+
+
+async def paginate_posts(db: AsyncSession, stmt, cursor: Optional[str], limit: Optional[int], fields: Optional[str] = None, excerpt: bool = False):
+    """
+    Run a post listing statement with keyset pagination on (published_at, id).
+
+    Args:
+        db (AsyncSession): The database session.
+        stmt (Select): The statement selecting the posts to list.
+        cursor (Optional[str]): The cursor returned with the previous page.
+        limit (Optional[int]): The requested page size.
+        fields (Optional[str]): The `fields` query parameter: when given, only those columns and relationships are loaded and returned.
+        excerpt (bool): The `excerpt` query parameter: when set, the excerpt is returned instead of the content.
+
+    Returns:
+        ORJSONResponse: The page of posts and the cursor of the next page, serialized by the fast path.
+    """
+    fields = parse_fields(fields, excerpt)
+    options = POST_LOADERS if fields is None else loaders.blog_post_options(fields)
+    limit = pagination.page_size(limit)
+    stmt = pagination.keyset(stmt.options(*options), POST_ORDER, cursor, limit, POST_CURSOR_TYPES)
+    posts = (await db.scalars(stmt)).unique().all()
+    page = pagination.build_page(posts, limit, lambda post: (post.published_at, post.id))
+    return serializers.page_response(page, serializers.sparse_blog_post_response(fields))
+
+
+def post_etag(id: int, version: int):
+    """
+    Return the strong ETag of the rendered post at a given version.
     """
-    Retrieve all blog posts.
+    return f'"post-{id}-v{version}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str):
+    """
+    Tell whether an `If-None-Match` header matches an ETag.
+
+    Args:
+        if_none_match (Optional[str]): The header value: `*` or a comma-separated list of ETags.
+        etag (str): The current ETag.
+
+    Returns:
+        bool: True if the client's copy is current.
+    """
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+async def resolve_tags(db: AsyncSession, names: List[str]):
+    """
+    Return the tags with the given names, creating the missing ones.
+
+    Existing tags are fetched with a single `SELECT ... WHERE name IN (...)` and the
+    missing ones are created with a single `INSERT ... ON CONFLICT DO NOTHING
+    RETURNING`, in the caller's transaction. A tag created concurrently by another
+    request makes the insert skip that name; it is then re-read once committed.
+
+    Args:
+        db (AsyncSession): The database session.
+        names (List[str]): The tag names, in the order they should be attached.
+
+    Returns:
+        List[models.Tag]: One tag per distinct name, in the given order.
+    """
+    names = list(dict.fromkeys(names))
+    if not names:
+        return []
+
+    tags = {tag.name: tag for tag in await db.scalars(select(models.Tag).where(models.Tag.name.in_(names)))}
+    missing = [name for name in names if name not in tags]
+    if missing:
+        stmt = insert(models.Tag).values([{"name": name} for name in missing]).on_conflict_do_nothing(index_elements=[models.Tag.name]).returning(models.Tag)
+        tags.update((tag.name, tag) for tag in await db.scalars(stmt))
+        raced = [name for name in missing if name not in tags]
+        if raced:
+            tags.update((tag.name, tag) for tag in await db.scalars(select(models.Tag).where(models.Tag.name.in_(raced))))
+
+    return [tags[name] for name in names]
+
+
+@router.get("/posts/", response_model=schemas.BlogPostSparsePage, status_code=status.HTTP_200_OK)
+async def get_all_blogs(db: AsyncSession = Depends(get_db), current_user: int = Depends(oauth2.get_current_user), cursor: Optional[str] = None, limit: Optional[int] = None, fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION), excerpt: bool = Query(False, description=EXCERPT_DESCRIPTION)):
+    """
+    Retrieve one page of blog posts, newest first.
     
     Args:
-        db (Session): The database session.
+        db (AsyncSession): The database session.
         current_user (int): The ID of the currently authenticated user.
+        cursor (Optional[str]): The `next_cursor` returned with the previous page.
+        limit (Optional[int]): The number of posts to return, capped by the configured maximum page size.
+        fields (Optional[str]): Comma-separated fields to return (all of them by default).
+        excerpt (bool): Whether to return the excerpt instead of the full content.
     
     Returns:
-        List[schemas.BlogPostResponse]: A list of all blog posts.
+        schemas.BlogPostSparsePage: A page of blog posts and the cursor of the next page.
     """
-    all_blogs = db.query(models.BlogPost).all()
-    return all_blogs
+    return await paginate_posts(db, select(models.BlogPost), cursor, limit, fields, excerpt)
+
 
+# Options passed to ts_headline when building search snippets
+SNIPPET_OPTIONS = "StartSel=<mark>, StopSel=</mark>, MaxWords=35, MinWords=15, MaxFragments=2"
 
-@router.get("/posts/", response_model=List[schemas.BlogPostResponse])
-def search_blogs(db: Session = Depends(get_db), current_user: int = Depends(oauth2.get_current_user), search: str = ""):
+
+@router.get("/posts/search/", response_model=schemas.BlogPostSearchPage)
+async def search_blogs(q: str = Query(..., min_length=1), db: AsyncSession = Depends(get_db), current_user: int = Depends(oauth2.get_current_user), cursor: Optional[str] = None, limit: Optional[int] = None):
     """
-    Search for blog posts by title.
+    Full-text search over post titles and contents, best match first.
+
+    Matches are found through the GIN index on `posts.search_vector` and ranked
+    with `ts_rank` (title matches weigh more than content matches). Snippets are
+    only highlighted for the rows of the returned page.
     
     Args:
-        db (Session): The database session.
+        q (str): The search query, in web search syntax (quoted phrases, `or`, `-excluded`).
+        db (AsyncSession): The database session.
         current_user (int): The ID of the currently authenticated user.
-        search (str): The search query to filter blog posts by title.
+        cursor (Optional[str]): The `next_cursor` returned with the previous page.
+        limit (Optional[int]): The number of hits to return, capped by the configured maximum page size.
     
     Returns:
-        List[schemas.BlogPostResponse]: A list of blog posts matching the search query.
+        schemas.BlogPostSearchPage: A page of matching posts with their rank and a highlighted snippet.
     """
-    all_blogs = db.query(models.BlogPost).filter(models.BlogPost.title.contains(search)).all()
-    return all_blogs
-
-
-@router.get("/myposts/", response_model=List[schemas.BlogPostResponse])
-def get_all_my_blogs(db: Session = Depends(get_db), current_user: int = Depends(oauth2.get_current_user)):
+    limit = pagination.page_size(limit)
+    query = func.websearch_to_tsquery(models.SEARCH_CONFIG, q)
+    # ts_rank returns a real; casting to double makes the rank round-trip exactly through the cursor
+    rank = cast(func.ts_rank(models.BlogPost.search_vector, query), DOUBLE_PRECISION)
+
+    matches = select(models.BlogPost.id, rank.label("rank")).where(models.BlogPost.search_vector.op("@@")(query))
+    matches = pagination.keyset(matches, (rank, models.BlogPost.id), cursor, limit, (float, int)).subquery()
+
+    snippet = func.ts_headline(models.SEARCH_CONFIG, models.BlogPost.content, query, SNIPPET_OPTIONS)
+    stmt = (
+        select(models.BlogPost, matches.c.rank, snippet)
+        .join(matches, models.BlogPost.id == matches.c.id)
+        .options(joinedload(models.BlogPost.author))
+        .order_by(matches.c.rank.desc(), models.BlogPost.id.desc())
+    )
+    hits = [
+        {
+            "id": post.id,
+            "title": post.title,
+            "slug": post.slug,
+            "published_at": post.published_at,
+            "author": post.author,
+            "rank": hit_rank,
+            "snippet": hit_snippet,
+        }
+        for post, hit_rank, hit_snippet in await db.execute(stmt)
+    ]
+    return pagination.build_page(hits, limit, lambda hit: (hit["rank"], hit["id"]))
+
+
+@router.get("/myposts/", response_model=schemas.BlogPostSparsePage)
+async def get_all_my_blogs(db: AsyncSession = Depends(get_db), current_user: int = Depends(oauth2.get_current_user), cursor: Optional[str] = None, limit: Optional[int] = None, fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION), excerpt: bool = Query(False, description=EXCERPT_DESCRIPTION)):
     """
-    Retrieve all blog posts authored by the current user.
+    Retrieve one page of the blog posts authored by the current user.
     
     Args:
-        db (Session): The database session.
+        db (AsyncSession): The database session.
         current_user (int): The ID of the currently authenticated user.
+        cursor (Optional[str]): The `next_cursor` returned with the previous page.
+        limit (Optional[int]): The number of posts to return, capped by the configured maximum page size.
+        fields (Optional[str]): Comma-separated fields to return (all of them by default).
+        excerpt (bool): Whether to return the excerpt instead of the full content.
     
     Returns:
-        List[schemas.BlogPostResponse]: A list of blog posts authored by the current user.
+        schemas.BlogPostSparsePage: A page of blog posts authored by the current user.
     """
-    all_my_blogs = db.query(models.BlogPost).filter(models.BlogPost.author_id == current_user.id).all()
-    return all_my_blogs
+    stmt = select(models.BlogPost).where(models.BlogPost.author_id == current_user.id)
+    return await paginate_posts(db, stmt, cursor, limit, fields, excerpt)
 
 
-@router.get("/allposts/{email}/", response_model=List[schemas.BlogPostResponse])
-def get_all_user_blogs(email: str, db: Session = Depends(get_db), current_user: int = Depends(oauth2.get_current_user)):
+@router.get("/allposts/{email}/", response_model=schemas.BlogPostSparsePage)
+async def get_all_user_blogs(email: str, db: AsyncSession = Depends(get_db), current_user: int = Depends(oauth2.get_current_user), cursor: Optional[str] = None, limit: Optional[int] = None, fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION), excerpt: bool = Query(False, description=EXCERPT_DESCRIPTION)):
     """
-    Retrieve all blog posts authored by a specific user identified by their email.
+    Retrieve one page of the blog posts authored by a specific user identified by their email.
     
     Args:
         email (str): The email of the user whose blog posts are to be retrieved.
-        db (Session): The database session.
+        db (AsyncSession): The database session.
         current_user (int): The ID of the currently authenticated user.
+        cursor (Optional[str]): The `next_cursor` returned with the previous page.
+        limit (Optional[int]): The number of posts to return, capped by the configured maximum page size.
+        fields (Optional[str]): Comma-separated fields to return (all of them by default).
+        excerpt (bool): Whether to return the excerpt instead of the full content.
     
     Returns:
-        List[schemas.BlogPostResponse]: A list of blog posts authored by the specified user.
+        schemas.BlogPostSparsePage: A page of blog posts authored by the specified user.
     
     Raises:
         HTTPException: If the user does not exist.
     """
-    user = db.query(models.User).filter(models.User.email == email).first()
+    user = await db.scalar(select(models.User).where(models.User.email == email))
 
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User does not exist")
 
-    all_my_blogs = db.query(models.BlogPost).filter(models.BlogPost.author_id == user.id).all()
-    
-    return all_my_blogs
+    stmt = select(models.BlogPost).where(models.BlogPost.author_id == user.id)
+    return await paginate_posts(db, stmt, cursor, limit, fields, excerpt)
 
 
 @router.get("/posts/{email}/", response_model=List[schemas.BlogPostResponse])
-def get_all_user_blogs_by_filter(email: str, db: Session = Depends(get_db), current_user: int = Depends(oauth2.get_current_user), limit: int = 5):
+async def get_all_user_blogs_by_filter(email: str, db: AsyncSession = Depends(get_db), current_user: int = Depends(oauth2.get_current_user), limit: int = 5):
     """
     Retrieve a limited number of blog posts authored by a specific user identified by their email.
     
     Args:
         email (str): The email of the user whose blog posts are to be retrieved.
-        db (Session): The database session.
+        db (AsyncSession): The database session.
         current_user (int): The ID of the currently authenticated user.
         limit (int): The maximum number of posts to retrieve.
     
@@ -115,24 +332,74 @@ def get_all_user_blogs_by_filter(email: str, db: Session = Depends(get_db), curr
     Raises:
         HTTPException: If the user does not exist.
     """
-    user = db.query(models.User).filter(models.User.email == email).first()
+    user = await db.scalar(select(models.User).where(models.User.email == email))
 
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User does not exist")
 
-    all_my_blogs = db.query(models.BlogPost).filter(models.BlogPost.author_id == user.id).limit(limit).all()
+    stmt = select(models.BlogPost).options(*POST_LOADERS).where(models.BlogPost.author_id == user.id).limit(limit)
+    all_my_blogs = (await db.scalars(stmt)).unique().all()
     
     return all_my_blogs
 
 
+async def post_response(db: AsyncSession, id: int, if_none_match: Optional[str]):
+    """
+    Build the response of a single post, from the response cache when possible.
+
+    The rendered response is cached per worker and carries a strong ETag derived
+    from the post's version. A matching `If-None-Match` gets a 304: straight from
+    the cache when the post is cached, otherwise after reading only its version.
+
+    Args:
+        db (AsyncSession): The database session.
+        id (int): The ID of the blog post.
+        if_none_match (Optional[str]): The request's `If-None-Match` header.
+
+    Returns:
+        Response: The JSON-encoded BlogPostResponse, or a 304.
+
+    Raises:
+        HTTPException: If the blog post does not exist.
+    """
+    cached = cache.post_cache.get(id)
+
+    if cached is None:
+        if if_none_match:
+            version = await db.scalar(select(models.BlogPost.version).where(models.BlogPost.id == id))
+            if version is not None and etag_matches(if_none_match, post_etag(id, version)):
+                return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": post_etag(id, version)})
+
+        # Not cached if the post changed while it was being rendered
+        with cache.rendering(id) as store:
+            blog = await load_post(db, id)
+
+            if not blog:
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Blog with id {id} does not exist")
+
+            with timing.serializing():
+                body = schemas.BlogPostResponse.model_validate(blog, from_attributes=True).model_dump_json().encode()
+            cached = (post_etag(id, blog.version), body)
+            store(cached)
+
+    etag, body = cached
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
 @router.get("/one-post/{id}/", response_model=schemas.BlogPostResponse)
-def get_one_post(id: int, db: Session = Depends(get_db), current_user: int = Depends(oauth2.get_current_user)):
+async def get_one_post(id: int, request: Request, db: AsyncSession = Depends(get_db), current_user: int = Depends(oauth2.get_current_user)):
     """
     Retrieve a single blog post by its ID.
+
+    Supports conditional requests: see `post_response`.
     
     Args:
         id (int): The ID of the blog post to retrieve.
-        db (Session): The database session.
+        request (Request): The request, read for the `If-None-Match` header.
+        db (AsyncSession): The database session.
         current_user (int): The ID of the currently authenticated user.
     
     Returns:
@@ -141,23 +408,46 @@ def get_one_post(id: int, db: Session = Depends(get_db), current_user: int = Dep
     Raises:
         HTTPException: If the blog post does not exist.
     """
-    blog = db.query(models.BlogPost).filter(models.BlogPost.id == id).first()
+    return await post_response(db, id, request.headers.get("if-none-match"))
 
-    if not blog:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Blog with id {id} does not exist")
 
-    return blog
+@router.get("/posts/by-slug/{slug}", response_model=schemas.BlogPostResponse)
+async def get_post_by_slug(slug: str, request: Request, db: AsyncSession = Depends(get_db), current_user: int = Depends(oauth2.get_current_user)):
+    """
+    Retrieve a single blog post by its slug.
+
+    The slug is resolved to the post's ID through the unique slug index; the post
+    is then served like `/one-post/{id}/`, sharing its cache and ETags.
+
+    Args:
+        slug (str): The slug of the blog post to retrieve.
+        request (Request): The request, read for the `If-None-Match` header.
+        db (AsyncSession): The database session.
+        current_user (int): The ID of the currently authenticated user.
+
+    Returns:
+        schemas.BlogPostResponse: The blog post with the specified slug.
+
+    Raises:
+        HTTPException: If no blog post has this slug.
+    """
+    id = await db.scalar(select(models.BlogPost.id).where(models.BlogPost.slug == slug))
+
+    if id is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Blog with slug {slug} does not exist")
+
+    return await post_response(db, id, request.headers.get("if-none-match"))
 
 
 # NOT YET WORKING
 @router.get("/getpost/{tag_name}/", response_model=List[schemas.BlogPostResponse])
-def get_post_by_category(tag_name: str, db: Session = Depends(get_db), current_user: int = Depends(oauth2.get_current_user)):
+async def get_post_by_category(tag_name: str, db: AsyncSession = Depends(get_db), current_user: int = Depends(oauth2.get_current_user)):
     """
     Retrieve blog posts by a specific tag.
     
     Args:
         tag_name (str): The name of the tag to filter blog posts.
-        db (Session): The database session.
+        db (AsyncSession): The database session.
         current_user (int): The ID of the currently authenticated user.
     
     Returns:
@@ -166,7 +456,8 @@ def get_post_by_category(tag_name: str, db: Session = Depends(get_db), current_u
     Raises:
         HTTPException: If no posts are found with the specified tag.
     """
-    posts = db.query(models.BlogPost).join(models.BlogPost.tags).filter(models.Tag.name == tag_name).all()
+    stmt = select(models.BlogPost).options(*POST_LOADERS).join(models.BlogPost.tags).where(models.Tag.name == tag_name)
+    posts = (await db.scalars(stmt)).unique().all()
     print(posts)
 
     if not posts:
@@ -176,29 +467,26 @@ def get_post_by_category(tag_name: str, db: Session = Depends(get_db), current_u
 
 
 @router.post("/createpost/", response_model=schemas.BlogPostResponse)
-def create_post(blog_post: schemas.BlogPostCreate, db: Session = Depends(get_db), current_user: int = Depends(oauth2.get_current_user)):
+async def create_post(blog_post: schemas.BlogPostCreate, db: AsyncSession = Depends(get_db), current_user: int = Depends(oauth2.get_current_user)):
     """
     Create a new blog post.
     
     Args:
         blog_post (schemas.BlogPostCreate): The blog post data to create.
-        db (Session): The database session.
+        db (AsyncSession): The database session.
         current_user (int): The ID of the currently authenticated user.
     
     Returns:
         schemas.BlogPostResponse: The newly created blog post.
     
     Raises:
-        HTTPException: If the title is too long or the slug already exists.
+        HTTPException: If the title is too long, or no free slug could be allocated.
     """
     # HANDLE THIS ERROR: if not blog_post.title or not blog_post.content:
     #     raise HTTPException(
     #         status_code=status.HTTP_400_BAD_REQUEST,
     #         detail="Title and content cannot be empty."
     #     )
-    # Handle this error : DETAIL:  Key (slug)=(undrstading-the-baics-f-rest-apis) already exists. repeated SLUG
-    # HANDLING SLUG UNIQUENESS
-    slug = generate_slugs(blog_post.title)
     no_of_characters = sum(len(char) for char in blog_post.title)
     
     if no_of_characters >= 50:
@@ -208,36 +496,39 @@ def create_post(blog_post: schemas.BlogPostCreate, db: Session = Depends(get_db)
         title=blog_post.title,
         content=blog_post.content,
         author_id=current_user.id,
-        slug = slug
+        **utils.summarize_content(blog_post.content),
     )
 
-    tags = []
-    for tag_name in blog_post.tags:
-        tag = db.query(models.Tag).filter(models.Tag.name == tag_name).first()
-        if not tag:
-            tag = models.Tag(name=tag_name)
-            db.add(tag)
-            db.commit()
-            db.refresh(tag)
-        tags.append(tag)
+    tags = await resolve_tags(db, blog_post.tags)
 
-    new_post.tags = tags
+    # HANDLING SLUG UNIQUENESS: a duplicate title gets the next free `-n` suffix
+    for attempt in range(SLUG_ATTEMPTS):
+        new_post.slug = await allocate_slug(db, blog_post.title)
+        try:
+            async with db.begin_nested():
+                # The tags are already in the session: attach them once the post is too,
+                # so the Tag.posts backref cascades into it
+                db.add(new_post)
+                new_post.tags = tags
+            break
+        except IntegrityError:
+            # Another post took the slug since it was allocated
+            if attempt == SLUG_ATTEMPTS - 1:
+                raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Could not allocate a unique slug, please retry")
 
-    db.add(new_post)
-    db.commit()
-    db.refresh(new_post)
-    return new_post
+    await db.commit()
+    return await load_post(db, new_post.id)
 
 
 @router.put("/updatepost/{id}/", response_model=schemas.BlogPostResponse)
-def update_post(updated_post: schemas.BlogPostUpdate, id: int, db: Session = Depends(get_db), current_user: int = Depends(oauth2.get_current_user)):
+async def update_post(updated_post: schemas.BlogPostUpdate, id: int, db: AsyncSession = Depends(get_db), current_user: int = Depends(oauth2.get_current_user)):
     """
     Update an existing blog post by its ID.
     
     Args:
         updated_post (schemas.BlogPostUpdate): The updated blog post data.
         id (int): The ID of the blog post to update.
-        db (Session): The database session.
+        db (AsyncSession): The database session.
         current_user (int): The ID of the currently authenticated user.
     
     Returns:
@@ -246,8 +537,8 @@ def update_post(updated_post: schemas.BlogPostUpdate, id: int, db: Session = Dep
     Raises:
         HTTPException: If the post does not exist, the user is not authorized, or there is an issue with tags.
     """
-    post_query = db.query(models.BlogPost).filter(models.BlogPost.id == id)
-    post = post_query.first()
+    # Tags are loaded up front: replacing the collection needs its current contents
+    post = await db.scalar(select(models.BlogPost).options(selectinload(models.BlogPost.tags)).where(models.BlogPost.id == id))
 
     if post == None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Post with id: {id} was not found")
@@ -258,37 +549,27 @@ def update_post(updated_post: schemas.BlogPostUpdate, id: int, db: Session = Dep
     update_data = updated_post.dict(exclude_unset=True)
 
     if 'tags' in update_data:
-        post.tags = []
-
-        new_tags = []
-        for tag_name in update_data['tags']:
-            tag = db.query(models.Tag).filter(models.Tag.name == tag_name).first()
-            if not tag:
-                tag = models.Tag(name=tag_name)
-                db.add(tag)
-                db.commit()
-                db.refresh(tag)
-            new_tags.append(tag)
-
-        post.tags = new_tags
+        post.tags = await resolve_tags(db, update_data['tags'])
         del update_data["tags"]
 
-    post_query.update(update_data, synchronize_session=False)
-    # Handle the tags update
+    if 'content' in update_data:
+        update_data.update(utils.summarize_content(update_data['content']))
+
+    await db.execute(update(models.BlogPost).where(models.BlogPost.id == id).values(**update_data, version=models.BlogPost.version + 1).execution_options(synchronize_session=False))
     
-    db.commit()
-    print(post.tags)
-    return post
+    await db.commit()
+    cache.invalidate_post(id)
+    return await load_post(db, id)
 
 
 @router.delete("/deletepost/{id}/", status_code=status.HTTP_200_OK)
-def delete_post(id: int, db: Session = Depends(get_db), current_user: int = Depends(oauth2.get_current_user)):
+async def delete_post(id: int, db: AsyncSession = Depends(get_db), current_user: int = Depends(oauth2.get_current_user)):
     """
     Delete a blog post by its ID.
     
     Args:
         id (int): The ID of the blog post to delete.
-        db (Session): The database session.
+        db (AsyncSession): The database session.
         current_user (int): The ID of the currently authenticated user.
     
     Returns:
@@ -297,8 +578,7 @@ def delete_post(id: int, db: Session = Depends(get_db), current_user: int = Depe
     Raises:
         HTTPException: If the post does not exist or the user is not authorized.
     """
-    delete_query = db.query(models.BlogPost).filter(models.BlogPost.id == id)
-    deleted_post = delete_query.first()
+    deleted_post = await db.scalar(select(models.BlogPost).where(models.BlogPost.id == id))
 
     if not deleted_post:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Post with id: {id} was not found")
@@ -310,9 +590,7 @@ def delete_post(id: int, db: Session = Depends(get_db), current_user: int = Depe
     # delete_associations = db.query(models.post_tag_association).filter(models.post_tag_association.c.post_id == id)
     # delete_associations.delete(synchronize_session=False)
 
-    delete_query.delete(synchronize_session=False)
-    db.commit()
+    await db.execute(delete(models.BlogPost).where(models.BlogPost.id == id).execution_options(synchronize_session=False))
+    await db.commit()
+    cache.invalidate_post(id)
     return (deleted_post)
-
-
-# Endpoint to handle searching of posts based on title
\ No newline at end of file
@@ -1,17 +1,85 @@
 from fastapi import APIRouter, Depends, status, HTTPException, Response
+from fastapi.responses import ORJSONResponse
 # import models, schemas, oauth2 [uvirocn]
-import app.models as models, app.schemas as schemas, app.oauth2 as oauth2
-from sqlalchemy.orm import Session
+import app.models as models, app.schemas as schemas, app.oauth2 as oauth2, app.outbox as outbox, app.cache as cache, app.serializers as serializers, app.pagination as pagination, app.loaders as loaders
+from sqlalchemy import delete, func, select, true, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
 # from database import get_db [UVICORN]
 from app.database import get_db
+# from config import settings [UVICORN]
+from app.config import settings
 from datetime import datetime, timedelta
+from typing import List, Optional
+# import timing [UVICORN]
+import app.timing as timing
 
 router = APIRouter(
-    tags=['Comments Endpoint']
+    tags=['Comments Endpoint'],
+    route_class=timing.TimedRoute
 )
 
+
+def comment_path(parent_path: Optional[str], comment_id: int):
+    """
+    Build the materialized path of a comment.
+
+    Args:
+        parent_path (Optional[str]): The path of the comment replied to, None for a top-level comment.
+        comment_id (int): The ID of the comment.
+
+    Returns:
+        str: The path, e.g. `0000000012.0000000045` for comment 45 replying to comment 12.
+    """
+    segment = str(comment_id).zfill(models.COMMENT_PATH_WIDTH)
+    return segment if parent_path is None else f"{parent_path}.{segment}"
+
+
+def subtree(path: str):
+    """
+    Return the conditions selecting the descendants of the comment with the given path.
+
+    The descendants are exactly the paths strictly between `path.` and `path/`
+    ("/" sorts right after "."), a single range of `ix_comments_post_id_path`.
+    """
+    return models.Comment.path > path + ".", models.Comment.path < path + "/"
+
+
+async def first_replies(db: AsyncSession, post_id: int, threads: List[models.Comment]):
+    """
+    Load the first replies of a page of top-level comments in one query.
+
+    Each thread is read with its own bounded range scan (a LATERAL subquery),
+    so a long thread costs no more than a short one.
+
+    Args:
+        db (AsyncSession): The database session.
+        post_id (int): The ID of the post.
+        threads (List[models.Comment]): The top-level comments of the page.
+
+    Returns:
+        dict: Maps each top-level comment ID to its replies in depth-first order, at
+        most `settings.comment_replies_per_thread` + 1 of them (the extra one tells that more exist).
+    """
+    replies = {thread.id: [] for thread in threads}
+    if not threads:
+        return replies
+    root = aliased(models.Comment)
+    first = (
+        select(models.Comment.id)
+        .where(models.Comment.post_id == root.post_id, *subtree(root.path))
+        .order_by(models.Comment.path)
+        .limit(settings.comment_replies_per_thread + 1)
+        .lateral()
+    )
+    ids = select(first.c.id).select_from(root).join(first, true()).where(root.id.in_(list(replies)))
+    stmt = select(models.Comment).where(models.Comment.post_id == post_id, models.Comment.id.in_(ids)).order_by(models.Comment.path).options(*loaders.COMMENT_RESPONSE)
+    for reply in (await db.scalars(stmt)).all():
+        replies[int(reply.path[:models.COMMENT_PATH_WIDTH])].append(reply)
+    return replies
+
 @router.post("/posts/{id}/comment")
-def comment_post(comment: schemas.CommentCreate, id: int, current_user: int = Depends(oauth2.get_current_user), db: Session = Depends(get_db)):
+async def comment_post(comment: schemas.CommentCreate, id: int, current_user: int = Depends(oauth2.get_current_user), db: AsyncSession = Depends(get_db)):
     """
     Endpoint to add a comment to a blog post.
 
@@ -19,61 +87,121 @@ def comment_post(comment: schemas.CommentCreate, id: int, current_user: int = De
         comment (schemas.CommentCreate): The content of the comment to be added.
         id (int): The ID of the blog post to which the comment is being added.
         current_user (int): The ID of the current user (automatically fetched from OAuth2 dependency).
-        db (Session): The database session (automatically provided by FastAPI dependency injection).
+        db (AsyncSession): The database session (automatically provided by FastAPI dependency injection).
 
     Returns:
         dict: A success message indicating the comment was added successfully.
 
     Raises:
-        HTTPException: If the blog post with the specified ID does not exist.
+        HTTPException: If the blog post, or the comment replied to, does not exist.
     """
-    user = db.query(models.User).filter(models.User.id == current_user.id).first()
-    post = db.query(models.BlogPost).filter(models.BlogPost.id == id).first()
+    user = await db.get(models.User, current_user.id)
+    post = await db.get(models.BlogPost, id)
     if not post:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found")
 
+    parent_path = None
+    if comment.parent_id is not None:
+        parent_path = await db.scalar(select(models.Comment.path).where(models.Comment.id == comment.parent_id, models.Comment.post_id == id))
+        if parent_path is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Parent comment not found")
+
+    # The ID is drawn up front: it is the last segment of the comment's path
+    comment_id = await db.scalar(select(func.nextval('comments_id_seq')))
     new_comment = models.Comment(
+        id = comment_id,
         content = comment.content,
         author_id = user.id,
-        post_id = id
+        post_id = id,
+        parent_id = comment.parent_id,
+        path = comment_path(parent_path, comment_id)
         )
     db.add(new_comment)
+    # Incremented in SQL so that concurrent comments never lose an update
+    await db.execute(update(models.BlogPost).where(models.BlogPost.id == id).values(comment_count=models.BlogPost.comment_count + 1, version=models.BlogPost.version + 1).execution_options(synchronize_session=False))
 
-    if current_user.id == post.author_id:
-        pass
-    else:
-        message = f"{current_user.email} commented on your post your post"
+    # Delivered by the outbox worker, off the request path
+    outbox.enqueue(db, outbox.COMMENT, current_user.id, post.author_id, id)
 
-        new_notification = models.Notification(
-            user_id=post.author_id,
-            post_id=id,
-            message=message
-        )
-        db.add(new_notification)
-
-    db.commit()
+    await db.commit()
+    cache.invalidate_post(id)
     return {"Message": "commented successfully"}
 
 
-@router.get("/posts/{id}/comments")
-def get_comments(id: int, db: Session = Depends(get_db), current_user: int = Depends(oauth2.get_current_user)):
+@router.get("/posts/{id}/comments", response_model=schemas.CommentPage)
+async def get_comments(id: int, db: AsyncSession = Depends(get_db), current_user: int = Depends(oauth2.get_current_user), cursor: Optional[str] = None, limit: Optional[int] = None):
     """
-    Endpoint to retrieve all comments for a specific blog post.
+    Endpoint to retrieve the comment threads of a blog post, one page of top-level comments at a time.
+
+    Each top-level comment comes with its first `settings.comment_replies_per_thread`
+    replies, depth-first, and a `replies_cursor` to load the rest from
+    `/posts/{id}/comments/{comment_id}/replies`. A page takes two queries however
+    many replies the threads hold.
 
     Args:
         id (int): The ID of the blog post for which comments are being fetched.
-        db (Session): The database session (automatically provided by FastAPI dependency injection).
+        db (AsyncSession): The database session (automatically provided by FastAPI dependency injection).
+        current_user (int): The ID of the current user (automatically fetched from OAuth2 dependency).
+        cursor (Optional[str]): The cursor returned with the previous page.
+        limit (Optional[int]): The number of top-level comments per page (capped at `settings.max_page_size`).
+
+    Returns:
+        schemas.CommentPage: A page of threads, newest first, and the cursor of the next page.
+    """
+    limit = pagination.page_size(limit)
+    stmt = select(models.Comment).where(models.Comment.post_id == id, models.Comment.parent_id.is_(None)).options(*loaders.COMMENT_RESPONSE)
+    stmt = pagination.keyset(stmt, (models.Comment.id,), cursor, limit, (int,))
+    page = pagination.build_page((await db.scalars(stmt)).all(), limit, lambda comment: (comment.id,))
+
+    replies = await first_replies(db, id, page["items"])
+    with timing.serializing():
+        items = []
+        for thread in page["items"]:
+            thread_replies, replies_cursor = replies[thread.id], None
+            if len(thread_replies) > settings.comment_replies_per_thread:
+                thread_replies = thread_replies[:settings.comment_replies_per_thread]
+                replies_cursor = pagination.encode_cursor((thread_replies[-1].path,))
+            items.append(serializers.comment_thread_response(thread, thread_replies, replies_cursor))
+        return ORJSONResponse({"items": items, "next_cursor": page["next_cursor"]})
+
+
+@router.get("/posts/{id}/comments/{comment_id}/replies", response_model=schemas.CommentReplyPage)
+async def get_replies(id: int, comment_id: int, db: AsyncSession = Depends(get_db), current_user: int = Depends(oauth2.get_current_user), cursor: Optional[str] = None, limit: Optional[int] = None):
+    """
+    Endpoint to load more replies of a comment, depth-first.
+
+    Args:
+        id (int): The ID of the blog post containing the comment.
+        comment_id (int): The ID of the comment whose replies are fetched.
+        db (AsyncSession): The database session (automatically provided by FastAPI dependency injection).
         current_user (int): The ID of the current user (automatically fetched from OAuth2 dependency).
+        cursor (Optional[str]): The `replies_cursor` of the thread, or the cursor returned with the previous page.
+        limit (Optional[int]): The page size (capped at `settings.max_page_size`).
 
     Returns:
-        dict: A list of comments associated with the specified blog post.
+        schemas.CommentReplyPage: The next replies and the cursor of the following ones.
+
+    Raises:
+        HTTPException: If the comment does not exist, or if the cursor belongs to another thread.
     """
-    all_comments = db.query(models.Comment).filter(models.Comment.post_id == id).all()
-    return {"comments": all_comments}
+    path = await db.scalar(select(models.Comment.path).where(models.Comment.id == comment_id, models.Comment.post_id == id))
+    if path is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Comment not found")
+
+    limit = pagination.page_size(limit)
+    stmt = select(models.Comment).where(models.Comment.post_id == id, *subtree(path)).options(*loaders.COMMENT_RESPONSE)
+    if cursor:
+        (after,) = pagination.decode_cursor(cursor, (str,))
+        if not after.startswith(path + "."):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+        stmt = stmt.where(models.Comment.path > after)
+    stmt = stmt.order_by(models.Comment.path).limit(limit + 1)
+    page = pagination.build_page((await db.scalars(stmt)).all(), limit, lambda reply: (reply.path,))
+    return serializers.page_response(page, serializers.comment_reply_response)
 
 
 @router.put("/posts/{id}/comments/{comment_id}")
-def update_comment(updated_comment: schemas.CommentCreate, id: int, comment_id: int, db: Session = Depends(get_db), current_user: int = Depends(oauth2.get_current_user)):
+async def update_comment(updated_comment: schemas.CommentCreate, id: int, comment_id: int, db: AsyncSession = Depends(get_db), current_user: int = Depends(oauth2.get_current_user)):
     """
     Endpoint to update a specific comment within a blog post.
 
@@ -81,7 +209,7 @@ def update_comment(updated_comment: schemas.CommentCreate, id: int, comment_id:
         updated_comment (schemas.CommentCreate): The new content for the comment.
         id (int): The ID of the blog post containing the comment.
         comment_id (int): The ID of the comment to be updated.
-        db (Session): The database session (automatically provided by FastAPI dependency injection).
+        db (AsyncSession): The database session (automatically provided by FastAPI dependency injection).
         current_user (int): The ID of the current user (automatically fetched from OAuth2 dependency).
 
     Returns:
@@ -90,7 +218,7 @@ def update_comment(updated_comment: schemas.CommentCreate, id: int, comment_id:
     Raises:
         HTTPException: If the comment is not found, or if the time to update the comment has exceeded 10 minutes.
     """
-    comment = db.query(models.Comment).filter(models.Comment.post_id == id, models.Comment.id == comment_id, models.Comment.author_id == current_user.id).first()
+    comment = await db.scalar(select(models.Comment).where(models.Comment.post_id == id, models.Comment.id == comment_id, models.Comment.author_id == current_user.id))
 
     if not comment:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Comment not found")
@@ -100,21 +228,23 @@ def update_comment(updated_comment: schemas.CommentCreate, id: int, comment_id:
     
     comment.created_at = datetime.utcnow()
     comment.content = updated_comment.content
-    db.commit()
-    db.refresh(comment)
+    await db.execute(update(models.BlogPost).where(models.BlogPost.id == id).values(version=models.BlogPost.version + 1).execution_options(synchronize_session=False))
+    await db.commit()
+    cache.invalidate_post(id)
+    await db.refresh(comment)
     return comment
 
 
 @router.delete("/posts/{comment_id}/{id}/delete")
-def delete_comment(comment_id: int, id: int, current_user: int = Depends(oauth2.get_current_user), db: Session = Depends(get_db)):
+async def delete_comment(comment_id: int, id: int, current_user: int = Depends(oauth2.get_current_user), db: AsyncSession = Depends(get_db)):
     """
-    Endpoint to delete a specific comment from a blog post.
+    Endpoint to delete a specific comment from a blog post, along with its replies.
 
     Args:
         comment_id (int): The ID of the comment to be deleted.
         id (int): The ID of the blog post containing the comment.
         current_user (int): The ID of the current user (automatically fetched from OAuth2 dependency).
-        db (Session): The database session (automatically provided by FastAPI dependency injection).
+        db (AsyncSession): The database session (automatically provided by FastAPI dependency injection).
 
     Returns:
         dict: A success message indicating the comment was deleted.
@@ -122,12 +252,17 @@ def delete_comment(comment_id: int, id: int, current_user: int = Depends(oauth2.
     Raises:
         HTTPException: If the comment does not exist or if the user is not authorized to delete the comment.
     """
-    existing_comment = db.query(models.Comment).filter(models.Comment.post_id == id, models.Comment.id == comment_id, models.Comment.author_id == current_user.id).first()
+    existing_comment = await db.scalar(select(models.Comment).where(models.Comment.post_id == id, models.Comment.id == comment_id, models.Comment.author_id == current_user.id))
     if not existing_comment:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Comment does not exist")
     
 
-    db.delete(existing_comment)
-    db.commit()
+    # The comment and its whole subtree, in one range delete
+    path = existing_comment.path
+    stmt = delete(models.Comment).where(models.Comment.post_id == id, models.Comment.path >= path, models.Comment.path < path + "/").execution_options(synchronize_session=False)
+    deleted = (await db.execute(stmt)).rowcount
+    await db.execute(update(models.BlogPost).where(models.BlogPost.id == id).values(comment_count=models.BlogPost.comment_count - deleted, version=models.BlogPost.version + 1).execution_options(synchronize_session=False))
+    await db.commit()
+    cache.invalidate_post(id)
     return {"Message": "Comment deleted successfully"}
     
\ No newline at end of file
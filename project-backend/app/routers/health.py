@@ -0,0 +1,39 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+# import database [UVICORN]
+import app.database as database
+# import timing [UVICORN]
+import app.timing as timing
+
+router = APIRouter(
+    tags=["Health Endpoint"],
+    route_class=timing.TimedRoute
+)
+
+
+@router.get("/health/db/", status_code=status.HTTP_200_OK)
+async def database_health(db: AsyncSession = Depends(database.get_db)):
+    """
+    Endpoint to check database connectivity and inspect the connection pool of this worker.
+
+    Args:
+        db (AsyncSession): The database session (automatically provided by FastAPI dependency injection).
+
+    Returns:
+        dict: The database status and the pool state (checked-out, idle and overflow
+        connections, pool limits, and checkout wait statistics).
+
+    Raises:
+        HTTPException: 503 if the database cannot be reached.
+    """
+    try:
+        await db.execute(text("SELECT 1"))
+    except SQLAlchemyError:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Database unavailable")
+
+    return {
+        "database": "ok",
+        "pool": database.pool_metrics.snapshot(database.async_engine.pool),
+    }
@@ -1,23 +1,113 @@
 from fastapi import APIRouter, Depends, status, HTTPException, Response
 # import models, schemas, oauth2 [UVICORN]
-import app.models as models, app.schemas as schemas, app.oauth2 as oauth2
-from sqlalchemy.orm import Session
+import app.models as models, app.schemas as schemas, app.oauth2 as oauth2, app.outbox as outbox, app.cache as cache
+from sqlalchemy import delete, exists, literal, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
 # from database import get_db [UVICRON]
 from app.database import get_db
+# from config import settings [UVICORN]
+from app.config import settings
+from typing import List
 import re
+# import timing [UVICORN]
+import app.timing as timing
 
 router = APIRouter(
-    tags=['Like Endpoint']
+    tags=['Like Endpoint'],
+    route_class=timing.TimedRoute
 )
 
+
+def like_statement(user_id: int, post_ids: List[int]):
+    """
+    Build the single statement that likes posts and bumps their like counters.
+
+    The like rows are inserted with ON CONFLICT DO NOTHING, so a post already liked
+    by the user (or a post that does not exist) is skipped, and only the posts
+    that actually gained a like get their counter incremented.
+
+    Args:
+        user_id (int): The ID of the user liking the posts.
+        post_ids (List[int]): The IDs of the posts to like.
+
+    Returns:
+        Update: A statement returning the ID and author of every newly liked post.
+    """
+    new_likes = (
+        insert(models.Like)
+        .from_select(["user_id", "post_id"], select(literal(user_id), models.BlogPost.id).where(models.BlogPost.id.in_(post_ids)))
+        .on_conflict_do_nothing(index_elements=[models.Like.user_id, models.Like.post_id])
+        .returning(models.Like.post_id)
+        .cte("new_likes")
+    )
+    return (
+        update(models.BlogPost)
+        .where(models.BlogPost.id == new_likes.c.post_id)
+        .values(like_count=models.BlogPost.like_count + 1, version=models.BlogPost.version + 1)
+        .returning(models.BlogPost.id, models.BlogPost.author_id)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def unlike_statement(user_id: int, post_ids: List[int]):
+    """
+    Build the single statement that unlikes posts and decrements their like counters.
+
+    Args:
+        user_id (int): The ID of the user unliking the posts.
+        post_ids (List[int]): The IDs of the posts to unlike.
+
+    Returns:
+        Update: A statement returning the ID of every post that lost a like.
+    """
+    removed_likes = (
+        delete(models.Like)
+        .where(models.Like.user_id == user_id, models.Like.post_id.in_(post_ids))
+        .returning(models.Like.post_id)
+        .cte("removed_likes")
+    )
+    return (
+        update(models.BlogPost)
+        .where(models.BlogPost.id == removed_likes.c.post_id)
+        .values(like_count=models.BlogPost.like_count - 1, version=models.BlogPost.version + 1)
+        .returning(models.BlogPost.id)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def notify_authors(db: AsyncSession, current_user, liked_posts):
+    """
+    Queue a notification for the author of every newly liked post (except the liker's own posts).
+
+    Args:
+        db (AsyncSession): The database session.
+        current_user (models.User): The user who liked the posts.
+        liked_posts (Iterable): (post ID, author ID) pairs returned by `like_statement`.
+    """
+    for post_id, author_id in liked_posts:
+        outbox.enqueue(db, outbox.LIKE, current_user.id, author_id, post_id)
+
+
+async def ensure_post_exists(db: AsyncSession, id: int):
+    """
+    Raise a 404 if the post does not exist. Only called when a like statement changed nothing.
+    """
+    if not await db.scalar(select(exists().where(models.BlogPost.id == id))):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found")
+
+
 @router.post("/posts/{id}/like")
-def like_post(id: int, db: Session = Depends(get_db), current_user: int = Depends(oauth2.get_current_user)):
+async def like_post(id: int, db: AsyncSession = Depends(get_db), current_user: int = Depends(oauth2.get_current_user)):
     """
     Endpoint to like a blog post.
 
+    Liking is idempotent: liking a post twice leaves a single like. The like and
+    the counter update run as one statement, so concurrent clicks cannot both count.
+
     Args:
         id (int): The ID of the blog post to be liked.
-        db (Session): The database session (automatically provided by FastAPI dependency injection).
+        db (AsyncSession): The database session (automatically provided by FastAPI dependency injection).
         current_user (int): The ID of the current user (automatically fetched from OAuth2 dependency).
 
     Returns:
@@ -26,48 +116,29 @@ def like_post(id: int, db: Session = Depends(get_db), current_user: int = Depend
     Raises:
         HTTPException: 
             - 404: If the post with the specified ID does not exist.
-            - 429: If the current user has already liked the post.
     """
-    post = db.query(models.BlogPost).filter(models.BlogPost.id == id).first()
+    liked_posts = (await db.execute(like_statement(current_user.id, [id]))).all()
 
-    if not post:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found")
-    
-    like_query = db.query(models.Like).filter(models.Like.post_id == id, models.Like.user_id == current_user.id)
-    found_like = like_query.first()
-
-    if found_like:
-        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Post already liked")
-    
-    new_like = models.Like(user_id = current_user.id, post_id = id)
-    db.add(new_like)
-
-    if current_user.id == post.author_id:
-        pass
-    else:
-        message = f"{current_user.email} liked your post"
-
-        new_notification = models.Notification(
-            user_id=post.author_id,
-            post_id=id,
-            message=message
-        )
-        db.add(new_notification)
-
-    # print(message)
-    db.commit()
-    # db.refresh(new_like)
+    if not liked_posts:
+        await ensure_post_exists(db, id)
+
+    notify_authors(db, current_user, liked_posts)
+    await db.commit()
+    if liked_posts:
+        cache.invalidate_post(id)
     return {"Message": "Post liked"}
 
 
 @router.delete("/posts/{id}/unlike")
-def unlike_post(id: int, db: Session = Depends(get_db), current_user: int = Depends(oauth2.get_current_user)):
+async def unlike_post(id: int, db: AsyncSession = Depends(get_db), current_user: int = Depends(oauth2.get_current_user)):
     """
     Endpoint to unlike a blog post.
 
+    Unliking is idempotent: unliking a post that is not liked is a no-op.
+
     Args:
         id (int): The ID of the blog post to be unliked.
-        db (Session): The database session (automatically provided by FastAPI dependency injection).
+        db (AsyncSession): The database session (automatically provided by FastAPI dependency injection).
         current_user (int): The ID of the current user (automatically fetched from OAuth2 dependency).
 
     Returns:
@@ -76,20 +147,51 @@ def unlike_post(id: int, db: Session = Depends(get_db), current_user: int = Depe
     Raises:
         HTTPException: 
             - 404: If the post with the specified ID does not exist.
-            - 400: If the current user has not liked the post.
     """
-    post = db.query(models.BlogPost).filter(models.BlogPost.id == id).first()
-    
-    if not post:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not exist")
-    
-    unlike_query = db.query(models.Like).filter(models.Like.post_id == id, models.Like.user_id == current_user.id)
-    found_unlike = unlike_query.first()
-
-    if not found_unlike:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Like not found")
-    
-    unlike_query.delete(synchronize_session=False)
-    db.commit()
+    unliked_posts = (await db.execute(unlike_statement(current_user.id, [id]))).all()
+
+    if not unliked_posts:
+        await ensure_post_exists(db, id)
+
+    await db.commit()
+    if unliked_posts:
+        cache.invalidate_post(id)
     return {"message": "Post unliked"}
 
+
+@router.post("/posts/likes/batch", response_model=schemas.LikeBatchResponse)
+async def batch_like_posts(batch: schemas.LikeBatch, db: AsyncSession = Depends(get_db), current_user: int = Depends(oauth2.get_current_user)):
+    """
+    Endpoint to like or unlike several blog posts in one statement.
+
+    Posts that do not exist, or are already in the requested state, are skipped.
+
+    Args:
+        batch (schemas.LikeBatch): The IDs of the posts and whether to like or unlike them.
+        db (AsyncSession): The database session (automatically provided by FastAPI dependency injection).
+        current_user (int): The ID of the current user (automatically fetched from OAuth2 dependency).
+
+    Returns:
+        schemas.LikeBatchResponse: The IDs of the posts whose like state changed.
+
+    Raises:
+        HTTPException: 
+            - 400: If the batch targets more than `settings.max_like_batch_size` posts.
+    """
+    post_ids = list(dict.fromkeys(batch.post_ids))
+    if len(post_ids) > settings.max_like_batch_size:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"A batch can target at most {settings.max_like_batch_size} posts")
+
+    if not post_ids:
+        return {"action": batch.action, "changed": []}
+
+    if batch.action == "like":
+        changed = (await db.execute(like_statement(current_user.id, post_ids))).all()
+        notify_authors(db, current_user, changed)
+    else:
+        changed = (await db.execute(unlike_statement(current_user.id, post_ids))).all()
+
+    await db.commit()
+    for row in changed:
+        cache.invalidate_post(row.id)
+    return {"action": batch.action, "changed": sorted(row.id for row in changed)}
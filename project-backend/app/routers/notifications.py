@@ -1,26 +1,239 @@
-from fastapi import APIRouter, Depends, status, HTTPException, Response
-# import models, schemas, oauth2 [UVICORN]
-import app.models as models, app.schemas as schemas, app.oauth2 as oauth2
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, status, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+# import models, schemas, oauth2, pagination [UVICORN]
+import app.models as models, app.schemas as schemas, app.oauth2 as oauth2, app.pagination as pagination, app.outbox as outbox
+from sqlalchemy import delete, func, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
 # from database import get_db [UVIRCORN]
-from app.database import get_db
+from app.database import get_db, get_session_factory
+# from config import settings [UVICORN]
+from app.config import settings
+# from hub import notification_hub [UVICORN]
+from app.hub import Subscription, notification_hub
+from datetime import datetime
+import asyncio
+from typing import Optional
+# import timing [UVICORN]
+import app.timing as timing
 
 router = APIRouter(
-    tags=["Notificaions Endpoint"]
+    tags=["Notificaions Endpoint"],
+    route_class=timing.TimedRoute
 )
 
-@router.get("/notifications")
-def get_notifications(db: Session = Depends(get_db), current_user: int = Depends(oauth2.get_current_user)):
+# Notifications are listed newest first; the id breaks ties between notifications sent at the same instant
+NOTIFICATION_ORDER = (models.Notification.timestamp, models.Notification.id)
+NOTIFICATION_CURSOR_TYPES = (datetime, int)
+
+# Must match the predicate of the partial index `ix_notifications_user_id_unread` for it to be used
+UNREAD = models.Notification.is_read == False
+
+
+@router.get("/notifications", response_model=schemas.NotificationPage)
+async def get_notifications(db: AsyncSession = Depends(get_db), current_user: int = Depends(oauth2.get_current_user), cursor: Optional[str] = None, limit: Optional[int] = None):
+    """
+    Endpoint to retrieve the notifications of the current user, one page at a time.
+
+    Messages are rendered from each notification's kind and actors (e.g. "ada and
+    41 others liked your post"), with the actors' emails loaded in one query per page.
+
+    Args:
+        db (AsyncSession): The database session (automatically provided by FastAPI dependency injection).
+        current_user (int): The ID of the current user (automatically fetched from OAuth2 dependency).
+        cursor (Optional[str]): The cursor returned with the previous page.
+        limit (Optional[int]): The page size (capped at `settings.max_page_size`).
+
+    Returns:
+        schemas.NotificationPage: A page of notifications, ordered by timestamp in descending order, and the cursor of the next page.
+
+    """
+    limit = pagination.page_size(limit)
+    stmt = pagination.keyset(select(models.Notification).where(models.Notification.user_id == current_user.id), NOTIFICATION_ORDER, cursor, limit, NOTIFICATION_CURSOR_TYPES)
+    notifications = (await db.scalars(stmt)).all()
+    page = pagination.build_page(notifications, limit, lambda notification: (notification.timestamp, notification.id))
+    page["items"] = await outbox.render(db, page["items"])
+    return page
+
+
+async def notifications_after(db: AsyncSession, user_id: int, after_seq: int):
+    """
+    Load the notifications of a user delivered after a given `seq`, oldest first.
+
+    The transaction is closed before returning, so an idle stream does not hold a
+    pooled connection between two reads.
+
+    Args:
+        db (AsyncSession): The database session.
+        user_id (int): The ID of the user.
+        after_seq (int): The `seq` of the last notification the client received.
+
+    Returns:
+        List[tuple]: At most `settings.max_page_size` (seq, schemas.NotificationResponse) pairs.
+    """
+    stmt = select(models.Notification).where(models.Notification.user_id == user_id, models.Notification.seq > after_seq).order_by(models.Notification.seq).limit(settings.max_page_size)
+    notifications = (await db.scalars(stmt)).all()
+    # Read before the rollback expires the loaded notifications
+    missed = list(zip((notification.seq for notification in notifications), await outbox.render(db, notifications)))
+    await db.rollback()
+    return missed
+
+
+def format_event(seq: int, notification: schemas.NotificationResponse):
+    """
+    Format a notification as a Server-Sent Event whose ID is the notification's delivery `seq`.
+    """
+    return f"id: {seq}\nevent: notification\ndata: {notification.model_dump_json()}\n\n"
+
+
+async def notification_events(db: AsyncSession, subscription: Subscription, last_event_id: Optional[int] = None):
+    """
+    Generate the Server-Sent Events of a notification stream.
+
+    Event IDs are delivery `seq` values rather than notification IDs: a user's
+    notifications commit in `seq` order (see outbox.drain_outbox), and a merged
+    notification gets a new `seq`, so "everything after the last event ID" never
+    skips a notification. Notifications missed since `last_event_id` are replayed
+    from the database first; after that, new ones come from the hub. Every
+    `notification_stream_heartbeat_seconds` without activity a heartbeat comment
+    is sent and the database is checked for notifications delivered by other
+    workers. If the client falls behind and its queue overflows, the queued events
+    are dropped and the stream catches up from the database instead.
+
+    Args:
+        db (AsyncSession): The database session used for catching up.
+        subscription (Subscription): The hub subscription of the connection.
+        last_event_id (Optional[int]): The `seq` of the last notification the client received, if resuming.
+
+    Yields:
+        str: Encoded events.
+    """
+    if last_event_id is None:
+        last_event_id = await db.scalar(select(func.coalesce(func.max(models.Notification.seq), 0)).where(models.Notification.user_id == subscription.user_id))
+        await db.rollback()
+
+    catch_up = True
+    while True:
+        while catch_up:
+            missed = await notifications_after(db, subscription.user_id, last_event_id)
+            for seq, notification in missed:
+                last_event_id = seq
+                yield format_event(seq, notification)
+            catch_up = len(missed) == settings.max_page_size
+
+        if subscription.overflowed:
+            while not subscription.queue.empty():
+                subscription.queue.get_nowait()
+            subscription.overflowed = False
+            catch_up = True
+            continue
+
+        try:
+            seq, notification = await asyncio.wait_for(subscription.queue.get(), timeout=settings.notification_stream_heartbeat_seconds)
+        except asyncio.TimeoutError:
+            yield ": heartbeat\n\n"
+            catch_up = True
+            continue
+
+        # Skip what a catch-up already sent
+        if seq > last_event_id:
+            last_event_id = seq
+            yield format_event(seq, notification)
+
+
+@router.get("/notifications/stream")
+async def stream_notifications(request: Request, session_factory = Depends(get_session_factory), current_user: int = Depends(oauth2.get_current_user)):
     """
-    Endpoint to retrieve all notifications for the current user.
+    Endpoint streaming new notifications of the current user as Server-Sent Events.
+
+    Clients that reconnect with a `Last-Event-ID` header (the `seq` of the last
+    event they received) receive the notifications they missed first.
 
     Args:
-        db (Session): The database session (automatically provided by FastAPI dependency injection).
+        request (Request): The request, read for the `Last-Event-ID` header.
+        session_factory (async_sessionmaker): Opens the session of the stream, which outlives the request's.
         current_user (int): The ID of the current user (automatically fetched from OAuth2 dependency).
 
     Returns:
-        List[schemas.NotificationResponse]: A list of notifications for the current user, ordered by timestamp in descending order.
+        StreamingResponse: A `text/event-stream` response.
 
+    Raises:
+        HTTPException: If the `Last-Event-ID` header is not an event ID.
     """
-    notifications = db.query(models.Notification).filter(models.Notification.user_id == current_user.id).order_by(models.Notification.timestamp.desc()).all()
-    return notifications
\ No newline at end of file
+    last_event_id = request.headers.get("last-event-id")
+    if last_event_id is not None:
+        if not last_event_id.isdigit():
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid Last-Event-ID")
+        last_event_id = int(last_event_id)
+
+    async def events():
+        # Subscribed once the body is iterated, so that a client gone before that leaves
+        # nothing behind, and before reading the database so that nothing falls in between
+        subscription = notification_hub.subscribe(current_user.id)
+        try:
+            # The stream outlives the request's session, so it uses a session of its own
+            async with session_factory() as db:
+                async for event in notification_events(db, subscription, last_event_id):
+                    yield event
+        finally:
+            notification_hub.unsubscribe(subscription)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@router.get("/notifications/unread-count", response_model=schemas.UnreadCount)
+async def get_unread_count(db: AsyncSession = Depends(get_db), current_user: int = Depends(oauth2.get_current_user)):
+    """
+    Endpoint to count the unread notifications of the current user.
+
+    The count only reads the partial index on unread rows, so it stays cheap however
+    many (read) notifications the user has accumulated.
+
+    Args:
+        db (AsyncSession): The database session (automatically provided by FastAPI dependency injection).
+        current_user (int): The ID of the current user (automatically fetched from OAuth2 dependency).
+
+    Returns:
+        schemas.UnreadCount: The number of unread notifications.
+    """
+    unread = await db.scalar(select(func.count()).select_from(models.Notification).where(models.Notification.user_id == current_user.id, UNREAD))
+    return {"unread": unread}
+
+
+@router.post("/notifications/mark-read", response_model=schemas.NotificationMarkReadResponse)
+async def mark_notifications_read(marked: schemas.NotificationMarkRead, db: AsyncSession = Depends(get_db), current_user: int = Depends(oauth2.get_current_user)):
+    """
+    Endpoint to mark notifications of the current user as read, in a single statement.
+
+    With `ids`, only those notifications are marked. With `cursor` (a `next_cursor`
+    returned by the listing), every notification listed up to and including that
+    page is marked. With neither, every notification is marked.
+
+    Args:
+        marked (schemas.NotificationMarkRead): The notifications to mark as read.
+        db (AsyncSession): The database session (automatically provided by FastAPI dependency injection).
+        current_user (int): The ID of the current user (automatically fetched from OAuth2 dependency).
+
+    Returns:
+        schemas.NotificationMarkReadResponse: The number of notifications that were marked as read.
+
+    Raises:
+        HTTPException: If both `ids` and `cursor` are given, too many IDs are given, or the cursor is invalid.
+    """
+    stmt = update(models.Notification).where(models.Notification.user_id == current_user.id, UNREAD)
+
+    if marked.ids is not None and marked.cursor is not None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Give either ids or cursor, not both")
+
+    if marked.ids is not None:
+        if len(marked.ids) > settings.max_page_size:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"At most {settings.max_page_size} ids can be marked at once")
+        stmt = stmt.where(models.Notification.id.in_(marked.ids))
+    elif marked.cursor is not None:
+        stmt = stmt.where(tuple_(*NOTIFICATION_ORDER) >= tuple_(*pagination.decode_cursor(marked.cursor, NOTIFICATION_CURSOR_TYPES)))
+
+    # Read notifications are never merged into again, so their recorded actors go in the same statement
+    marked = stmt.values(is_read=True).returning(models.Notification.id).cte("marked")
+    pruned = delete(models.NotificationActor).where(models.NotificationActor.notification_id.in_(select(marked.c.id))).cte("pruned")
+    updated = await db.scalar(select(func.count()).select_from(marked).add_cte(pruned))
+    await db.commit()
+    return {"updated": updated}
@@ -1,26 +1,32 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import EmailStr
-from sqlalchemy.orm import Session
+from collections import Counter
+from sqlalchemy import Integer, column, delete, select, update, values
+from sqlalchemy.orm import aliased
+from sqlalchemy.ext.asyncio import AsyncSession
 # import database, models, schemas, utils [UVICRON]
-import app.database as database, app.models as models, app.schemas as schemas, app.utils as utils
+import app.database as database, app.models as models, app.schemas as schemas, app.utils as utils, app.serializers as serializers, app.cache as cache
 from sqlalchemy.exc import IntegrityError
 # import oauth2 [UVICOON]
 import app.oauth2 as oauth2
 from typing import List
+# import timing [UVICORN]
+import app.timing as timing
 
 router = APIRouter(
     # prefix="/user",
-    tags=["Signing in new users"]
+    tags=["Signing in new users"],
+    route_class=timing.TimedRoute
 )
 
 @router.post("/signup/", status_code=status.HTTP_201_CREATED, response_model=schemas.UserResponse)
-def create_user(user: schemas.UserCreate, db: Session = Depends(database.get_db)):
+async def create_user(user: schemas.UserCreate, db: AsyncSession = Depends(database.get_db)):
     """
     Endpoint to sign up a new user.
 
     Args:
         user (schemas.UserCreate): The user creation data including email and password.
-        db (Session): The database session (provided by FastAPI dependency injection).
+        db (AsyncSession): The database session (provided by FastAPI dependency injection).
 
     Returns:
         schemas.UserResponse: The created user object.
@@ -28,45 +34,46 @@ def create_user(user: schemas.UserCreate, db: Session = Depends(database.get_db)
     Raises:
         HTTPException: If the user already exists.
     """
-    hashed_password = utils.get_password_hash(user.password)
+    hashed_password = await utils.hash_password_async(user.password)
     user.password = hashed_password
     new_user = models.User(**user.dict())
 
     try:
         db.add(new_user)
 
-        db.commit()
-        db.refresh(new_user)
+        await db.commit()
+        await db.refresh(new_user)
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="User already exists")
     return new_user
 
 
 # ADMIN ROLE
 @router.get("/getallusers/", status_code=status.HTTP_200_OK, response_model=List[schemas.UserResponse])
-def get_users(db: Session = Depends(database.get_db)):
+async def get_users(db: AsyncSession = Depends(database.get_db)):
     """
     Endpoint to retrieve all users. 
 
     Args:
-        db (Session): The database session (provided by FastAPI dependency injection).
+        db (AsyncSession): The database session (provided by FastAPI dependency injection).
 
     Returns:
         List[schemas.UserResponse]: A list of all users.
     """
-    all_users = db.query(models.User).all()
-    return all_users
+    # Row tuples serialized by the fast path: no ORM objects, no per-row validation
+    all_users = (await db.execute(select(*serializers.USER_RESPONSE_COLUMNS))).all()
+    return serializers.rows_response(all_users)
 
 
 @router.get("/getuser/{email}/", response_model=schemas.UserResponse)
-def get_user(email: EmailStr, db: Session = Depends(database.get_db), current_user: int = Depends(oauth2.get_current_user)):
+async def get_user(email: EmailStr, db: AsyncSession = Depends(database.get_db), current_user: int = Depends(oauth2.get_current_user)):
     """
     Endpoint to retrieve a user by their email.
 
     Args:
         email (EmailStr): The email of the user to retrieve.
-        db (Session): The database session (provided by FastAPI dependency injection).
+        db (AsyncSession): The database session (provided by FastAPI dependency injection).
         current_user (int): The ID of the currently authenticated user (fetched via OAuth2).
 
     Returns:
@@ -75,20 +82,20 @@ def get_user(email: EmailStr, db: Session = Depends(database.get_db), current_us
     Raises:
         HTTPException: If the user does not exist.
     """
-    user = db.query(models.User).filter(models.User.email == email).first()
+    user = await db.scalar(select(models.User).where(models.User.email == email))
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User does not exist")
     return user
 
 
 @router.put("/update/", response_model=schemas.UserResponse)
-def update_profile_info(updated_user: schemas.UserUpdate, db: Session = Depends(database.get_db), current_user: int = Depends(oauth2.get_current_user)):
+async def update_profile_info(updated_user: schemas.UserUpdate, db: AsyncSession = Depends(database.get_db), current_user: int = Depends(oauth2.get_current_user)):
     """
     Endpoint to update the profile information of the current user.
 
     Args:
         updated_user (schemas.UserUpdate): The updated user data.
-        db (Session): The database session (provided by FastAPI dependency injection).
+        db (AsyncSession): The database session (provided by FastAPI dependency injection).
         current_user (int): The ID of the currently authenticated user (fetched via OAuth2).
 
     Returns:
@@ -97,39 +104,40 @@ def update_profile_info(updated_user: schemas.UserUpdate, db: Session = Depends(
     Raises:
         HTTPException: If the email is required or already taken, or if the user does not exist.
     """
-    user = db.query(models.User).filter(models.User.email == current_user.email).first()
+    user = await db.scalar(select(models.User).where(models.User.email == current_user.email))
     print(user)
     print(current_user.id)
     if not updated_user.email:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email is required")
     
     if updated_user.email:
-        existing_user = db.query(models.User).filter(models.User.email == updated_user.email).first()
+        existing_user = await db.scalar(select(models.User).where(models.User.email == updated_user.email))
         if existing_user and existing_user.id != current_user.id:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already taken.")
     
-    user_query = db.query(models.User).filter(models.User.id == current_user.id)
-    user = user_query.first()
+    user = await db.get(models.User, current_user.id)
     
     if user == None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"User not found")
     
     update_user = updated_user.dict(exclude_unset=True)
-    user_query.update(update_user, synchronize_session=False)
+    await db.execute(update(models.User).where(models.User.id == current_user.id).values(**update_user).execution_options(synchronize_session=False))
 
-    db.commit()
+    await db.commit()
+    oauth2.invalidate_user(current_user.id)
+    await db.refresh(user)
     
     return user
     
 
 @router.put("/change-password/", status_code=status.HTTP_200_OK)
-def change_password(updated_password: schemas.ChangePassword, db: Session = Depends(database.get_db), current_user: int = Depends(oauth2.get_current_user)):
+async def change_password(updated_password: schemas.ChangePassword, db: AsyncSession = Depends(database.get_db), current_user: int = Depends(oauth2.get_current_user)):
     """
     Endpoint to change the password of the current user.
 
     Args:
         updated_password (schemas.ChangePassword): The new password data including old and new passwords.
-        db (Session): The database session (provided by FastAPI dependency injection).
+        db (AsyncSession): The database session (provided by FastAPI dependency injection).
         current_user (int): The ID of the currently authenticated user (fetched via OAuth2).
 
     Returns:
@@ -138,27 +146,28 @@ def change_password(updated_password: schemas.ChangePassword, db: Session = Depe
     Raises:
         HTTPException: If the old password does not match or if the user is not found.
     """
-    user = db.query(models.User).filter(models.User.id == current_user.id).first()
+    user = await db.get(models.User, current_user.id)
 
-    if not utils.verify_password(updated_password.old_password, user.password):
+    if not await utils.verify_password_async(updated_password.old_password, user.password):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Old password does not match")
     
-    hashed_password = utils.get_password_hash(updated_password.new_password)
+    hashed_password = await utils.hash_password_async(updated_password.new_password)
     user.password = hashed_password
 
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    oauth2.invalidate_user(user.id)
+    await db.refresh(user)
 
     return {"message": "Password changed successfully"}
 
 @router.put("/reset-password/")
-def reset_password(reset_data = schemas.UserBase, db: Session = Depends(database.get_db)):
+async def reset_password(reset_data = schemas.UserBase, db: AsyncSession = Depends(database.get_db)):
     """
     Endpoint to initiate a password reset process.
 
     Args:
         reset_data (schemas.UserBase): Data including the user's email.
-        db (Session): The database session (provided by FastAPI dependency injection).
+        db (AsyncSession): The database session (provided by FastAPI dependency injection).
 
     Returns:
         dict: A success message or a token for password reset.
@@ -166,7 +175,7 @@ def reset_password(reset_data = schemas.UserBase, db: Session = Depends(database
     Raises:
         HTTPException: If the user with the given email does not exist.
     """
-    user = db.query(models.User).filter(models.User.email == reset_data.email).first()
+    user = await db.scalar(select(models.User).where(models.User.email == reset_data.email))
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User with this email does not exist.")
     
@@ -174,13 +183,65 @@ def reset_password(reset_data = schemas.UserBase, db: Session = Depends(database
     # Implemanetation of mail users link
 
 
+async def release_counters(db: AsyncSession, user_id: int):
+    """
+    Remove a user's likes and comment threads from other users' posts and update their counters.
+
+    Deleting the user would cascade to these rows without touching the posts'
+    denormalized `like_count`/`comment_count`. A comment goes with its whole
+    subtree, as when it is deleted on its own. Each affected post is updated once,
+    with its version bumped.
+
+    Args:
+        db (AsyncSession): The database session, in the transaction deleting the user.
+        user_id (int): The ID of the user being deleted.
+
+    Returns:
+        List[int]: The IDs of the posts whose counters changed.
+    """
+    authored = aliased(models.Comment)
+    in_authored_subtree = (
+        select(authored.id)
+        .where(authored.author_id == user_id, authored.post_id == models.Comment.post_id, models.Comment.path >= authored.path, models.Comment.path < authored.path + "/")
+        .exists()
+    )
+    removed_comments = Counter(await db.scalars(
+        delete(models.Comment).where(in_authored_subtree).returning(models.Comment.post_id).execution_options(synchronize_session=False)
+    ))
+    removed_likes = Counter(await db.scalars(
+        delete(models.Like).where(models.Like.user_id == user_id).returning(models.Like.post_id).execution_options(synchronize_session=False)
+    ))
+    post_ids = sorted(removed_comments.keys() | removed_likes.keys())
+    if not post_ids:
+        return []
+
+    removed = values(column("id", Integer), column("likes", Integer), column("comments", Integer), name="removed").data(
+        [(post_id, removed_likes[post_id], removed_comments[post_id]) for post_id in post_ids]
+    )
+    stmt = (
+        update(models.BlogPost)
+        .where(models.BlogPost.id == removed.c.id)
+        .values(
+            like_count=models.BlogPost.like_count - removed.c.likes,
+            comment_count=models.BlogPost.comment_count - removed.c.comments,
+            version=models.BlogPost.version + 1,
+        )
+        .returning(models.BlogPost.id)
+        .execution_options(synchronize_session=False)
+    )
+    return (await db.scalars(stmt)).all()
+
+
 @router.delete("/delete-account/")
-def delete_account(db: Session = Depends(database.get_db), current_user: int = Depends(oauth2.get_current_user)):
+async def delete_account(db: AsyncSession = Depends(database.get_db), current_user: int = Depends(oauth2.get_current_user)):
     """
     Endpoint to delete the current user's account.
 
+    The user's posts, likes and comments go in the same transaction as the user,
+    and the counters of the posts they liked or commented on are updated.
+
     Args:
-        db (Session): The database session (provided by FastAPI dependency injection).
+        db (AsyncSession): The database session (provided by FastAPI dependency injection).
         current_user (int): The ID of the currently authenticated user (fetched via OAuth2).
 
     Returns:
@@ -189,22 +250,23 @@ def delete_account(db: Session = Depends(database.get_db), current_user: int = D
     Raises:
         HTTPException: If the user is not found.
     """
-    delete_query = db.query(models.User).filter(models.User.id == current_user.id)
-    delete_user = delete_query.first()
-    
-    db.query(models.BlogPost).filter(models.BlogPost.author_id == delete_user.id).delete(synchronize_session=False)
-    db.commit()
-
-    # delete_associations = db.query(models.post_tag_association).filter(models.post_tag_association.c.post_id == id)
-    # delete_associations.delete(synchronize_session=False)
+    delete_user = await db.get(models.User, current_user.id)
 
     if not delete_user:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="User not found")
 
-    # db.query(models.User).filter(models.BlogPost.author_id == delete_user.id)
+    # delete_associations = db.query(models.post_tag_association).filter(models.post_tag_association.c.post_id == id)
+    # delete_associations.delete(synchronize_session=False)
+
+    stmt = delete(models.BlogPost).where(models.BlogPost.author_id == delete_user.id).returning(models.BlogPost.id).execution_options(synchronize_session=False)
+    deleted_post_ids = (await db.scalars(stmt)).all()
+    changed_post_ids = await release_counters(db, current_user.id)
 
-    delete_query.delete(synchronize_session=False)
-    db.commit()
+    await db.execute(delete(models.User).where(models.User.id == current_user.id).execution_options(synchronize_session=False))
+    await db.commit()
+    oauth2.invalidate_user(current_user.id)
+    for post_id in [*deleted_post_ids, *changed_post_ids]:
+        cache.invalidate_post(post_id)
     
     return {"message": "Account deleted succesfully"}
 # Endpoint to handle searching of users
\ No newline at end of file
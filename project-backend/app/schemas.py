@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr, constr
-from typing import List, Optional
+from pydantic import BaseModel, EmailStr, constr, field_validator
+from typing import List, Literal, Optional
 from datetime import datetime
 
 
@@ -17,6 +17,7 @@ class TokenData(BaseModel):
     Schema to store token-related data.
     """
     id: Optional[int] = None
+    exp: Optional[int] = None
 
 # Base schema for user model
 class UserBase(BaseModel):
@@ -108,7 +109,7 @@ class CommentCreate(CommentBase):
     Schema for creating a new comment. Inherits from CommentBase.
     """
     # post_id: int  # Commented out post_id field
-    pass
+    parent_id: Optional[int] = None
 
 # Schema for returning comment information
 class CommentResponse(CommentBase):
@@ -122,6 +123,39 @@ class CommentResponse(CommentBase):
     class Config:
         orm_mode = True
 
+# Schema for returning a reply within a comment thread
+class CommentReply(CommentResponse):
+    """
+    Schema for returning a reply, with the comment it answers and its depth in the thread (1 for a direct reply).
+    """
+    parent_id: int
+    depth: int
+
+# Schema for returning a top-level comment with the start of its thread
+class CommentThread(CommentResponse):
+    """
+    Schema for returning a top-level comment along with its first replies, depth-first,
+    and the cursor to load the remaining ones (None when the thread is complete).
+    """
+    replies: List[CommentReply] = []
+    replies_cursor: Optional[str] = None
+
+# Schema for returning a page of comment threads
+class CommentPage(BaseModel):
+    """
+    Schema for returning one page of top-level comments along with the cursor of the next page.
+    """
+    items: List[CommentThread]
+    next_cursor: Optional[str] = None
+
+# Schema for returning more replies of a thread
+class CommentReplyPage(BaseModel):
+    """
+    Schema for returning the next replies of a thread along with the cursor of the following ones.
+    """
+    items: List[CommentReply]
+    next_cursor: Optional[str] = None
+
 # Base schema for blog posts
 class BlogPostBase(BaseModel):
     """
@@ -162,10 +196,80 @@ class BlogPostResponse(BlogPostBase):
     tags: List[TagResponse]
     comments: List[CommentResponse]
     author: UserNameResponse
+    like_count: int = 0
+    comment_count: int = 0
+    excerpt: Optional[str] = None
+    word_count: int = 0
+    reading_time_minutes: int = 0
+
+    # A post loaded from the database carries its Category; it is returned by name
+    @field_validator("category", mode="before")
+    @classmethod
+    def category_name(cls, category):
+        return getattr(category, "name", category)
 
     class Config:
         orm_mode = True
 
+# Schema for returning a page of blog posts
+class BlogPostPage(BaseModel):
+    """
+    Schema for returning one page of blog posts along with the cursor of the next page.
+    """
+    items: List[BlogPostResponse]
+    next_cursor: Optional[str] = None
+
+# Schema for returning a blog post of a listing
+class BlogPostSparseResponse(BaseModel):
+    """
+    Schema for returning a blog post of a listing: the fields of BlogPostResponse, each
+    present only when requested with `fields` (and `content` replaced by `excerpt` in excerpt mode).
+    """
+    title: Optional[str] = None
+    content: Optional[str] = None
+    id: Optional[int] = None
+    slug: Optional[str] = None
+    published_at: Optional[datetime] = None
+    is_published: Optional[bool] = None
+    category: Optional[str] = None
+    tags: Optional[List[TagResponse]] = None
+    comments: Optional[List[CommentResponse]] = None
+    author: Optional[UserNameResponse] = None
+    like_count: Optional[int] = None
+    comment_count: Optional[int] = None
+    excerpt: Optional[str] = None
+    word_count: Optional[int] = None
+    reading_time_minutes: Optional[int] = None
+
+# Schema for returning a page of a blog post listing
+class BlogPostSparsePage(BaseModel):
+    """
+    Schema for returning one page of a blog post listing along with the cursor of the next page.
+    """
+    items: List[BlogPostSparseResponse]
+    next_cursor: Optional[str] = None
+
+# Schema for returning a single full-text search hit
+class BlogPostSearchResult(BaseModel):
+    """
+    Schema for returning a blog post matched by a full-text search, with its rank and a highlighted snippet.
+    """
+    id: int
+    title: str
+    slug: str
+    published_at: Optional[datetime] = None
+    author: UserNameResponse
+    rank: float
+    snippet: str
+
+# Schema for returning a page of search hits
+class BlogPostSearchPage(BaseModel):
+    """
+    Schema for returning one page of search hits, best match first, along with the cursor of the next page.
+    """
+    items: List[BlogPostSearchResult]
+    next_cursor: Optional[str] = None
+
 # Base schema for categories
 class CategoryBase(BaseModel):
     """
@@ -216,6 +320,22 @@ class LikeResponse(LikeBase):
     class Config:
         orm_mode = True
 
+# Schema for liking or unliking several posts at once
+class LikeBatch(BaseModel):
+    """
+    Schema for a batch of likes or unlikes.
+    """
+    post_ids: List[int]
+    action: Literal["like", "unlike"] = "like"
+
+# Schema for returning the outcome of a batch of likes or unlikes
+class LikeBatchResponse(BaseModel):
+    """
+    Schema for returning which posts a batch of likes or unlikes changed.
+    """
+    action: str
+    changed: List[int]
+
 # Base schema for notifications
 class NotificationBase(BaseModel):
     """
@@ -239,6 +359,39 @@ class NotificationResponse(NotificationBase):
     """
     id: int
     timestamp: datetime
+    post_id: Optional[int] = None
+    kind: Optional[str] = None
+    actor_count: int = 1
 
     class Config:
         orm_mode = True
+
+# Schema for returning a page of notifications
+class NotificationPage(BaseModel):
+    """
+    Schema for returning one page of notifications along with the cursor of the next page.
+    """
+    items: List[NotificationResponse]
+    next_cursor: Optional[str] = None
+
+# Schema for returning the number of unread notifications
+class UnreadCount(BaseModel):
+    """
+    Schema for returning the number of unread notifications of a user.
+    """
+    unread: int
+
+# Schema for marking notifications as read
+class NotificationMarkRead(BaseModel):
+    """
+    Schema for marking notifications as read: the given IDs, everything up to a cursor, or (with neither) everything.
+    """
+    ids: Optional[List[int]] = None
+    cursor: Optional[str] = None
+
+# Schema for returning the outcome of marking notifications as read
+class NotificationMarkReadResponse(BaseModel):
+    """
+    Schema for returning how many notifications were marked as read.
+    """
+    updated: int
@@ -0,0 +1,149 @@
+from typing import Callable, Iterable, Optional, Sequence
+from fastapi.responses import ORJSONResponse
+# import models, timing [UVICORN]
+import app.models as models, app.timing as timing
+
+# Fast serialization path for listings.
+#
+# Validating every row (and every nested comment, tag and author) against the
+# response schemas, then encoding the result with the stdlib json module, is the
+# bulk of a large listing's CPU time. The functions below build the very same
+# JSON documents as the response schemas straight from loaded ORM objects or row
+# tuples, and the endpoints return them as an ORJSONResponse. Each function
+# mirrors one schema: keep them in step (app/tests/test_serializers.py checks it).
+# The response builders report their time as the request's serialization time.
+
+# Columns of UserResponse, in schema order; select them to serialize users from row tuples
+USER_RESPONSE_COLUMNS = (
+    models.User.email,
+    models.User.id,
+    models.User.profile_picture,
+    models.User.bio,
+    models.User.is_active,
+    models.User.is_admin,
+)
+
+
+def user_response(user: models.User):
+    """
+    Build the UserResponse document of a user.
+    """
+    return {
+        "email": user.email,
+        "id": user.id,
+        "profile_picture": user.profile_picture,
+        "bio": user.bio,
+        "is_active": user.is_active,
+        "is_admin": user.is_admin,
+    }
+
+
+def comment_response(comment: models.Comment):
+    """
+    Build the CommentResponse document of a comment loaded with `loaders.COMMENT_RESPONSE`.
+    """
+    return {
+        "content": comment.content,
+        "id": comment.id,
+        "created_at": comment.created_at,
+        "author": user_response(comment.author),
+    }
+
+
+def comment_reply_response(comment: models.Comment):
+    """
+    Build the CommentReply document of a reply loaded with `loaders.COMMENT_RESPONSE`.
+    """
+    document = comment_response(comment)
+    document["parent_id"] = comment.parent_id
+    document["depth"] = comment.path.count(".")
+    return document
+
+
+def comment_thread_response(comment: models.Comment, replies: Sequence[models.Comment], replies_cursor: Optional[str]):
+    """
+    Build the CommentThread document of a top-level comment and its first replies.
+    """
+    document = comment_response(comment)
+    document["replies"] = [comment_reply_response(reply) for reply in replies]
+    document["replies_cursor"] = replies_cursor
+    return document
+
+
+def blog_post_response(post: models.BlogPost):
+    """
+    Build the BlogPostResponse document of a post loaded with `loaders.BLOG_POST_RESPONSE`.
+    """
+    return {
+        "title": post.title,
+        "content": post.content,
+        "id": post.id,
+        "slug": post.slug,
+        "published_at": post.published_at,
+        "is_published": post.is_published,
+        "category": None if post.category is None else post.category.name,
+        "tags": [{"name": tag.name, "id": tag.id} for tag in post.tags],
+        "comments": [comment_response(comment) for comment in post.comments],
+        "author": {"email": post.author.email},
+        "like_count": post.like_count,
+        "comment_count": post.comment_count,
+        "excerpt": post.excerpt,
+        "word_count": post.word_count,
+        "reading_time_minutes": post.reading_time_minutes,
+    }
+
+
+def sparse_blog_post_response(fields: Optional[Sequence[str]]):
+    """
+    Return a builder of BlogPostResponse documents restricted to some fields.
+
+    Args:
+        fields (Optional[Sequence[str]]): The requested fields, in schema order; None for all of them.
+
+    Returns:
+        Callable: Builds the document of a post loaded with `loaders.blog_post_options(fields)`.
+    """
+    if fields is None:
+        return blog_post_response
+
+    def build(post: models.BlogPost):
+        document = {}
+        for field in fields:
+            if field == "category":
+                document[field] = None if post.category is None else post.category.name
+            elif field == "tags":
+                document[field] = [{"name": tag.name, "id": tag.id} for tag in post.tags]
+            elif field == "comments":
+                document[field] = [comment_response(comment) for comment in post.comments]
+            elif field == "author":
+                document[field] = {"email": post.author.email}
+            else:
+                document[field] = getattr(post, field)
+        return document
+    return build
+
+
+def rows_response(rows: Iterable):
+    """
+    Serialize row tuples (e.g. from `select(*USER_RESPONSE_COLUMNS)`) as a JSON list of objects.
+
+    Returns:
+        ORJSONResponse: The rows, keyed by their column labels.
+    """
+    with timing.serializing():
+        return ORJSONResponse([row._asdict() for row in rows])
+
+
+def page_response(page: dict, item_response: Callable):
+    """
+    Serialize a page built by `pagination.build_page`.
+
+    Args:
+        page (dict): The items of the page and the cursor of the next one.
+        item_response (Callable): Builds the document of one item (e.g. `blog_post_response`).
+
+    Returns:
+        ORJSONResponse: The page.
+    """
+    with timing.serializing():
+        return ORJSONResponse({"items": [item_response(item) for item in page["items"]], "next_cursor": page["next_cursor"]})
@@ -1,15 +1,20 @@
+import asyncio
 from fastapi.testclient import TestClient
 from app.main import app
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 # from config import settings [UVICORN]
 from app.config import settings
-from app.database import get_db, Base
+from app.database import get_db, get_session_factory, Base
 import pytest
 # from alembic import command
 import re
-from app.oauth2 import create_access_token
-from app import models
+from app.oauth2 import create_access_token, auth_cache
+from app.cache import post_cache
+from app.blacklist import token_blacklist
+from app import models, timing
 
 SQLALCHEMY_DATABASE_URL = f"postgresql://{settings.database_username}:{settings.database_password}@{settings.database_hostname}:{settings.database_port}/{settings.database_name}_test"
 
@@ -17,8 +22,27 @@ engine = create_engine(SQLALCHEMY_DATABASE_URL)
 
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# The API runs on the async engine. TestClient starts a new event loop for each
+# request, so connections must not be pooled across requests.
+SQLALCHEMY_ASYNC_DATABASE_URL = SQLALCHEMY_DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
+
+async_engine = create_async_engine(SQLALCHEMY_ASYNC_DATABASE_URL, poolclass=NullPool)
+timing.instrument(async_engine.sync_engine)
+
+TestingAsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
 # Base.metadata.create_all(bind=engine)
 
+def run_with_db(coroutine_function):
+    async def run():
+        async with TestingAsyncSessionLocal() as db:
+            return await coroutine_function(db)
+    return asyncio.run(run())
+
+async def rebuild_blacklist():
+    async with TestingAsyncSessionLocal() as db:
+        await token_blacklist.rebuild(db)
+
 # def override_get_db():
 #     try:
 #         db = TestingSessionLocal()
@@ -45,14 +69,20 @@ def session():
 def client(session):
     # command.downgrade("base")
     # command.upgrade("head")
-    def override_get_db():
-        try:
-            yield session
-        finally:
-            session.close()
+    async def override_get_db():
+        async with TestingAsyncSessionLocal() as db:
+            yield db
 
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_session_factory] = lambda: TestingAsyncSessionLocal
+    # Cached users and posts belong to the previous test's database
+    auth_cache.clear()
+    post_cache.clear()
+    # The app builds the blacklist filter on start-up, which TestClient skips
+    token_blacklist.added_since_rebuild = []
+    asyncio.run(rebuild_blacklist())
     yield TestClient(app)
+    token_blacklist.bloom = None
 
 
 @pytest.fixture
@@ -86,6 +116,17 @@ def authorized_client(client, token):
 
     return client
 
+@pytest.fixture
+def query_counter():
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(async_engine.sync_engine, "before_cursor_execute", record)
+
 @pytest.fixture
 def test_posts(session, test_user, test_user2):
     def generate_slugs(title: str):
@@ -1,7 +1,10 @@
 import pytest
-from app import schemas
+from app import models, oauth2, schemas, utils
 from jose import jwt
+from passlib.hash import bcrypt
 from app.config import settings
+from app.blacklist import token_blacklist
+from app.tests.conftest import run_with_db
 
 
 SECRET_KEY = f"{settings.secret_key}"
@@ -34,4 +37,60 @@ def test_logout(client, test_user):
     login_res = schemas.Token(**response.json())
     headers = {"Authorization": f"Bearer {login_res.access_token}"}
     logout_response = client.post("/logout", headers=headers)
-    assert logout_response.status_code == 200
\ No newline at end of file
+    assert logout_response.status_code == 200
+
+def test_cached_token_skips_auth_queries(authorized_client, query_counter):
+    authorized_client.get("/notifications")
+    query_counter.clear()
+    response = authorized_client.get("/notifications")
+
+    assert response.status_code == 200
+    assert not [statement for statement in query_counter if "token_blacklist" in statement or "FROM users" in statement]
+
+def test_logout_invalidates_cached_token(client, test_user):
+    response = client.post("/login/", data={"username": test_user['email'], "password": test_user['password']})
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    assert client.get("/notifications", headers=headers).status_code == 200
+
+    client.post("/logout/", headers=headers)
+
+    assert client.get("/notifications", headers=headers).status_code == 401
+
+def test_logout_on_another_worker_reaches_cached_token(authorized_client, session, token):
+    assert authorized_client.get("/notifications").status_code == 200
+
+    # Another worker blacklists the token; this worker learns of it on its next sync
+    session.add(models.TokenBlacklist(token=token))
+    session.commit()
+    run_with_db(token_blacklist.sync)
+
+    assert authorized_client.get("/notifications").status_code == 401
+
+def test_user_deleted_on_another_worker_is_dropped_from_cache(authorized_client, session, test_user):
+    assert authorized_client.get("/notifications").status_code == 200
+
+    session.query(models.User).filter(models.User.id == test_user['id']).delete()
+    session.commit()
+    assert run_with_db(oauth2.revalidate_cached_users) == 1
+
+    assert authorized_client.get("/notifications").status_code == 401
+
+def test_unchanged_cached_users_are_kept(authorized_client):
+    authorized_client.get("/notifications")
+
+    assert run_with_db(oauth2.revalidate_cached_users) == 0
+    assert len(oauth2.auth_cache) == 1
+
+def test_login_rehashes_outdated_password(client, session):
+    weak_hash = bcrypt.using(rounds=4).hash("password123")
+    session.add(models.User(email="legacy@gmail.com", password=weak_hash))
+    session.commit()
+
+    response = client.post("/login/", data={"username": "legacy@gmail.com", "password": "password123"})
+    assert response.status_code == 200
+
+    session.expire_all()
+    user = session.query(models.User).filter(models.User.email == "legacy@gmail.com").one()
+    assert user.password != weak_hash
+    assert not utils.pwd_context.needs_update(user.password)
+    assert utils.verify_password("password123", user.password)
@@ -0,0 +1,56 @@
+from sqlalchemy import func, select
+from app import models
+from benchmarks.load import percentile
+from benchmarks.seed import SEED_PASSWORD, seed, user_email
+from reconcile_counters import reconcile_counters
+from generate_data import CopyStream, Generator, load
+from app.tests.conftest import engine
+
+
+def test_seed_is_consistent(client, session):
+    counts = seed(session, users=5, posts=20, tags=4, comments=60, likes=40, notifications=30)
+
+    assert counts["likes"] == session.scalar(select(func.count()).select_from(models.Like)) == 40
+    assert reconcile_counters(session) == 0
+    assert all(comment.path.endswith(str(comment.id).zfill(models.COMMENT_PATH_WIDTH)) for comment in session.scalars(select(models.Comment)))
+
+    # Sequences continue after the seeded rows, and seeded users can log in
+    token = client.post("/login/", data={"username": user_email(1), "password": SEED_PASSWORD}).json()["access_token"]
+    response = client.post("/posts/1/comment", json={"content": "after seeding"}, headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+
+def test_seed_is_reproducible(session):
+    seed(session, users=3, posts=5, tags=2, comments=10, likes=5, notifications=3, seed=7)
+    first = session.execute(select(models.Comment.post_id, models.Comment.path).order_by(models.Comment.id)).all()
+    session.close()
+    for table in ("notifications", "likes", "comments", "post_tag", "posts", "tags", "users"):
+        session.execute(models.Base.metadata.tables[table].delete())
+    seed(session, users=3, posts=5, tags=2, comments=10, likes=5, notifications=3, seed=7)
+
+    assert session.execute(select(models.Comment.post_id, models.Comment.path).order_by(models.Comment.id)).all() == first
+
+def test_percentile_uses_nearest_rank():
+    ordered = list(range(1, 101))
+
+    assert [percentile(ordered, fraction) for fraction in (0.5, 0.95, 0.99)] == [50, 95, 99]
+    assert percentile([7], 0.99) == 7
+
+def test_generate_data_loads_consistent_rows(client, session):
+    generator = Generator(users=30, posts=40, tags=5, comments=120, likes=200, notifications=50, author_skew=1.0, like_skew=1.2, comment_skew=1.0, words=(5, 50), seed=3)
+
+    report = load(generator, bind=engine)
+
+    assert report["comments"]["rows"] == 120 and report["likes"]["rows"] == session.scalar(select(func.count()).select_from(models.Like))
+    assert report["constraints"]["indexes"] > 0 and report["constraints"]["foreign_keys"] > 0
+    assert reconcile_counters(session) == 0
+    assert session.scalar(select(func.count()).select_from(models.Comment).where(models.Comment.parent_id.is_not(None))) > 0
+
+    token = client.post("/login/", data={"username": user_email(30), "password": SEED_PASSWORD}).json()["access_token"]
+    response = client.post("/posts/40/comment", json={"content": "after loading"}, headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+
+def test_copy_values_are_escaped():
+    stream = CopyStream(iter([(1, "tab\there\nand \\ slash", None, True, [1, 2])]))
+
+    assert stream.read(-1) == b"1\ttab\\there\\nand \\\\ slash\t\\N\tt\t{1,2}\n"
+    assert stream.count == 1
@@ -0,0 +1,55 @@
+import pytest
+from datetime import datetime, timedelta
+from app import models
+from app.blacklist import BloomFilter, TokenBlacklistFilter, purge_expired, token_blacklist
+from app.tests.conftest import run_with_db
+
+
+@pytest.fixture
+def blacklist_filter(session):
+    run_with_db(token_blacklist.rebuild)
+    yield token_blacklist
+    token_blacklist.bloom = None
+    token_blacklist.added_since_rebuild = []
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(1000, 0.01)
+    tokens = [f"token-{i}" for i in range(1000)]
+    for token in tokens:
+        bloom.add(token)
+
+    assert all(token in bloom for token in tokens)
+    assert sum(f"other-{i}" in bloom for i in range(10000)) < 300
+
+def test_rebuild_skips_and_purge_deletes_expired_tokens(session):
+    now = datetime.utcnow()
+    session.add_all([
+        models.TokenBlacklist(token="live-token", expires_at=now + timedelta(hours=1)),
+        models.TokenBlacklist(token="expired-token", expires_at=now - timedelta(hours=1)),
+    ])
+    session.commit()
+    blacklist_filter = TokenBlacklistFilter(100, 0.001)
+
+    run_with_db(blacklist_filter.rebuild)
+    assert blacklist_filter.might_contain("live-token")
+    assert not blacklist_filter.might_contain("expired-token")
+
+    assert run_with_db(purge_expired) == 1
+    assert [row.token for row in session.query(models.TokenBlacklist).all()] == ["live-token"]
+
+def test_unknown_token_skips_blacklist_query(blacklist_filter, authorized_client, query_counter):
+    response = authorized_client.get("/notifications")
+
+    assert response.status_code == 200
+    assert not [statement for statement in query_counter if "token_blacklist" in statement]
+
+def test_logout_adds_token_to_filter(blacklist_filter, client, test_user):
+    response = client.post("/login/", data={"username": test_user['email'], "password": test_user['password']})
+    token = response.json()['access_token']
+    headers = {"Authorization": f"Bearer {token}"}
+
+    client.post("/logout/", headers=headers)
+
+    assert blacklist_filter.might_contain(token)
+    assert client.get("/notifications", headers=headers).status_code == 401
@@ -1,4 +1,10 @@
-from app import schemas
+import asyncio
+from app import cache, loaders, schemas, models, utils
+from app.routers import blogs
+from app.tests.conftest import TestingAsyncSessionLocal
+from sqlalchemy import insert, text
+from sqlalchemy.exc import IntegrityError
+from app.config import settings
 import pytest
 
 def test_get_all_blogs(authorized_client, test_posts):
@@ -6,12 +12,77 @@ def test_get_all_blogs(authorized_client, test_posts):
 
     def validate(post):
         return schemas.BlogPostResponse(**post)
-    post_map = map(validate, response.json())
+    post_map = map(validate, response.json()['items'])
     posts = list(post_map)
     
-    assert len(response.json()) == len(test_posts)
+    assert len(response.json()['items']) == len(test_posts)
+    assert response.json()['next_cursor'] is None
     assert response.status_code == 200
 
+def test_paginate_all_blogs(authorized_client, test_posts):
+    first_page = authorized_client.get("/posts/", params={"limit": 3}).json()
+    assert len(first_page['items']) == 3
+    assert first_page['next_cursor'] is not None
+
+    second_page = authorized_client.get("/posts/", params={"limit": 3, "cursor": first_page['next_cursor']}).json()
+    assert len(second_page['items']) == 1
+    assert second_page['next_cursor'] is None
+
+    ids = [post['id'] for post in first_page['items'] + second_page['items']]
+    assert sorted(ids) == sorted(post.id for post in test_posts)
+
+def test_paginate_posts_created_without_publish_date(authorized_client, session, test_user):
+    # Rows inserted by SQL that omits published_at (as before the column existed) get
+    # the same server timestamp, so the pages are told apart by id alone
+    session.execute(
+        text("INSERT INTO posts (title, content, slug, author_id) VALUES (:title, :content, :slug, :author_id)"),
+        [{"title": f"undated {i}", "content": "undated", "slug": f"undated-{i}", "author_id": test_user['id']} for i in range(5)],
+    )
+    session.commit()
+
+    ids, cursor = [], None
+    while True:
+        page = authorized_client.get("/posts/", params={"limit": 2, "cursor": cursor})
+        assert page.status_code == 200
+        ids += [post['id'] for post in page.json()['items']]
+        cursor = page.json()['next_cursor']
+        if cursor is None:
+            break
+
+    assert ids == sorted(ids, reverse=True) and len(ids) == 5
+
+def test_published_at_is_never_null(session, test_user):
+    with pytest.raises(IntegrityError):
+        session.execute(insert(models.BlogPost).values(title="undated", content="undated", slug="undated", author_id=test_user['id'], published_at=None))
+
+def test_invalid_cursor_all_blogs(authorized_client, test_posts):
+    response = authorized_client.get("/posts/", params={"cursor": "not-a-cursor"})
+
+    assert response.status_code == 400
+
+def test_get_all_blogs_query_count(authorized_client, session, test_posts, test_user, test_user2, query_counter):
+    # The first request also verifies the token; later ones are served from the auth cache
+    authorized_client.get("/posts/")
+    query_counter.clear()
+    authorized_client.get("/posts/")
+    baseline = len(query_counter)
+
+    tag = models.Tag(name="python")
+    for i in range(10):
+        post = models.BlogPost(title=f"extra title {i}", content="extra content", slug=f"extra-title-{i}", author_id=test_user2['id'], tags=[tag])
+        post.comments = [
+            models.Comment(id=100 + 2 * i, path=f"{100 + 2 * i:010d}", content="nice", author_id=test_user['id']),
+            models.Comment(id=101 + 2 * i, path=f"{101 + 2 * i:010d}", content="thanks", author_id=test_user2['id']),
+        ]
+        session.add(post)
+    session.commit()
+
+    query_counter.clear()
+    response = authorized_client.get("/posts/")
+
+    assert len(response.json()['items']) == len(test_posts) + 10
+    assert len(query_counter) == baseline
+
 def test_unauthenticated_get_all_blogs(client, test_posts):
     response = client.get("/posts/")
 
@@ -23,9 +94,34 @@ def test_get_all_empty_blogs(authorized_client):
     assert response.status_code == 200
 
 
+def test_search_blogs(authorized_client, session, test_posts, test_user):
+    session.add(models.BlogPost(title="Postgres indexing", content="Why the planner picks a sequential scan", slug="postgres-indexing", author_id=test_user['id']))
+    session.add(models.BlogPost(title="Weekend notes", content="Notes about postgres vacuum", slug="weekend-notes", author_id=test_user['id']))
+    session.commit()
+
+    response = authorized_client.get("/posts/search/", params={"q": "postgres"})
+    hits = schemas.BlogPostSearchPage(**response.json()).items
+
+    assert response.status_code == 200
+    assert [hit.slug for hit in hits] == ["postgres-indexing", "weekend-notes"]
+    assert "<mark>postgres</mark>" in hits[1].snippet.lower()
+
+def test_paginate_search_blogs(authorized_client, test_posts):
+    first_page = authorized_client.get("/posts/search/", params={"q": "content", "limit": 3}).json()
+    second_page = authorized_client.get("/posts/search/", params={"q": "content", "limit": 3, "cursor": first_page['next_cursor']}).json()
+
+    ids = [hit['id'] for hit in first_page['items'] + second_page['items']]
+    assert sorted(ids) == sorted(post.id for post in test_posts)
+    assert second_page['next_cursor'] is None
+
+def test_search_blogs_without_query(authorized_client, test_posts):
+    response = authorized_client.get("/posts/search/")
+
+    assert response.status_code == 422
+
 def test_get_all_my_blogs(authorized_client, test_posts, test_user):
     response = authorized_client.get("/myposts/")
-    posts = response.json()
+    posts = response.json()['items']
 
     for post in posts:
         assert post['author']['email'] == test_user['email']
@@ -40,6 +136,7 @@ def test_unauthenticated_get_all_my_blogs(client, test_posts):
 def test_get_all_user_blogs(authorized_client, test_posts, test_user):
     response = authorized_client.get(f"/allposts/{test_user['email']}/")
 
+    assert len(response.json()['items']) == 3
     assert response.status_code == 200
 
 def test_unauthenticated_get_all_user_blogs(client, test_posts, test_user):
@@ -65,6 +162,25 @@ def test_create_post(authorized_client, test_user):
     assert new_post.title == "A whole new title"
     assert response.status_code == 200
 
+def test_create_post_resolves_tags_in_constant_queries(authorized_client, session, test_user, query_counter):
+    session.add(models.Tag(name="python"))
+    session.commit()
+    authorized_client.post("/createpost/", json={"title": "Warm up", "content": "content", "tags": ["warmup"]})
+
+    query_counter.clear()
+    authorized_client.post("/createpost/", json={"title": "One tag", "content": "content", "tags": ["single"]})
+    baseline = len(query_counter)
+
+    query_counter.clear()
+    tags = ["python"] + [f"tag{i}" for i in range(10)] + ["python"]
+    response = authorized_client.post("/createpost/", json={"title": "Many tags", "content": "content", "tags": tags})
+    new_post = schemas.BlogPostResponse(**response.json())
+
+    assert response.status_code == 200
+    assert sorted(tag.name for tag in new_post.tags) == sorted(["python"] + [f"tag{i}" for i in range(10)])
+    assert len(query_counter) == baseline
+    assert session.query(models.Tag).filter(models.Tag.name == "python").count() == 1
+
 @pytest.mark.parametrize("title, content, status_code", [
     ("Another new title", None, 422),
     (None, "Another content to an empty title", 422),
@@ -154,3 +270,190 @@ def test_unauthenticated_delete_post(client, test_user, test_posts):
 
     response.status_code == 401
     assert response.json()['detail'] == "Not authenticated"
+
+
+def test_post_counters_follow_likes_and_comments(authorized_client, test_posts):
+    post_id = test_posts[0].id
+    authorized_client.post(f"/posts/{post_id}/like")
+    authorized_client.post(f"/posts/{post_id}/comment", json={"content": "first"})
+    authorized_client.post(f"/posts/{post_id}/comment", json={"content": "second"})
+
+    post = schemas.BlogPostResponse(**authorized_client.get(f"/one-post/{post_id}/").json())
+    assert (post.like_count, post.comment_count) == (1, 2)
+
+    authorized_client.delete(f"/posts/{post_id}/unlike")
+    authorized_client.delete(f"/posts/{post.comments[0].id}/{post_id}/delete")
+
+    post = schemas.BlogPostResponse(**authorized_client.get(f"/one-post/{post_id}/").json())
+    assert (post.like_count, post.comment_count) == (0, 1)
+
+def test_reconcile_counters(session, test_posts, test_user):
+    from reconcile_counters import reconcile_counters
+    session.add(models.Like(user_id=test_user['id'], post_id=test_posts[0].id))
+    session.add(models.Comment(id=100, path="0000000100", content="drifted", author_id=test_user['id'], post_id=test_posts[1].id))
+    test_posts[2].like_count = 5
+    session.commit()
+
+    assert reconcile_counters(session, batch_size=2) == 3
+    session.expire_all()
+    assert [(post.like_count, post.comment_count) for post in test_posts[:3]] == [(1, 0), (0, 1), (0, 0)]
+    assert reconcile_counters(session) == 0
+
+def test_like_is_idempotent(authorized_client, test_posts):
+    post_id = test_posts[0].id
+    assert authorized_client.post(f"/posts/{post_id}/like").status_code == 200
+    assert authorized_client.post(f"/posts/{post_id}/like").status_code == 200
+    assert authorized_client.get(f"/one-post/{post_id}/").json()['like_count'] == 1
+
+    assert authorized_client.delete(f"/posts/{post_id}/unlike").status_code == 200
+    assert authorized_client.delete(f"/posts/{post_id}/unlike").status_code == 200
+    assert authorized_client.get(f"/one-post/{post_id}/").json()['like_count'] == 0
+
+def test_like_missing_post(authorized_client):
+    assert authorized_client.post("/posts/8888/like").status_code == 404
+    assert authorized_client.delete("/posts/8888/unlike").status_code == 404
+
+def test_batch_like_posts(authorized_client, session, test_posts, test_user2):
+    post_ids = [post.id for post in test_posts[:3]]
+    authorized_client.post(f"/posts/{post_ids[0]}/like")
+
+    response = authorized_client.post("/posts/likes/batch", json={"post_ids": post_ids + [8888]})
+    assert response.status_code == 200
+    assert response.json() == {"action": "like", "changed": post_ids[1:]}
+
+    response = authorized_client.post("/posts/likes/batch", json={"post_ids": post_ids, "action": "unlike"})
+    assert response.json()["changed"] == post_ids
+    session.expire_all()
+    assert [post.like_count for post in test_posts[:3]] == [0, 0, 0]
+
+def test_batch_like_posts_is_capped(authorized_client):
+    response = authorized_client.post("/posts/likes/batch", json={"post_ids": list(range(1, settings.max_like_batch_size + 2))})
+
+    assert response.status_code == 400
+
+def test_get_one_post_conditional_get(authorized_client, test_posts, query_counter):
+    post_id = test_posts[0].id
+    response = authorized_client.get(f"/one-post/{post_id}/")
+    etag = response.headers["etag"]
+
+    query_counter.clear()
+    cached = authorized_client.get(f"/one-post/{post_id}/", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == etag
+    assert query_counter == []
+
+    authorized_client.post(f"/posts/{post_id}/comment", json={"content": "new comment"})
+    response = authorized_client.get(f"/one-post/{post_id}/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.json()["comment_count"] == 1
+
+def test_get_one_post_revalidates_uncached_post(authorized_client, test_posts, query_counter):
+    from app.cache import post_cache
+    post_id = test_posts[0].id
+    etag = authorized_client.get(f"/one-post/{post_id}/").headers["etag"]
+    post_cache.clear()
+
+    query_counter.clear()
+    response = authorized_client.get(f"/one-post/{post_id}/", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert len(query_counter) == 1
+
+def test_writes_to_other_posts_do_not_stop_caching(session, test_posts, monkeypatch):
+    cache.post_cache.clear()
+    post_id, other_id = test_posts[0].id, test_posts[1].id
+    load_post = blogs.load_post
+    invalidated = []
+    async def load_post_during_write(db, id):
+        # Another request writes while the post is being rendered
+        blog = await load_post(db, id)
+        for changed in invalidated:
+            cache.invalidate_post(changed)
+        return blog
+    monkeypatch.setattr(blogs, "load_post", load_post_during_write)
+
+    async def render():
+        async with TestingAsyncSessionLocal() as db:
+            return await blogs.post_response(db, post_id, None)
+
+    invalidated[:] = [other_id]
+    asyncio.run(render())
+    assert cache.post_cache.get(post_id) is not None
+
+    cache.post_cache.clear()
+    invalidated[:] = [post_id]
+    asyncio.run(render())
+    assert cache.post_cache.get(post_id) is None
+
+def test_create_post_allocates_free_slug(authorized_client, session, test_user):
+    session.add(models.BlogPost(title="Same title", content="content", slug="same-title-7", author_id=test_user['id']))
+    session.add(models.BlogPost(title="Same title", content="content", slug="same-title-extra", author_id=test_user['id']))
+    session.commit()
+
+    slugs = [authorized_client.post("/createpost/", json={"title": "Same title", "content": "content"}).json()["slug"] for _ in range(3)]
+
+    assert slugs == ["same-title", "same-title-8", "same-title-9"]
+
+def test_get_post_by_slug(authorized_client, test_posts):
+    response = authorized_client.get(f"/posts/by-slug/{test_posts[0].slug}")
+
+    assert response.status_code == 200
+    assert schemas.BlogPostResponse(**response.json()).id == test_posts[0].id
+    assert authorized_client.get("/posts/by-slug/no-such-post").status_code == 404
+
+def test_get_all_blogs_sparse_fields(authorized_client, test_posts, query_counter):
+    authorized_client.get("/posts/")
+    query_counter.clear()
+
+    response = authorized_client.get("/posts/", params={"fields": "slug,author,title"})
+    items = response.json()["items"]
+
+    assert response.status_code == 200
+    assert len(items) == len(test_posts)
+    assert all(list(item) == ["title", "slug", "author"] for item in items)
+    assert not [statement for statement in query_counter if "posts.content" in statement or "FROM comments" in statement]
+
+def test_listings_document_sparse_posts(client):
+    openapi = client.get("/openapi.json").json()
+    post = openapi["components"]["schemas"]["BlogPostSparseResponse"]
+
+    for path in ("/posts/", "/myposts/", "/allposts/{email}/"):
+        page = openapi["paths"][path]["get"]["responses"]["200"]["content"]["application/json"]["schema"]
+        assert page == {"$ref": "#/components/schemas/BlogPostSparsePage"}
+    assert set(post["properties"]) == set(loaders.BLOG_POST_FIELDS)
+    assert not post.get("required")
+
+def test_get_all_blogs_unknown_field(authorized_client, test_posts):
+    response = authorized_client.get("/posts/", params={"fields": "title,password"})
+
+    assert response.status_code == 400
+
+def test_post_previews_follow_content(authorized_client, test_user):
+    content = " ".join(["word"] * 450)
+    post = authorized_client.post("/createpost/", json={"title": "long read", "content": content}).json()
+
+    assert (post["word_count"], post["reading_time_minutes"]) == (450, 3)
+    assert len(post["excerpt"]) <= utils.EXCERPT_LENGTH and post["excerpt"].endswith("word…")
+
+    response = authorized_client.put(f"/updatepost/{post['id']}/", json={"title": "short read", "content": "short  and\nsweet"})
+    assert response.status_code == 200
+    post = authorized_client.get(f"/one-post/{post['id']}/").json()
+    assert (post["excerpt"], post["word_count"], post["reading_time_minutes"]) == ("short and sweet", 3, 1)
+
+def test_get_all_blogs_excerpt_mode(authorized_client, test_posts, query_counter):
+    authorized_client.get("/posts/")
+    query_counter.clear()
+
+    items = authorized_client.get("/posts/", params={"excerpt": True}).json()["items"]
+
+    assert all("excerpt" in item and "content" not in item and "tags" in item for item in items)
+    assert not [statement for statement in query_counter if "posts.content" in statement]
+
+def test_backfill_post_summaries(session, test_posts):
+    from backfill_post_summaries import backfill_post_summaries
+
+    assert backfill_post_summaries(session, batch_size=2) == len(test_posts)
+    session.expire_all()
+    assert [(post.excerpt, post.word_count) for post in test_posts[:2]] == [("1st content", 2), ("2nd content", 2)]
+    assert backfill_post_summaries(session) == 0
@@ -0,0 +1,104 @@
+from app import models, schemas
+from app.config import settings
+
+
+def comment(client, post_id, content, parent_id=None):
+    response = client.post(f"/posts/{post_id}/comment", json={"content": content, "parent_id": parent_id})
+    assert response.status_code == 200
+    return max(thread["id"] for thread in threads(client, post_id)) if parent_id is None else None
+
+def threads(client, post_id, **params):
+    response = client.get(f"/posts/{post_id}/comments", params=params)
+    assert response.status_code == 200
+    return schemas.CommentPage(**response.json()).model_dump()["items"]
+
+def test_replies_are_threaded_depth_first(authorized_client, session, test_posts):
+    post_id = test_posts[0].id
+    first = comment(authorized_client, post_id, "first")
+    second = comment(authorized_client, post_id, "second")
+    comment(authorized_client, post_id, "reply", parent_id=first)
+    reply = session.query(models.Comment).filter_by(content="reply").one()
+    comment(authorized_client, post_id, "nested", parent_id=reply.id)
+    comment(authorized_client, post_id, "another reply", parent_id=first)
+
+    items = threads(authorized_client, post_id)
+
+    assert [thread["id"] for thread in items] == [second, first]
+    assert [(reply["content"], reply["depth"]) for reply in items[1]["replies"]] == [("reply", 1), ("nested", 2), ("another reply", 1)]
+    assert items[1]["replies"][1]["parent_id"] == reply.id
+    assert items[0]["replies"] == [] and items[1]["replies_cursor"] is None
+
+def test_threads_are_paginated(authorized_client, test_posts):
+    post_id = test_posts[0].id
+    ids = [comment(authorized_client, post_id, f"comment {i}") for i in range(5)]
+
+    page = authorized_client.get(f"/posts/{post_id}/comments", params={"limit": 3}).json()
+    rest = authorized_client.get(f"/posts/{post_id}/comments", params={"limit": 3, "cursor": page["next_cursor"]}).json()
+
+    assert [thread["id"] for thread in page["items"] + rest["items"]] == ids[::-1]
+    assert rest["next_cursor"] is None
+
+def test_load_more_replies(authorized_client, session, test_posts, monkeypatch):
+    monkeypatch.setattr(settings, "comment_replies_per_thread", 2)
+    post_id = test_posts[0].id
+    root = comment(authorized_client, post_id, "root")
+    for i in range(5):
+        comment(authorized_client, post_id, f"reply {i}", parent_id=root)
+
+    thread = threads(authorized_client, post_id)[0]
+    assert [reply["content"] for reply in thread["replies"]] == ["reply 0", "reply 1"]
+
+    more = authorized_client.get(f"/posts/{post_id}/comments/{root}/replies", params={"cursor": thread["replies_cursor"], "limit": 2}).json()
+    last = authorized_client.get(f"/posts/{post_id}/comments/{root}/replies", params={"cursor": more["next_cursor"]}).json()
+
+    assert [reply["content"] for reply in more["items"] + last["items"]] == ["reply 2", "reply 3", "reply 4"]
+    assert last["next_cursor"] is None
+
+def test_replies_cursor_is_bound_to_its_thread(authorized_client, test_posts, monkeypatch):
+    monkeypatch.setattr(settings, "comment_replies_per_thread", 1)
+    post_id = test_posts[0].id
+    first = comment(authorized_client, post_id, "first")
+    comment(authorized_client, post_id, "a", parent_id=first)
+    comment(authorized_client, post_id, "b", parent_id=first)
+    second = comment(authorized_client, post_id, "second")
+
+    cursor = threads(authorized_client, post_id)[1]["replies_cursor"]
+
+    assert authorized_client.get(f"/posts/{post_id}/comments/{second}/replies", params={"cursor": cursor}).status_code == 400
+    assert authorized_client.get(f"/posts/{post_id}/comments/999999/replies").status_code == 404
+
+def test_reply_to_comment_of_another_post(authorized_client, test_posts):
+    parent = comment(authorized_client, test_posts[0].id, "first")
+
+    response = authorized_client.post(f"/posts/{test_posts[1].id}/comment", json={"content": "lost", "parent_id": parent})
+
+    assert response.status_code == 404
+
+def test_thread_page_queries_do_not_grow_with_replies(authorized_client, test_posts, query_counter):
+    post_id = test_posts[0].id
+    roots = [comment(authorized_client, post_id, f"root {i}") for i in range(3)]
+    threads(authorized_client, post_id)
+    query_counter.clear()
+    threads(authorized_client, post_id)
+    baseline = len(query_counter)
+
+    for root in roots:
+        for i in range(4):
+            comment(authorized_client, post_id, f"reply {i}", parent_id=root)
+    query_counter.clear()
+    items = threads(authorized_client, post_id)
+
+    assert all(len(thread["replies"]) == 4 for thread in items)
+    assert len(query_counter) == baseline
+
+def test_delete_comment_removes_its_replies(authorized_client, session, test_posts):
+    post_id = test_posts[0].id
+    root = comment(authorized_client, post_id, "root")
+    other = comment(authorized_client, post_id, "other")
+    comment(authorized_client, post_id, "reply", parent_id=root)
+    comment(authorized_client, post_id, "other reply", parent_id=other)
+
+    assert authorized_client.delete(f"/posts/{root}/{post_id}/delete").status_code == 200
+
+    assert [thread["id"] for thread in threads(authorized_client, post_id)] == [other]
+    assert authorized_client.get(f"/one-post/{post_id}/").json()["comment_count"] == 2
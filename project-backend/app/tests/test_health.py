@@ -0,0 +1,22 @@
+from app import database
+
+
+def test_database_health(client):
+    response = client.get("/health/db/")
+    pool = response.json()['pool']
+
+    assert response.status_code == 200
+    assert response.json()['database'] == "ok"
+    assert pool['size'] == database.settings.db_pool_size
+    assert {"checked_out", "idle", "overflow", "checkout_wait_ms"} <= set(pool)
+
+def test_pool_metrics_records_waits():
+    metrics = database.PoolMetrics()
+    metrics.record_wait(0.002)
+    metrics.record_wait(0.004, timed_out=True)
+    snapshot = metrics.snapshot(database.async_engine.pool)
+
+    assert snapshot['checkout_wait_ms']['count'] == 2
+    assert snapshot['checkout_wait_ms']['max'] == 4.0
+    assert snapshot['checkout_wait_ms']['avg'] == 3.0
+    assert snapshot['timeouts'] == 1
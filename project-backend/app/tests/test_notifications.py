@@ -0,0 +1,191 @@
+import asyncio
+import pytest
+from datetime import datetime, timedelta
+from app import models, schemas
+from app.config import settings
+from fastapi import Request
+from app.hub import NotificationHub, notification_hub
+from app.main import app
+from app.routers.notifications import notification_events, stream_notifications
+from app.tests.conftest import TestingAsyncSessionLocal, run_with_db
+
+
+@pytest.fixture
+def test_notifications(session, test_user, test_posts):
+    now = datetime.utcnow()
+    notifications = [
+        models.Notification(user_id=test_user['id'], post_id=test_posts[0].id, message=f"notification {i}", timestamp=now - timedelta(minutes=i))
+        for i in range(5)
+    ]
+    session.add_all(notifications)
+    session.commit()
+    return notifications
+
+def test_paginate_notifications(authorized_client, test_notifications):
+    messages = []
+    cursor = None
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        page = schemas.NotificationPage(**authorized_client.get("/notifications", params=params).json())
+        messages += [notification.message for notification in page.items]
+        cursor = page.next_cursor
+        if not cursor:
+            break
+
+    assert messages == [f"notification {i}" for i in range(5)]
+
+def test_unread_count_and_mark_read_by_ids(authorized_client, test_notifications):
+    assert authorized_client.get("/notifications/unread-count").json() == {"unread": 5}
+
+    response = authorized_client.post("/notifications/mark-read", json={"ids": [test_notifications[0].id, test_notifications[1].id]})
+
+    assert response.json() == {"updated": 2}
+    assert authorized_client.get("/notifications/unread-count").json() == {"unread": 3}
+
+def test_mark_read_up_to_cursor(authorized_client, test_notifications):
+    page = authorized_client.get("/notifications", params={"limit": 2}).json()
+
+    response = authorized_client.post("/notifications/mark-read", json={"cursor": page["next_cursor"]})
+
+    assert response.json() == {"updated": 2}
+    unread = [notification["message"] for notification in authorized_client.get("/notifications").json()["items"] if not notification["is_read"]]
+    assert unread == ["notification 2", "notification 3", "notification 4"]
+
+def test_mark_all_read(authorized_client, test_notifications):
+    assert authorized_client.post("/notifications/mark-read", json={}).json() == {"updated": 5}
+    assert authorized_client.get("/notifications/unread-count").json() == {"unread": 0}
+
+def test_mark_read_rejects_ids_and_cursor(authorized_client, test_notifications):
+    response = authorized_client.post("/notifications/mark-read", json={"ids": [1], "cursor": "abc"})
+
+    assert response.status_code == 400
+
+def event_ids(events):
+    return [int(event.split("\n")[0][len("id: "):]) for event in events]
+
+def test_stream_resumes_from_last_event_id_then_follows_hub(test_user, test_notifications):
+    hub = NotificationHub(10)
+    live = schemas.NotificationResponse(id=test_notifications[-1].id + 100, message="live", timestamp=datetime.utcnow())
+    live_seq = test_notifications[-1].seq + 100
+
+    async def scenario(db):
+        subscription = hub.subscribe(test_user['id'])
+        events = notification_events(db, subscription, last_event_id=test_notifications[2].seq)
+        received = [await events.__anext__(), await events.__anext__()]
+        hub.publish(test_user['id'], (live_seq, live))
+        received.append(await events.__anext__())
+        await events.aclose()
+        hub.unsubscribe(subscription)
+        return received
+
+    received = run_with_db(scenario)
+
+    assert event_ids(received) == [test_notifications[3].seq, test_notifications[4].seq, live_seq]
+    assert len(hub) == 0
+
+def test_stream_heartbeat_catches_up_from_database(monkeypatch, session, test_user, test_posts):
+    monkeypatch.setattr(settings, "notification_stream_heartbeat_seconds", 0.05)
+    hub = NotificationHub(10)
+
+    async def scenario(db):
+        subscription = hub.subscribe(test_user['id'])
+        events = notification_events(db, subscription)
+        heartbeat = await events.__anext__()
+        # Delivered by another worker: never published to this hub
+        session.add(models.Notification(user_id=test_user['id'], post_id=test_posts[0].id, message="elsewhere"))
+        session.commit()
+        missed = await events.__anext__()
+        await events.aclose()
+        return heartbeat, missed
+
+    heartbeat, missed = run_with_db(scenario)
+
+    assert heartbeat == ": heartbeat\n\n"
+    assert '"message":"elsewhere"' in missed
+
+def test_stream_recovers_from_queue_overflow(test_user, test_notifications):
+    hub = NotificationHub(1)
+
+    async def scenario(db):
+        subscription = hub.subscribe(test_user['id'])
+        events = notification_events(db, subscription, last_event_id=test_notifications[4].seq)
+        for notification in test_notifications:
+            hub.publish(test_user['id'], (notification.seq, schemas.NotificationResponse.model_validate(notification, from_attributes=True)))
+        overflowed = subscription.overflowed
+        next_event = asyncio.wait_for(events.__anext__(), timeout=0.5)
+        try:
+            await next_event
+        except asyncio.TimeoutError:
+            pass
+        await events.aclose()
+        return overflowed, subscription.overflowed, subscription.queue.qsize()
+
+    assert run_with_db(scenario) == (True, False, 0)
+
+def test_stream_rejects_invalid_last_event_id(authorized_client):
+    response = authorized_client.get("/notifications/stream", headers={"Last-Event-ID": "abc"})
+
+    assert response.status_code == 400
+
+async def open_stream(headers):
+    """
+    Request `/notifications/stream` through the whole app, returning its status, a queue of its events and a function that disconnects.
+    """
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": "/notifications/stream", "raw_path": b"/notifications/stream", "query_string": b"", "root_path": "",
+        "headers": [(name.lower().encode(), value.encode()) for name, value in headers.items()],
+        "client": ("testclient", 50000), "server": ("testserver", 80),
+    }
+    started, events, disconnected = asyncio.Future(), asyncio.Queue(), asyncio.Event()
+    messages = iter([{"type": "http.request", "body": b"", "more_body": False}])
+
+    async def receive():
+        message = next(messages, None)
+        if message is None:
+            await disconnected.wait()
+            message = {"type": "http.disconnect"}
+        return message
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            started.set_result(message["status"])
+        elif message.get("body"):
+            await events.put(message["body"].decode())
+
+    served = asyncio.create_task(app(scope, receive, send))
+
+    async def disconnect():
+        disconnected.set()
+        await served
+
+    return await started, events, disconnect
+
+def test_stream_endpoint_resumes_from_last_event_id_then_follows_hub(client, token, test_user, test_notifications):
+    live = schemas.NotificationResponse(id=test_notifications[-1].id + 100, message="live", timestamp=datetime.utcnow())
+    live_seq = test_notifications[-1].seq + 100
+
+    async def scenario():
+        headers = {"Authorization": f"Bearer {token}", "Last-Event-ID": str(test_notifications[2].seq)}
+        status_code, events, disconnect = await open_stream(headers)
+        received = [await asyncio.wait_for(events.get(), timeout=5) for _ in range(2)]
+        notification_hub.publish(test_user['id'], (live_seq, live))
+        received.append(await asyncio.wait_for(events.get(), timeout=5))
+        await disconnect()
+        return status_code, received
+
+    status_code, received = asyncio.run(scenario())
+
+    assert status_code == 200
+    assert event_ids(received) == [test_notifications[3].seq, test_notifications[4].seq, live_seq]
+    assert '"message":"live"' in received[-1]
+    assert len(notification_hub) == 0
+
+def test_stream_never_iterated_does_not_subscribe(session, test_user):
+    user = models.User(id=test_user['id'], email=test_user['email'])
+    response = asyncio.run(stream_notifications(Request({"type": "http", "headers": []}), TestingAsyncSessionLocal, user))
+
+    assert response.media_type == "text/event-stream"
+    assert len(notification_hub) == 0
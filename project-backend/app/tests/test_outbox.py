@@ -0,0 +1,176 @@
+import asyncio
+from sqlalchemy import select
+from app import models, outbox
+from app.config import settings
+from app.hub import notification_hub
+from app.oauth2 import create_access_token
+from app.tests.conftest import TestingAsyncSessionLocal, run_with_db
+
+
+def test_like_and_comment_write_outbox_rows(authorized_client, session, test_user, test_posts):
+    post = next(post for post in test_posts if post.author_id != test_user['id'])
+    authorized_client.post(f"/posts/{post.id}/like")
+    authorized_client.post(f"/posts/{post.id}/comment", json={"content": "nice"})
+
+    rows = session.query(models.NotificationOutbox).order_by(models.NotificationOutbox.id).all()
+    assert [(row.kind, row.actor_id, row.recipient_id) for row in rows] == [
+        (outbox.LIKE, test_user['id'], post.author_id),
+        (outbox.COMMENT, test_user['id'], post.author_id),
+    ]
+    assert session.query(models.Notification).count() == 0
+
+def test_own_post_is_not_queued(authorized_client, session, test_user, test_posts):
+    post = next(post for post in test_posts if post.author_id == test_user['id'])
+    authorized_client.post(f"/posts/{post.id}/like")
+
+    assert session.query(models.NotificationOutbox).count() == 0
+
+def queue(session, kind, actor_id, recipient_id, post_id):
+    session.add(models.NotificationOutbox(kind=kind, actor_id=actor_id, recipient_id=recipient_id, post_id=post_id))
+    session.commit()
+
+def rendered_notifications(user_id):
+    async def load(db):
+        stmt = select(models.Notification).where(models.Notification.user_id == user_id).order_by(models.Notification.id)
+        return await outbox.render(db, await db.scalars(stmt))
+    return run_with_db(load)
+
+def test_drain_outbox_coalesces_duplicates(session, test_user, test_user2, test_posts):
+    post = next(post for post in test_posts if post.author_id == test_user2['id'])
+    queue(session, outbox.LIKE, test_user['id'], test_user2['id'], post.id)
+    queue(session, outbox.LIKE, test_user['id'], test_user2['id'], post.id)
+    queue(session, outbox.COMMENT, test_user['id'], test_user2['id'], post.id)
+
+    assert run_with_db(lambda db: outbox.drain_outbox(db, batch_size=2)) == 2
+    assert run_with_db(outbox.drain_outbox) == 1
+    assert run_with_db(outbox.drain_outbox) == 0
+
+    messages = sorted(notification.message for notification in rendered_notifications(test_user2['id']))
+    assert messages == [f"{test_user['email']} commented on your post", f"{test_user['email']} liked your post"]
+    assert session.query(models.NotificationOutbox).count() == 0
+
+def test_unread_notifications_are_merged(session, test_user, test_user2, test_posts):
+    post = next(post for post in test_posts if post.author_id == test_user2['id'])
+    others = [models.User(email=f"fan{i}@gmail.com", password="x") for i in range(3)]
+    session.add_all(others)
+    session.commit()
+
+    queue(session, outbox.LIKE, test_user['id'], test_user2['id'], post.id)
+    run_with_db(outbox.drain_outbox)
+    first_id = rendered_notifications(test_user2['id'])[0].id
+
+    # test_user again (already counted), then two new fans in one batch
+    queue(session, outbox.LIKE, others[0].id, test_user2['id'], post.id)
+    queue(session, outbox.LIKE, test_user['id'], test_user2['id'], post.id)
+    run_with_db(outbox.drain_outbox)
+    queue(session, outbox.LIKE, others[1].id, test_user2['id'], post.id)
+    run_with_db(outbox.drain_outbox)
+
+    [notification] = rendered_notifications(test_user2['id'])
+    assert notification.id == first_id
+    assert notification.actor_count == 3
+    assert notification.message == f"{others[1].email} and 2 others liked your post"
+
+    # Once read, new activity starts a new notification
+    session.query(models.Notification).update({"is_read": True})
+    session.commit()
+    queue(session, outbox.LIKE, others[2].id, test_user2['id'], post.id)
+    run_with_db(outbox.drain_outbox)
+
+    notifications = rendered_notifications(test_user2['id'])
+    assert [(notification.actor_count, notification.is_read) for notification in notifications] == [(3, True), (1, False)]
+    assert notifications[1].message == f"{others[2].email} liked your post"
+
+def test_actor_count_is_exact_once_actors_leave_the_recent_list(client, session, test_user, test_user2, test_posts):
+    post = next(post for post in test_posts if post.author_id == test_user2['id'])
+    others = [models.User(email=f"fan{i}@gmail.com", password="x") for i in range(3)]
+    session.add_all(others)
+    session.commit()
+
+    queue(session, outbox.LIKE, test_user['id'], test_user2['id'], post.id)
+    run_with_db(outbox.drain_outbox)
+    for other in others:
+        queue(session, outbox.LIKE, other.id, test_user2['id'], post.id)
+        run_with_db(outbox.drain_outbox)
+    # test_user is no longer among the three most recent actors: like, unlike, like again
+    subscription = notification_hub.subscribe(test_user2['id'])
+    queue(session, outbox.LIKE, test_user['id'], test_user2['id'], post.id)
+    run_with_db(outbox.drain_outbox)
+    notification_hub.unsubscribe(subscription)
+
+    [notification] = rendered_notifications(test_user2['id'])
+    assert notification.actor_count == 4
+    assert notification.message == f"{test_user['email']} and 3 others liked your post"
+    # The pushed event carries the same count
+    _, pushed = subscription.queue.get_nowait()
+    assert pushed.actor_count == 4
+
+    # Reading the notification drops its recorded actors
+    headers = {"Authorization": f"Bearer {create_access_token({'user_id': test_user2['id']})}"}
+    assert client.post("/notifications/mark-read", json={}, headers=headers).json() == {"updated": 1}
+    assert session.query(models.NotificationActor).count() == 0
+
+def test_merged_notification_streams_again(session, test_user, test_user2, test_posts):
+    post = next(post for post in test_posts if post.author_id == test_user2['id'])
+    queue(session, outbox.LIKE, test_user['id'], test_user2['id'], post.id)
+    run_with_db(outbox.drain_outbox)
+    first_seq = session.query(models.Notification.seq).scalar()
+
+    queue(session, outbox.COMMENT, test_user['id'], test_user2['id'], post.id)
+    queue(session, outbox.LIKE, test_user['id'], test_user2['id'], post.id)
+    run_with_db(outbox.drain_outbox)
+
+    # The merged like is delivered after the comment, so a stream resuming from it skips nothing
+    rows = session.query(models.Notification.kind, models.Notification.seq).order_by(models.Notification.seq).all()
+    assert [kind for kind, _ in rows] == [outbox.COMMENT, outbox.LIKE]
+    assert rows[0].seq > first_seq
+
+def test_drains_to_the_same_recipient_take_turns(session, test_user, test_user2, test_posts):
+    post = next(post for post in test_posts if post.author_id == test_user2['id'])
+    queue(session, outbox.LIKE, test_user['id'], test_user2['id'], post.id)
+
+    async def scenario():
+        async with TestingAsyncSessionLocal() as first, TestingAsyncSessionLocal() as second:
+            # Another worker holds the recipient while delivering
+            await outbox.lock_recipients(first, [test_user2['id']])
+            drain = asyncio.create_task(outbox.drain_outbox(second))
+            await asyncio.sleep(0.3)
+            waited = not drain.done()
+            await first.commit()
+            return waited, await drain
+
+    assert asyncio.run(scenario()) == (True, 1)
+
+def test_failing_row_is_set_aside(session, test_user, test_user2, test_posts, monkeypatch):
+    monkeypatch.setattr(settings, "notification_outbox_max_attempts", 2)
+    mine = next(post for post in test_posts if post.author_id == test_user['id'])
+    theirs = next(post for post in test_posts if post.author_id == test_user2['id'])
+    queue(session, outbox.LIKE, test_user2['id'], test_user['id'], mine.id)
+    queue(session, outbox.LIKE, test_user['id'], test_user2['id'], theirs.id)
+
+    # Notifications for test_user cannot be rendered
+    render = outbox.render
+    async def failing_render(db, notifications):
+        notifications = list(notifications)
+        if any(notification.user_id == test_user['id'] for notification in notifications):
+            raise RuntimeError("cannot render")
+        return await render(db, notifications)
+    monkeypatch.setattr(outbox, "render", failing_render)
+
+    assert run_with_db(outbox.drain_outbox) == 2
+    assert [notification.message for notification in rendered_notifications(test_user2['id'])] == [f"{test_user['email']} liked your post"]
+    poison = session.query(models.NotificationOutbox).one()
+    assert (poison.recipient_id, poison.attempts) == (test_user['id'], 1)
+
+    assert run_with_db(outbox.drain_outbox) == 1
+    session.expire_all()
+    assert session.query(models.NotificationOutbox.attempts).scalar() == 2
+    # Out of attempts: the row stays in the outbox but no longer holds up the worker
+    assert run_with_db(outbox.drain_outbox) == 0
+    assert session.query(models.Notification).filter_by(user_id=test_user['id']).count() == 0
+
+def test_describe_actors():
+    assert outbox.describe_actors(["ada"], 1) == "ada"
+    assert outbox.describe_actors(["ada", "bob"], 2) == "ada and bob"
+    assert outbox.describe_actors(["ada", "bob", "cy"], 42) == "ada and 41 others"
+    assert outbox.describe_actors([], 1) == "Someone"
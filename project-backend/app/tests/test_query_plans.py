@@ -0,0 +1,147 @@
+import re
+import pytest
+from sqlalchemy import event, text
+from app import models
+from app.tests.conftest import async_engine, run_with_db
+
+# EXPLAIN harness for the hot paths.
+#
+# Every statement a request sends is captured and explained with sequential
+# scans disabled. The planner then picks any index that can serve the query, so
+# a "Seq Scan" left in the plan means no index fits it: the query would read the
+# whole table once it is large, however small the seeded tables are here.
+# Likewise, an index condition that skips the leading column of its index
+# (e.g. `tag_id = ...` on the `(post_id, tag_id)` primary key) means the whole
+# index is read.
+
+# Requests on the hot paths; the URLs are formatted with the `seeded` fixture
+HOT_PATHS = [
+    ("GET", "/posts/"),
+    ("GET", "/posts/?cursor={cursor}"),
+    ("GET", "/myposts/"),
+    ("GET", "/allposts/{email}/"),
+    ("GET", "/one-post/{post_id}/"),
+    ("GET", "/posts/by-slug/{slug}"),
+    ("GET", "/getpost/{tag}/"),
+    ("GET", "/posts/search/?q=title"),
+    ("GET", "/posts/{post_id}/comments"),
+    ("GET", "/posts/{post_id}/comments/{comment_id}/replies"),
+    ("POST", "/posts/{post_id}/comment"),
+    ("POST", "/posts/{post_id}/like"),
+    ("DELETE", "/posts/{liked_post_id}/unlike"),
+    ("GET", "/notifications"),
+    ("GET", "/notifications/unread-count"),
+    ("GET", "/getuser/{email}/"),
+]
+
+EXPLAINABLE = ("SELECT", "WITH", "UPDATE", "DELETE", "INSERT")
+
+# Tables whose foreign keys may stay unindexed: the outbox only ever holds the
+# rows written since the last drain
+UNINDEXED_FOREIGN_KEY_TABLES = {"notification_outbox"}
+
+
+@pytest.fixture
+def seeded(authorized_client, session, test_user, test_user2, test_posts):
+    post = test_posts[0]
+    tag = models.Tag(name="python")
+    post.tags.append(tag)
+    session.add_all(models.Notification(user_id=test_user['id'], post_id=post.id, message=f"notification {i}") for i in range(3))
+    session.commit()
+
+    authorized_client.post(f"/posts/{post.id}/comment", json={"content": "root"})
+    comment_id = authorized_client.get(f"/posts/{post.id}/comments").json()["items"][0]["id"]
+    authorized_client.post(f"/posts/{post.id}/comment", json={"content": "reply", "parent_id": comment_id})
+    authorized_client.post(f"/posts/{test_posts[1].id}/like")
+    cursor = authorized_client.get("/posts/", params={"limit": 1}).json()["next_cursor"]
+    return {
+        "post_id": post.id, "liked_post_id": test_posts[1].id, "slug": post.slug, "email": test_user2['email'],
+        "tag": tag.name, "comment_id": comment_id, "cursor": cursor,
+    }
+
+
+@pytest.fixture
+def statements():
+    captured = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(EXPLAINABLE):
+            captured.append((statement, parameters))
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+    yield captured
+    event.remove(async_engine.sync_engine, "before_cursor_execute", record)
+
+
+def plan_nodes(plan: dict):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+# Name and leading column of every index
+LEADING_COLUMNS = """
+    SELECT index_class.relname, attribute.attname
+    FROM pg_index
+    JOIN pg_class AS index_class ON index_class.oid = pg_index.indexrelid
+    JOIN pg_attribute AS attribute ON attribute.attrelid = pg_index.indrelid AND attribute.attnum = pg_index.indkey[0]
+"""
+
+
+def full_scans(plan: dict, leading_columns: dict):
+    """
+    Return a description of each node of a plan that reads a whole table or index.
+    """
+    found = []
+    for node in plan_nodes(plan):
+        if node["Node Type"] == "Seq Scan":
+            found.append(f"Seq Scan on {node['Relation Name']}")
+        elif "Index Cond" in node and node.get("Index Name") in leading_columns:
+            # Qualified names belong to the other side of a join condition
+            condition = re.sub(r"\w+\.\w+", "", node["Index Cond"])
+            if not re.search(rf"\b{leading_columns[node['Index Name']]}\b", condition):
+                found.append(f"{node['Node Type']} on {node['Index Name']} without its leading column: {node['Index Cond']}")
+    return found
+
+
+def scanned_in_full(captured):
+    """
+    Explain each captured statement and return those whose plan still reads a whole table or index.
+    """
+    async def explain(db):
+        found = []
+        await db.execute(text("SET LOCAL enable_seqscan = off"))
+        connection = await db.connection()
+        leading_columns = dict((await connection.exec_driver_sql(LEADING_COLUMNS)).all())
+        for statement, parameters in captured:
+            plan = (await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)).scalar()
+            scans = full_scans(plan[0]["Plan"], leading_columns)
+            if scans:
+                found.append((scans, " ".join(statement.split())))
+        await db.rollback()
+        return found
+    return run_with_db(explain)
+
+
+@pytest.mark.parametrize("method, url", HOT_PATHS)
+def test_hot_path_uses_indexes(authorized_client, seeded, statements, method, url):
+    json = {"content": "planned"} if method == "POST" else None
+    response = authorized_client.request(method, url.format(**seeded), json=json)
+    assert response.status_code == 200
+
+    assert statements
+    assert scanned_in_full(statements) == []
+
+
+def test_foreign_keys_are_indexed(session):
+    # Deleting a user or a post looks up the referencing rows of every foreign key,
+    # outside of any plan EXPLAIN shows
+    foreign_keys = session.execute(text("SELECT conrelid::regclass::text, conname, conkey FROM pg_constraint WHERE contype = 'f'")).all()
+    indexes = session.execute(text("SELECT indrelid::regclass::text, indkey::int2[] FROM pg_index")).all()
+
+    unindexed = [
+        name for table, name, columns in foreign_keys
+        if table not in UNINDEXED_FOREIGN_KEY_TABLES
+        and not any(indexed_table == table and set(key[:len(columns)]) == set(columns) for indexed_table, key in indexes)
+    ]
+    assert unindexed == []
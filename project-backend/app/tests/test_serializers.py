@@ -0,0 +1,58 @@
+import orjson
+import pytest
+from datetime import datetime
+from app import models, schemas, serializers
+
+
+def sample_post():
+    author = models.User(id=1, email="author@gmail.com", password="x", profile_picture=None, bio="hi", is_active=True, is_admin=False)
+    reader = models.User(id=2, email="reader@gmail.com", password="x", profile_picture="me.png", bio=None, is_active=True, is_admin=True)
+    post = models.BlogPost(
+        id=7, title="A title", content="Some content", slug="a-title", published_at=datetime(2026, 10, 18, 12, 30, 1, 250),
+        is_published=True, author=author, category=None, like_count=3, comment_count=1, excerpt="Some content", word_count=2, reading_time_minutes=1,
+        tags=[models.Tag(id=1, name="python"), models.Tag(id=2, name="fastapi")],
+        comments=[models.Comment(id=5, content="Nice", created_at=datetime(2026, 10, 18, 13, 0), author=reader)],
+    )
+    return post
+
+def encode(document):
+    return orjson.loads(orjson.dumps(document))
+
+@pytest.mark.parametrize("category", [None, "tech"])
+def test_blog_post_response_matches_schema(category):
+    post = sample_post()
+    post.category = None if category is None else models.Category(id=1, name=category)
+    expected = schemas.BlogPostResponse.model_validate(post, from_attributes=True).model_dump(mode="json")
+
+    assert expected["category"] == category
+    assert encode(serializers.blog_post_response(post)) == expected
+    assert list(serializers.blog_post_response(post)) == list(expected)
+    assert orjson.dumps(serializers.blog_post_response(post)) == schemas.BlogPostResponse.model_validate(post, from_attributes=True).model_dump_json().encode()
+
+def test_user_response_matches_schema():
+    user = sample_post().comments[0].author
+    expected = schemas.UserResponse.model_validate(user, from_attributes=True).model_dump(mode="json")
+
+    assert encode(serializers.user_response(user)) == expected
+    assert [column.key for column in serializers.USER_RESPONSE_COLUMNS] == list(expected)
+
+def test_comment_thread_response_matches_schema():
+    thread = sample_post().comments[0]
+    thread.path = "0000000005"
+    reply = models.Comment(id=6, content="Thanks", created_at=datetime(2026, 10, 18, 13, 5), author=thread.author, parent_id=5, path="0000000005.0000000006")
+    document = serializers.comment_thread_response(thread, [reply], "cursor")
+
+    assert encode(document) == schemas.CommentThread(**document).model_dump(mode="json")
+    assert list(document) == list(schemas.CommentThread.model_fields)
+    assert document["replies"][0]["depth"] == 1
+
+def test_fast_listings_keep_their_output(authorized_client, test_posts, test_user):
+    authorized_client.post(f"/posts/{test_posts[0].id}/comment", json={"content": "hi"})
+
+    posts = authorized_client.get("/posts/")
+    users = authorized_client.get("/getallusers/")
+    comments = authorized_client.get(f"/posts/{test_posts[0].id}/comments")
+
+    assert [schemas.BlogPostResponse(**post).id for post in posts.json()["items"]]
+    assert [schemas.UserResponse(**user).email for user in users.json()] == [test_user['email'], "test3@gmail.com"]
+    assert [schemas.CommentThread(**thread).content for thread in comments.json()["items"]] == ["hi"]
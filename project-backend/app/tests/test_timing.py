@@ -0,0 +1,71 @@
+import json
+import logging
+import time
+from app import serializers, timing
+from app.config import settings
+
+
+def server_timing(response):
+    metrics = {}
+    for entry in response.headers["server-timing"].split(", "):
+        name, *params = entry.split(";")
+        metrics[name] = dict(param.split("=", 1) for param in params)
+    return metrics
+
+def test_server_timing_header(authorized_client, test_posts, query_counter):
+    response = authorized_client.get(f"/posts/{test_posts[0].id}/comments")
+    assert response.status_code == 200
+
+    metrics = server_timing(response)
+    assert set(metrics) == {"total", "db", "deps", "handler", "serialize"}
+    assert metrics["db"]["desc"] == f'"{len(query_counter)} queries"'
+    assert float(metrics["deps"]["dur"]) + float(metrics["handler"]["dur"]) <= float(metrics["total"]["dur"])
+
+def test_listing_reports_its_serialization_time(authorized_client, test_posts, monkeypatch):
+    # The listing builds its ORJSONResponse in the handler, so FastAPI has nothing left to serialize
+    sparse_blog_post_response = serializers.sparse_blog_post_response
+    def slow_builder(fields):
+        build = sparse_blog_post_response(fields)
+        def slow_build(post):
+            time.sleep(0.01)
+            return build(post)
+        return slow_build
+    monkeypatch.setattr(serializers, "sparse_blog_post_response", slow_builder)
+    response = authorized_client.get("/posts/")
+    assert response.status_code == 200
+
+    metrics = server_timing(response)
+    assert float(metrics["serialize"]["dur"]) >= 10 * len(test_posts)
+    assert float(metrics["handler"]["dur"]) < 10 * len(test_posts)
+    assert float(metrics["deps"]["dur"]) > 0
+
+def test_request_is_logged(authorized_client, test_posts, caplog):
+    caplog.set_level(logging.INFO, logger=timing.__name__)
+    authorized_client.get(f"/one-post/{test_posts[0].id}/")
+
+    line = json.loads(caplog.records[-1].getMessage())
+    assert line["method"] == "GET"
+    assert line["path"] == "/one-post/{id}/"
+    assert line["status"] == 200
+    assert line["queries"] > 0
+    assert {"total_ms", "db_ms", "deps_ms", "handler_ms", "serialize_ms"} <= set(line)
+
+def test_slow_request_logs_its_slowest_statements(authorized_client, test_posts, caplog, monkeypatch):
+    monkeypatch.setattr(settings, "slow_request_ms", 0)
+    monkeypatch.setattr(settings, "slow_request_statements", 2)
+    caplog.set_level(logging.INFO, logger=timing.__name__)
+    authorized_client.get("/posts/")
+
+    warning, = [record for record in caplog.records if record.levelno == logging.WARNING]
+    report = json.loads(warning.getMessage().removeprefix("Slow request: "))
+    assert report["queries"] > 2
+    assert len(report["slowest_statements"]) == 2
+    assert report["slowest_statements"][0]["ms"] >= report["slowest_statements"][1]["ms"]
+    assert any("FROM posts" in statement["statement"] for statement in report["slowest_statements"])
+
+def test_server_timing_header_can_be_disabled(client, monkeypatch):
+    monkeypatch.setattr(settings, "server_timing_header", False)
+    response = client.get("/")
+
+    assert response.status_code == 200
+    assert "server-timing" not in response.headers
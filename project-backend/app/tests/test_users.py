@@ -1,4 +1,5 @@
 from app import schemas
+from app.oauth2 import create_access_token
 
 def test_home(client):
     response = client.get("/")
@@ -45,4 +46,46 @@ def test_change_password_with_wrong_old_password(authorized_client, test_user):
     }
     response = authorized_client.put("/change-password/", json=data)
     assert response.status_code == 400
-    assert response.json()['detail'] == "Old password does not match"
\ No newline at end of file
+    assert response.json()['detail'] == "Old password does not match"
+
+def test_delete_account_invalidates_cached_user(authorized_client, test_user):
+    assert authorized_client.get(f"/getuser/{test_user['email']}/").status_code == 200
+
+    response = authorized_client.delete("/delete-account/")
+    assert response.status_code == 200
+
+    assert authorized_client.get(f"/getuser/{test_user['email']}/").status_code == 401
+
+def test_delete_account_drops_cached_posts(authorized_client, test_user2, test_posts):
+    post = next(post for post in test_posts if post.author_id != test_user2['id'])
+    assert authorized_client.get(f"/one-post/{post.id}/").status_code == 200
+
+    assert authorized_client.delete("/delete-account/").status_code == 200
+
+    headers = {"Authorization": f"Bearer {create_access_token({'user_id': test_user2['id']})}"}
+    assert authorized_client.get(f"/one-post/{post.id}/", headers=headers).status_code == 404
+
+def test_delete_account_updates_counters_of_other_posts(authorized_client, session, test_user2, test_posts):
+    from reconcile_counters import reconcile_counters
+    post = next(post for post in test_posts if post.author_id == test_user2['id'])
+    headers = {"Authorization": f"Bearer {create_access_token({'user_id': test_user2['id']})}"}
+    authorized_client.post(f"/posts/{post.id}/like")
+    authorized_client.post(f"/posts/{post.id}/comment", json={"content": "first"})
+    comment, = authorized_client.get(f"/posts/{post.id}/comments").json()["items"]
+    authorized_client.post(f"/posts/{post.id}/comment", json={"content": "reply", "parent_id": comment["id"]}, headers=headers)
+    authorized_client.post(f"/posts/{post.id}/comment", json={"content": "second"}, headers=headers)
+    etag = authorized_client.get(f"/one-post/{post.id}/", headers=headers).headers["etag"]
+
+    assert authorized_client.delete("/delete-account/").status_code == 200
+
+    response = authorized_client.get(f"/one-post/{post.id}/", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert (response.json()["like_count"], response.json()["comment_count"]) == (0, 1)
+    assert reconcile_counters(session) == 0
+
+def test_update_profile_info_refreshes_cached_user(authorized_client, test_user):
+    authorized_client.put("/update/", json={"email": "renamed@gmail.com"})
+    response = authorized_client.put("/update/", json={"email": "renamed@gmail.com", "bio": "hello"})
+
+    assert response.status_code == 200
+    assert response.json()['bio'] == "hello"
@@ -0,0 +1,252 @@
+import asyncio
+import heapq
+import json
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Optional
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+# from config import settings [UVICORN]
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RequestTimings:
+    """
+    Timings collected while one request is served.
+
+    `route_start`/`route_end` bracket the FastAPI route (dependencies, endpoint
+    and response rendering) and `handler_start`/`handler_end` the endpoint
+    itself, so the dependencies (authentication, session) take
+    `handler_start - route_start` and turning the endpoint's return value into
+    the response body takes `route_end - handler_end`. Endpoints that build
+    their response themselves report that time in `serialize_time` (see
+    `serializing`), which counts as serialization rather than handler time.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.route_start = self.route_end = None
+        self.handler_start = self.handler_end = None
+        self.serialize_time = 0.0
+        self._slowest = []
+
+    def record_query(self, statement: str, elapsed: float):
+        self.queries += 1
+        self.db_time += elapsed
+        # Keep the slowest statements only (the counter breaks ties between equal durations)
+        entry = (elapsed, self.queries, statement)
+        if len(self._slowest) < settings.slow_request_statements:
+            heapq.heappush(self._slowest, entry)
+        elif self._slowest and elapsed > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, entry)
+
+    def slowest_statements(self):
+        """
+        Return the slowest statements of the request, slowest first.
+
+        Returns:
+            list: Dicts with the statement duration in milliseconds and its SQL on one line.
+        """
+        return [
+            {"ms": round(elapsed * 1000, 3), "statement": " ".join(statement.split())}
+            for elapsed, _, statement in sorted(self._slowest, reverse=True)
+        ]
+
+    def metrics(self):
+        """
+        Return the measured durations in milliseconds.
+
+        Returns:
+            dict: Total, DB, dependency, handler and serialization times (the latter three only when an endpoint ran).
+        """
+        metrics = {"total": time.perf_counter() - self.started, "db": self.db_time}
+        if self.handler_start is not None and self.route_start is not None:
+            metrics["deps"] = self.handler_start - self.route_start
+        if self.handler_end is not None:
+            metrics["handler"] = self.handler_end - self.handler_start - self.serialize_time
+            metrics["serialize"] = self.serialize_time
+            if self.route_end is not None:
+                metrics["serialize"] += self.route_end - self.handler_end
+        return {name: round(value * 1000, 3) for name, value in metrics.items()}
+
+
+# Timings of the request being served, if any
+current: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+@contextmanager
+def serializing():
+    """
+    Count the time spent in the block as serialization time of the current request.
+
+    For endpoints that build their response body themselves (e.g. with the
+    `serializers` fast path), which FastAPI then passes through untouched.
+    """
+    timings = current.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings.serialize_time += time.perf_counter() - started
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current.get() is not None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    timings = current.get()
+    if timings is not None and conn.info.get("query_start"):
+        timings.record_query(statement, time.perf_counter() - conn.info["query_start"].pop())
+
+
+def instrument(engine):
+    """
+    Count and time the statements an engine executes on behalf of a request.
+
+    Args:
+        engine (Engine): The (sync) engine to observe; pass `async_engine.sync_engine` for an async engine.
+    """
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _timed(call):
+    # The timings object is shared with the request's context, so the sync
+    # wrapper can fill it in from the threadpool as well
+    if asyncio.iscoroutinefunction(call):
+        @wraps(call)
+        async def endpoint(*args, **kwargs):
+            timings = current.get()
+            if timings is not None:
+                timings.handler_start = time.perf_counter()
+            try:
+                return await call(*args, **kwargs)
+            finally:
+                if timings is not None:
+                    timings.handler_end = time.perf_counter()
+    else:
+        @wraps(call)
+        def endpoint(*args, **kwargs):
+            timings = current.get()
+            if timings is not None:
+                timings.handler_start = time.perf_counter()
+            try:
+                return call(*args, **kwargs)
+            finally:
+                if timings is not None:
+                    timings.handler_end = time.perf_counter()
+    return endpoint
+
+
+class TimedRoute(APIRoute):
+    """
+    API route that records when its endpoint runs and when its response is ready.
+
+    Used as the `route_class` of the routers, so that the timing middleware can
+    tell the endpoint's own time from the time spent serializing its result.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # The request handler calls `dependant.call` at request time, so it can be wrapped here
+        self.dependant.call = _timed(self.dependant.call)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def route_handler(request):
+            timings = current.get()
+            if timings is not None:
+                timings.route_start = time.perf_counter()
+            response = await handler(request)
+            if timings is not None:
+                timings.route_end = time.perf_counter()
+            return response
+
+        return route_handler
+
+
+def server_timing(metrics: dict, queries: int):
+    """
+    Format the metrics of a request as a `Server-Timing` header value.
+
+    Args:
+        metrics (dict): Durations in milliseconds, as returned by `RequestTimings.metrics`.
+        queries (int): Number of SQL statements executed.
+
+    Returns:
+        str: e.g. `total;dur=7.9, db;dur=3.2;desc="4 queries", deps;dur=0.9, handler;dur=4.2, serialize;dur=0.4`.
+    """
+    entries = []
+    for name, duration in metrics.items():
+        entry = f"{name};dur={duration}"
+        if name == "db":
+            entry += f';desc="{queries} queries"'
+        entries.append(entry)
+    return ", ".join(entries)
+
+
+class TimingMiddleware:
+    """
+    ASGI middleware reporting where the time of each HTTP request went.
+
+    The metrics are taken when the response starts (so a streamed response is
+    measured up to its first byte), added as a `Server-Timing` header (unless
+    `server_timing_header` is disabled) and logged as one JSON line. Requests
+    slower than `slow_request_ms` are also logged as warnings with their
+    slowest statements.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = current.set(timings)
+
+        async def send_with_timings(message):
+            if message["type"] == "http.response.start":
+                metrics = timings.metrics()
+                if settings.server_timing_header:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", server_timing(metrics, timings.queries).encode("latin-1")))
+                    message = {**message, "headers": headers}
+                report(scope, message["status"], metrics, timings)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timings)
+        finally:
+            current.reset(token)
+
+
+def report(scope, status: int, metrics: dict, timings: RequestTimings):
+    """
+    Log the timings of a request, and its slowest statements if it exceeded `slow_request_ms`.
+    """
+    # Log the route template rather than the URL, so that requests group per endpoint
+    route = scope.get("route")
+    line = {
+        "method": scope["method"],
+        "path": getattr(route, "path", scope["path"]),
+        "status": status,
+        "queries": timings.queries,
+        **{f"{name}_ms": duration for name, duration in metrics.items()},
+    }
+    logger.info(json.dumps(line))
+    if metrics["total"] >= settings.slow_request_ms:
+        logger.warning("Slow request: %s", json.dumps({**line, "slowest_statements": timings.slowest_statements()}))
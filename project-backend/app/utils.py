@@ -1,8 +1,23 @@
+import asyncio
+import math
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
 from passlib.context import CryptContext
 from passlib.exc import UnknownHashError
+# from config import settings [UVICORN]
+from app.config import settings
 
-# Initialize CryptContext for handling password hashing and verification
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Initialize CryptContext for handling password hashing and verification.
+# Hashes made with a different bcrypt cost are reported by `needs_update`.
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.bcrypt_rounds)
+
+# Post previews: excerpt length in characters and the reading speed used for reading times
+EXCERPT_LENGTH = 280
+WORDS_PER_MINUTE = 200
+
+# Worker processes running bcrypt off the event loop (created on first use)
+_hash_pool: Optional[ProcessPoolExecutor] = None
 
 def get_password_hash(password: str):
     """
@@ -33,4 +48,107 @@ def verify_password(plain_password, hashed_password):
     try:
         return pwd_context.verify(plain_password, hashed_password)
     except UnknownHashError as e:
-        print(e)
\ No newline at end of file
+        print(e)
+
+def verify_and_update_password(plain_password, hashed_password):
+    """
+    Verify a password and, if the stored hash uses an outdated bcrypt cost, rehash it.
+
+    Args:
+        plain_password (str): The plaintext password to verify.
+        hashed_password (str): The hashed password to compare against.
+
+    Returns:
+        tuple: (True if the password matches, the new hash to store or None).
+    """
+    try:
+        return pwd_context.verify_and_update(plain_password, hashed_password)
+    except UnknownHashError as e:
+        print(e)
+        return False, None
+
+def hash_pool():
+    """
+    Return the process pool used for bcrypt, creating it on first use.
+
+    bcrypt is CPU bound; running it in separate processes lets logins scale with
+    cores instead of competing for the GIL with request handling. Workers are
+    spawned (not forked) so they never inherit the event loop or open connections.
+
+    Returns:
+        ProcessPoolExecutor: The pool, bounded by `settings.password_hash_workers`.
+    """
+    global _hash_pool
+    if _hash_pool is None:
+        _hash_pool = ProcessPoolExecutor(max_workers=settings.password_hash_workers, mp_context=multiprocessing.get_context("spawn"))
+    return _hash_pool
+
+def shutdown_hash_pool():
+    """
+    Stop the bcrypt worker processes, if they were started.
+    """
+    global _hash_pool
+    if _hash_pool is not None:
+        _hash_pool.shutdown(wait=True, cancel_futures=True)
+        _hash_pool = None
+
+async def hash_password_async(password: str):
+    """
+    Hash a password in the bcrypt process pool.
+
+    Args:
+        password (str): The plaintext password to hash.
+
+    Returns:
+        str: The hashed password.
+    """
+    return await asyncio.get_running_loop().run_in_executor(hash_pool(), get_password_hash, password)
+
+async def verify_password_async(plain_password, hashed_password):
+    """
+    Verify a password in the bcrypt process pool.
+
+    Args:
+        plain_password (str): The plaintext password to verify.
+        hashed_password (str): The hashed password to compare against.
+
+    Returns:
+        bool: True if the plaintext password matches the hashed password, otherwise False.
+    """
+    return await asyncio.get_running_loop().run_in_executor(hash_pool(), verify_password, plain_password, hashed_password)
+
+async def verify_and_update_password_async(plain_password, hashed_password):
+    """
+    Verify a password in the bcrypt process pool, rehashing it if its cost is outdated.
+
+    Args:
+        plain_password (str): The plaintext password to verify.
+        hashed_password (str): The hashed password to compare against.
+
+    Returns:
+        tuple: (True if the password matches, the new hash to store or None).
+    """
+    return await asyncio.get_running_loop().run_in_executor(hash_pool(), verify_and_update_password, plain_password, hashed_password)
+
+
+def summarize_content(content: str):
+    """
+    Compute the preview columns of a post from its content.
+
+    Args:
+        content (str): The content of the post.
+
+    Returns:
+        dict: `excerpt` (at most EXCERPT_LENGTH characters, cut on a word boundary),
+        `word_count` and `reading_time_minutes` (at least 1 for a non-empty post).
+    """
+    words = content.split()
+    excerpt = " ".join(words)
+    if len(excerpt) > EXCERPT_LENGTH:
+        cut = excerpt.rfind(" ", 0, EXCERPT_LENGTH)
+        excerpt = excerpt[:cut if cut > 0 else EXCERPT_LENGTH - 1].rstrip() + "…"
+    return {
+        "excerpt": excerpt,
+        "word_count": len(words),
+        "reading_time_minutes": math.ceil(len(words) / WORDS_PER_MINUTE),
+    }
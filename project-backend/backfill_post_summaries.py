@@ -0,0 +1,45 @@
+import argparse
+from sqlalchemy import select, update
+from create_tables import SessionLocal
+from app import models, utils
+
+# Posts summarized per transaction: keeps row locks short on a live database
+DEFAULT_BATCH_SIZE = 500
+
+def backfill_post_summaries(db, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Compute the excerpt, word count and reading time of posts created before those columns existed.
+
+    Posts without an excerpt are processed in id order, one batch per transaction,
+    and written back with a single bulk UPDATE by primary key.
+
+    Args:
+        db (Session): The database session.
+        batch_size (int): The number of posts summarized per transaction.
+
+    Returns:
+        int: The number of posts backfilled.
+    """
+    backfilled = 0
+    last_id = 0
+    while True:
+        stmt = (
+            select(models.BlogPost.id, models.BlogPost.content)
+            .where(models.BlogPost.id > last_id, models.BlogPost.excerpt.is_(None))
+            .order_by(models.BlogPost.id)
+            .limit(batch_size)
+        )
+        rows = db.execute(stmt).all()
+        if not rows:
+            return backfilled
+        db.execute(update(models.BlogPost), [{"id": row.id, **utils.summarize_content(row.content)} for row in rows])
+        db.commit()
+        backfilled += len(rows)
+        last_id = rows[-1].id
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute the excerpt, word count and reading time of existing posts.")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+    with SessionLocal() as db:
+        print(f"Backfilled {backfill_post_summaries(db, args.batch_size)} posts")
@@ -0,0 +1,203 @@
+"""
+Load-test the API and report latency percentiles and throughput per endpoint.
+
+Concurrent clients (asyncio tasks, each logged in as its own seeded user and
+sending one request at a time) draw requests from a weighted mix of the main
+endpoints for a fixed duration. Latencies are measured client-side, from
+sending the request to reading the whole response.
+
+By default the app runs in-process through httpx's ASGI transport, lifespan
+included, so no server is needed. To compare releases, run each one under the
+same server setup (e.g. `uvicorn app.main:app --workers 4`) against the same
+seeded database and pass `--base-url`. Seed the database with benchmarks.seed
+first: the clients log in with its users and password.
+
+Usage (from project-backend/):
+    python -m benchmarks.load --clients 20 --duration 30 --mix list_posts=50,get_post=50 --output results.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import platform
+import random
+import statistics
+import subprocess
+import time
+from collections import defaultdict
+from datetime import datetime
+import httpx
+from sqlalchemy import func, select
+from create_tables import SessionLocal
+from app import models
+from benchmarks.seed import SEED_PASSWORD, user_email
+
+# Default request mix: endpoint -> relative weight
+MIX = {
+    "list_posts": 30,
+    "get_post": 25,
+    "list_comments": 10,
+    "comment": 5,
+    "like": 8,
+    "unlike": 7,
+    "notifications": 10,
+    "login": 5,
+}
+
+
+def build_request(name: str, rng: random.Random, user_id: int, post_ids: tuple):
+    """
+    Return the method, URL template (the per-endpoint label), URL and keyword arguments of a request of the mix.
+    """
+    post_id = rng.randint(*post_ids)
+    if name == "list_posts":
+        return "GET", "/posts/", "/posts/", {}
+    if name == "get_post":
+        return "GET", "/one-post/{id}/", f"/one-post/{post_id}/", {}
+    if name == "list_comments":
+        return "GET", "/posts/{id}/comments", f"/posts/{post_id}/comments", {}
+    if name == "comment":
+        return "POST", "/posts/{id}/comment", f"/posts/{post_id}/comment", {"json": {"content": "Benchmark comment"}}
+    if name == "like":
+        return "POST", "/posts/{id}/like", f"/posts/{post_id}/like", {}
+    if name == "unlike":
+        return "DELETE", "/posts/{id}/unlike", f"/posts/{post_id}/unlike", {}
+    if name == "notifications":
+        return "GET", "/notifications", "/notifications", {}
+    if name == "login":
+        return "POST", "/login/", "/login/", {"data": {"username": user_email(user_id), "password": SEED_PASSWORD}}
+    raise ValueError(f"Unknown endpoint in mix: {name}")
+
+
+def parse_mix(value: str):
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        if name.strip() not in MIX:
+            raise argparse.ArgumentTypeError(f"Unknown endpoint {name!r}; choose from {', '.join(MIX)}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def percentile(ordered: list, fraction: float):
+    # Nearest-rank percentile of an ascending list
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def summarize(latencies: list, errors: int, duration: float):
+    ordered = sorted(latencies)
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "requests_per_second": round(len(ordered) / duration, 2),
+        "mean_ms": round(statistics.fmean(ordered), 2) if ordered else None,
+        "p50_ms": round(percentile(ordered, 0.50), 2) if ordered else None,
+        "p95_ms": round(percentile(ordered, 0.95), 2) if ordered else None,
+        "p99_ms": round(percentile(ordered, 0.99), 2) if ordered else None,
+        "max_ms": round(ordered[-1], 2) if ordered else None,
+    }
+
+
+def load_targets(clients: int):
+    """
+    Read the IDs of the users the clients log in as and the range of post IDs from the seeded database.
+    """
+    with SessionLocal() as db:
+        user_ids = db.scalars(select(models.User.id).order_by(models.User.id).limit(clients)).all()
+        post_ids = db.execute(select(func.min(models.BlogPost.id), func.max(models.BlogPost.id))).one()
+    if not user_ids or post_ids[0] is None:
+        raise SystemExit("The database holds no users or posts: run `python -m benchmarks.seed` first")
+    return user_ids, tuple(post_ids)
+
+
+async def login(http: httpx.AsyncClient, user_id: int):
+    response = await http.post("/login/", data={"username": user_email(user_id), "password": SEED_PASSWORD})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def client_loop(http, rng, user_id, headers, post_ids, mix, started, warmup, deadline, latencies, errors):
+    names, weights = list(mix), list(mix.values())
+    while time.perf_counter() < deadline:
+        name = rng.choices(names, weights)[0]
+        method, label, url, kwargs = build_request(name, rng, user_id, post_ids)
+        kwargs["headers"] = {**headers, **kwargs.get("headers", {})}
+        sent = time.perf_counter()
+        try:
+            response = await http.request(method, url, **kwargs)
+            failed = response.status_code >= 400
+        except httpx.HTTPError:
+            failed = True
+        elapsed = (time.perf_counter() - sent) * 1000
+        if sent - started >= warmup:
+            key = f"{method} {label}"
+            latencies[key].append(elapsed)
+            errors[key] += failed
+
+
+async def run(clients: int, duration: float, warmup: float, mix: dict, seed: int, base_url: str = None):
+    """
+    Run the load test and return the report as a dict.
+    """
+    started_at = datetime.utcnow().isoformat(timespec="seconds")
+    user_ids, post_ids = load_targets(clients)
+    latencies, errors = defaultdict(list), defaultdict(int)
+
+    async def drive(http):
+        sessions = await asyncio.gather(*(login(http, user_ids[i % len(user_ids)]) for i in range(clients)))
+        started = time.perf_counter()
+        deadline = started + warmup + duration
+        await asyncio.gather(*(
+            client_loop(http, random.Random(seed + i), user_ids[i % len(user_ids)], sessions[i], post_ids, mix, started, warmup, deadline, latencies, errors)
+            for i in range(clients)
+        ))
+
+    limits = httpx.Limits(max_connections=clients)
+    if base_url:
+        async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as http:
+            await drive(http)
+    else:
+        from app.main import app
+        async with app.router.lifespan_context(app):
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark", timeout=60) as http:
+                await drive(http)
+
+    endpoints = {key: summarize(latencies[key], errors[key], duration) for key in sorted(latencies)}
+    return {
+        "benchmark": "load",
+        "started_at": started_at,
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "target": base_url or "in-process",
+        "clients": clients,
+        "duration_seconds": duration,
+        "warmup_seconds": warmup,
+        "seed": seed,
+        "mix": mix,
+        "total": summarize([latency for key in latencies for latency in latencies[key]], sum(errors.values()), duration),
+        "endpoints": endpoints,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the API and report per-endpoint latency percentiles and throughput as JSON.")
+    parser.add_argument("--clients", type=int, default=10, help="Number of concurrent clients.")
+    parser.add_argument("--duration", type=float, default=30, help="Measured seconds.")
+    parser.add_argument("--warmup", type=float, default=5, help="Seconds of load before measuring.")
+    parser.add_argument("--mix", type=parse_mix, default=MIX, help=f"Comma-separated endpoint=weight pairs among: {', '.join(MIX)}.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--base-url", help="URL of a running server; the app runs in-process when omitted.")
+    parser.add_argument("--output", help="Also write the report to this file.")
+    args = parser.parse_args()
+    report = asyncio.run(run(args.clients, args.duration, args.warmup, args.mix, args.seed, args.base_url))
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
@@ -0,0 +1,147 @@
+"""
+Seed the configured database with synthetic users, posts, tags, comments and likes.
+
+Every row is derived from `--seed` (timestamps are relative to the time of
+seeding), so two runs with the same arguments produce the same data set and
+load-test results can be compared across releases. All
+users share the password SEED_PASSWORD (hashed once). The denormalized like and
+comment counters are filled in consistently with the generated rows.
+
+Rows go through regular INSERTs; for production-scale volumes, use
+generate_data.py, which streams them with COPY. Point the app at a dedicated
+database (e.g. DATABASE_NAME=blog_bench), then, from project-backend/:
+    python -m benchmarks.seed --reset --users 1000 --posts 10000 --comments 50000 --likes 100000
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import insert, text
+from create_tables import SessionLocal, create_tables, drop_tables
+from app import models, utils
+
+SEED_PASSWORD = "benchmark-password"
+
+# Rows per INSERT statement
+CHUNK_SIZE = 5000
+
+# Share of the comments that reply to an earlier comment of the same post
+REPLY_RATIO = 0.3
+
+# Tables whose IDs are generated here: their sequences are moved past the seeded rows
+SEQUENCES = ("users", "tags", "posts", "comments", "likes", "notifications")
+
+
+def user_email(user_id: int):
+    return f"user{user_id}@bench.example.com"
+
+
+def insert_rows(db, table, rows):
+    for start in range(0, len(rows), CHUNK_SIZE):
+        db.execute(insert(table), rows[start:start + CHUNK_SIZE])
+
+
+def seed(db, users: int, posts: int, tags: int, comments: int, likes: int, notifications: int, seed: int = 0):
+    """
+    Insert a synthetic data set into empty tables.
+
+    Args:
+        db (Session): The database session.
+        users (int): Number of users.
+        posts (int): Number of posts, spread over random authors.
+        tags (int): Number of tags; each post gets up to three.
+        comments (int): Number of comments, some of them replies.
+        likes (int): Number of likes (at most one per user and post).
+        notifications (int): Number of notifications, spread over the post authors.
+        seed (int): Seed of the random generator.
+
+    Returns:
+        dict: The number of rows inserted per table.
+    """
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    password = utils.get_password_hash(SEED_PASSWORD)
+
+    insert_rows(db, models.User, [{"id": i, "email": user_email(i), "password": password, "bio": f"Bio of user {i}"} for i in range(1, users + 1)])
+    insert_rows(db, models.Tag, [{"id": i, "name": f"tag-{i}"} for i in range(1, tags + 1)])
+
+    authors = {}
+    post_rows, post_tags = [], []
+    for i in range(1, posts + 1):
+        authors[i] = rng.randint(1, users)
+        content = " ".join(rng.choice(("lorem", "ipsum", "dolor", "sit", "amet", "consectetur", "adipiscing", "elit")) for _ in range(rng.randint(50, 1500)))
+        post_rows.append({
+            "id": i, "title": f"Post {i}", "content": content, "slug": f"post-{i}", "author_id": authors[i],
+            "published_at": now - timedelta(minutes=posts - i), "is_published": True, "like_count": 0, "comment_count": 0,
+            **utils.summarize_content(content),
+        })
+        post_tags += [{"post_id": i, "tag_id": tag_id} for tag_id in rng.sample(range(1, tags + 1), min(tags, rng.randint(0, 3)))]
+
+    comment_rows, post_comments = [], {}
+    for i in range(1, comments + 1):
+        post_id = rng.randint(1, posts)
+        earlier = post_comments.setdefault(post_id, [])
+        parent = rng.choice(earlier) if earlier and rng.random() < REPLY_RATIO else None
+        segment = str(i).zfill(models.COMMENT_PATH_WIDTH)
+        row = {
+            "id": i, "content": f"Comment {i}", "author_id": rng.randint(1, users), "post_id": post_id,
+            "parent_id": parent and parent["id"], "path": f"{parent['path']}.{segment}" if parent else segment,
+            "created_at": now - timedelta(seconds=comments - i),
+        }
+        comment_rows.append(row)
+        earlier.append(row)
+        post_rows[post_id - 1]["comment_count"] += 1
+
+    liked = set()
+    while len(liked) < min(likes, users * posts):
+        liked.add((rng.randint(1, users), rng.randint(1, posts)))
+    for _, post_id in liked:
+        post_rows[post_id - 1]["like_count"] += 1
+    like_rows = [{"id": i, "user_id": user_id, "post_id": post_id} for i, (user_id, post_id) in enumerate(sorted(liked), start=1)]
+
+    # At most one unread notification per post and kind, as coalescing guarantees
+    notification_rows, unread = [], set()
+    for i in range(1, notifications + 1):
+        post_id = rng.randint(1, posts)
+        is_read = post_id in unread or rng.random() < 0.5
+        if not is_read:
+            unread.add(post_id)
+        notification_rows.append({
+            "id": i, "user_id": authors[post_id], "post_id": post_id, "kind": "like", "actor_count": 1,
+            "recent_actor_ids": [rng.randint(1, users)], "is_read": is_read, "timestamp": now - timedelta(seconds=i),
+        })
+
+    insert_rows(db, models.BlogPost, post_rows)
+    insert_rows(db, models.post_tag_association, post_tags)
+    insert_rows(db, models.Comment, comment_rows)
+    insert_rows(db, models.Like, like_rows)
+    insert_rows(db, models.Notification, notification_rows)
+    for table in SEQUENCES:
+        db.execute(text(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT coalesce(max(id), 0) + 1 FROM {table}), false)"))
+    db.execute(text("ANALYZE"))
+    db.commit()
+    return {
+        "users": users, "tags": tags, "posts": posts, "post_tags": len(post_tags), "comments": comments,
+        "likes": len(like_rows), "notifications": notifications,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed the configured database with a reproducible synthetic data set.")
+    parser.add_argument("--reset", action="store_true", help="Drop and recreate every table first.")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--posts", type=int, default=2000)
+    parser.add_argument("--tags", type=int, default=50)
+    parser.add_argument("--comments", type=int, default=10000)
+    parser.add_argument("--likes", type=int, default=20000)
+    parser.add_argument("--notifications", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    if args.reset:
+        drop_tables()
+        create_tables()
+    started = time.perf_counter()
+    with SessionLocal() as db:
+        counts = seed(db, args.users, args.posts, args.tags, args.comments, args.likes, args.notifications, args.seed)
+    print(json.dumps({"benchmark": "seed", "seed": args.seed, "rows": counts, "seconds": round(time.perf_counter() - started, 2)}, indent=2))
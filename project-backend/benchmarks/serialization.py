@@ -0,0 +1,89 @@
+"""
+Benchmark the serialization of a page of posts: response-schema path vs fast path.
+
+The schema path is what FastAPI does with a `response_model`: validate the ORM
+objects against the schema, dump them to JSON-compatible data and encode that
+with the stdlib json module. The fast path builds the documents directly
+(app/serializers.py) and encodes them with orjson. No database is needed: the
+posts are built in memory.
+
+Usage (from project-backend/):
+    python -m benchmarks.serialization --posts 100 --comments 10 --tags 3
+"""
+import argparse
+import json
+import statistics
+import time
+from datetime import datetime, timedelta
+import orjson
+from pydantic import TypeAdapter
+from app import models, schemas, serializers
+
+
+def build_posts(count: int, comments: int, tags: int):
+    users = [models.User(id=i, email=f"user{i}@example.com", password="x", bio="A short bio", is_active=True, is_admin=False) for i in range(1, 21)]
+    tag_objects = [models.Tag(id=i, name=f"tag-{i}") for i in range(1, tags + 1)]
+    now = datetime.utcnow()
+    posts = []
+    for i in range(count):
+        posts.append(models.BlogPost(
+            id=i + 1, title=f"Post number {i}", content="Lorem ipsum dolor sit amet. " * 40, slug=f"post-number-{i}",
+            published_at=now - timedelta(minutes=i), is_published=True, author=users[i % len(users)], category=None,
+            like_count=i, comment_count=comments, excerpt="Lorem ipsum dolor sit amet.", word_count=200, reading_time_minutes=1, tags=tag_objects,
+            comments=[
+                models.Comment(id=i * comments + j, content="A thoughtful comment. " * 5, created_at=now, author=users[j % len(users)])
+                for j in range(comments)
+            ],
+        ))
+    return posts
+
+
+def schema_path(posts, adapter):
+    page = adapter.validate_python({"items": posts, "next_cursor": None}, from_attributes=True)
+    return json.dumps(adapter.dump_python(page, mode="json"), ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def fast_path(posts):
+    return serializers.page_response({"items": posts, "next_cursor": None}, serializers.blog_post_response).body
+
+
+def measure(function, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return {"median_ms": round(statistics.median(timings), 3), "min_ms": round(min(timings), 3)}
+
+
+def run(posts: int, comments: int, tags: int, repeat: int):
+    """
+    Time both paths on the same page and return the results as a dict.
+    """
+    page = build_posts(posts, comments, tags)
+    adapter = TypeAdapter(schemas.BlogPostPage)
+    # Both paths must produce the same document
+    assert orjson.loads(schema_path(page, adapter)) == orjson.loads(fast_path(page))
+
+    schema = measure(lambda: schema_path(page, adapter), repeat)
+    fast = measure(lambda: fast_path(page), repeat)
+    return {
+        "benchmark": "serialization",
+        "posts": posts,
+        "comments_per_post": comments,
+        "tags_per_post": tags,
+        "repeat": repeat,
+        "schema_path": schema,
+        "fast_path": fast,
+        "speedup": round(schema["median_ms"] / fast["median_ms"], 2),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the schema and fast serialization paths of post listings.")
+    parser.add_argument("--posts", type=int, default=100)
+    parser.add_argument("--comments", type=int, default=10)
+    parser.add_argument("--tags", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    print(json.dumps(run(args.posts, args.comments, args.tags, args.repeat), indent=2))
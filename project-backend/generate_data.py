@@ -0,0 +1,298 @@
+import argparse
+import json
+import random
+import time
+from array import array
+from bisect import bisect
+from datetime import datetime, timedelta
+from itertools import accumulate
+from create_tables import engine, create_tables, drop_tables
+from app import models, utils
+from benchmarks.seed import SEED_PASSWORD, user_email
+
+# Words the synthetic post contents are made of
+WORDS = ("lorem", "ipsum", "dolor", "sit", "amet", "consectetur", "adipiscing", "elit", "sed", "do", "eiusmod", "tempor", "incididunt", "labore", "magna", "aliqua")
+
+# Share of the comments that reply to an earlier comment of the same post
+REPLY_RATIO = 0.3
+
+# Bytes handed to COPY per read
+COPY_BUFFER_SIZE = 1 << 20
+
+# Foreign keys of the loaded tables, with their definitions
+FOREIGN_KEYS = """
+    SELECT conrelid::regclass::text, conname, pg_get_constraintdef(oid)
+    FROM pg_constraint
+    WHERE contype = 'f' AND conrelid::regclass::text = ANY(%s)
+"""
+
+# Tables loaded, in foreign key order
+TABLES = (
+    models.User.__table__,
+    models.Tag.__table__,
+    models.BlogPost.__table__,
+    models.post_tag_association,
+    models.Comment.__table__,
+    models.Like.__table__,
+    models.Notification.__table__,
+)
+
+
+def copy_value(value):
+    """
+    Format a value for COPY's text format.
+    """
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (list, tuple)):
+        return "{" + ",".join(str(item) for item in value) + "}"
+    if isinstance(value, str):
+        return value.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+    return str(value)
+
+
+class CopyStream:
+    """
+    File-like object feeding rows to `COPY ... FROM STDIN` as they are generated, so no table is held in memory.
+    """
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.pending = b""
+        self.count = 0
+
+    def read(self, size: int = -1):
+        lines, length = [self.pending], len(self.pending)
+        for row in self.rows:
+            line = ("\t".join(copy_value(value) for value in row) + "\n").encode()
+            lines.append(line)
+            length += len(line)
+            self.count += 1
+            if 0 <= size <= length:
+                break
+        data = b"".join(lines)
+        if size < 0:
+            size = len(data)
+        self.pending = data[size:]
+        return data[:size]
+
+
+def skewed_sampler(rng: random.Random, count: int, skew: float):
+    """
+    Return a function drawing IDs from 1 to `count` with power-law (Zipf) popularity.
+
+    The k-th most popular ID is drawn with a weight of 1 / k ** skew (0 draws uniformly);
+    popularity ranks are shuffled over the IDs.
+
+    Args:
+        rng (random.Random): The random generator.
+        count (int): The number of IDs.
+        skew (float): The exponent of the power law.
+
+    Returns:
+        Callable[[], int]: Draws one ID.
+    """
+    if skew == 0:
+        return lambda: rng.randint(1, count)
+    cumulative = list(accumulate(1 / rank ** skew for rank in range(1, count + 1)))
+    total = cumulative[-1]
+    ids = list(range(1, count + 1))
+    rng.shuffle(ids)
+    return lambda: ids[min(bisect(cumulative, rng.random() * total), count - 1)]
+
+
+def spread(draw, total: int, count: int, cap: int = None):
+    """
+    Spread `total` items over IDs from 1 to `count` with `draw`, at most `cap` per ID.
+
+    Items drawn for a full ID are drawn again, so exactly `total` items are placed
+    (or `cap` per ID, if that is fewer).
+
+    Returns:
+        array: The number of items per ID (index 0 unused).
+    """
+    counts = array("i", bytes(4 * (count + 1)))
+    placed, total = 0, total if cap is None else min(total, cap * count)
+    while placed < total:
+        owner = draw()
+        if cap is None or counts[owner] < cap:
+            counts[owner] += 1
+            placed += 1
+    return counts
+
+
+class Generator:
+    """
+    Streams a consistent synthetic data set, table by table in foreign key order.
+
+    Per-post like and comment counts are drawn up front, so that posts are written
+    with their denormalized counters and likes and comments match them.
+    """
+
+    def __init__(self, users, posts, tags, comments, likes, notifications, author_skew, like_skew, comment_skew, words, seed):
+        self.users, self.posts, self.tags, self.comments, self.notifications = users, posts, tags, comments, notifications
+        self.words = words
+        self.rng = random.Random(seed)
+        self.now = datetime.utcnow()
+        draw_author = skewed_sampler(self.rng, users, author_skew)
+        self.authors = array("i", [0] + [draw_author() for _ in range(posts)])
+        self.draw_liked_post = skewed_sampler(self.rng, posts, like_skew)
+        # A user likes a post at most once
+        self.like_counts = spread(self.draw_liked_post, likes, posts, cap=users)
+        self.comment_counts = spread(skewed_sampler(self.rng, posts, comment_skew), comments, posts)
+        self.password = utils.get_password_hash(SEED_PASSWORD)
+
+    def user_rows(self):
+        for i in range(1, self.users + 1):
+            yield i, user_email(i), self.password, f"Bio of user {i}", True, False
+
+    def tag_rows(self):
+        for i in range(1, self.tags + 1):
+            yield i, f"tag-{i}"
+
+    def post_rows(self):
+        for i in range(1, self.posts + 1):
+            content = " ".join(self.rng.choices(WORDS, k=self.rng.randint(*self.words)))
+            summary = utils.summarize_content(content)
+            yield (
+                i, f"Post {i}", content, f"post-{i}", self.now - timedelta(minutes=self.posts - i), True, self.authors[i],
+                self.like_counts[i], self.comment_counts[i], summary["excerpt"], summary["word_count"], summary["reading_time_minutes"],
+            )
+
+    def post_tag_rows(self):
+        for i in range(1, self.posts + 1):
+            for tag_id in self.rng.sample(range(1, self.tags + 1), min(self.tags, self.rng.randint(0, 3))):
+                yield i, tag_id
+
+    def comment_rows(self):
+        comment_id = 0
+        for post_id in range(1, self.posts + 1):
+            thread = []
+            for _ in range(self.comment_counts[post_id]):
+                comment_id += 1
+                segment = str(comment_id).zfill(models.COMMENT_PATH_WIDTH)
+                parent = self.rng.choice(thread) if thread and self.rng.random() < REPLY_RATIO else None
+                path = f"{parent[1]}.{segment}" if parent else segment
+                thread.append((comment_id, path))
+                yield (
+                    comment_id, f"Comment {comment_id}", self.now - timedelta(seconds=self.comments - comment_id),
+                    self.rng.randint(1, self.users), post_id, parent and parent[0], path,
+                )
+
+    def like_rows(self):
+        like_id = 0
+        for post_id in range(1, self.posts + 1):
+            for user_id in self.rng.sample(range(1, self.users + 1), self.like_counts[post_id]):
+                like_id += 1
+                yield like_id, user_id, post_id
+
+    def notification_rows(self):
+        # At most one unread notification per post and kind, as coalescing guarantees
+        unread = bytearray(self.posts + 1)
+        for i in range(1, self.notifications + 1):
+            post_id = self.draw_liked_post()
+            is_read = bool(unread[post_id]) or self.rng.random() < 0.5
+            if not is_read:
+                unread[post_id] = 1
+            yield (
+                i, self.authors[post_id], post_id, is_read, self.now - timedelta(seconds=self.notifications - i),
+                "like", 1, [self.rng.randint(1, self.users)],
+            )
+
+    def streams(self):
+        """
+        Return (table, columns, rows) for each table, in foreign key order.
+        """
+        return (
+            ("users", ("id", "email", "password", "bio", "is_active", "is_admin"), self.user_rows()),
+            ("tags", ("id", "name"), self.tag_rows()),
+            ("posts", ("id", "title", "content", "slug", "published_at", "is_published", "author_id", "like_count", "comment_count", "excerpt", "word_count", "reading_time_minutes"), self.post_rows()),
+            ("post_tag", ("post_id", "tag_id"), self.post_tag_rows()),
+            ("comments", ("id", "content", "created_at", "author_id", "post_id", "parent_id", "path"), self.comment_rows()),
+            ("likes", ("id", "user_id", "post_id"), self.like_rows()),
+            ("notifications", ("id", "user_id", "post_id", "is_read", "timestamp", "kind", "actor_count", "recent_actor_ids"), self.notification_rows()),
+        )
+
+
+def load(generator: Generator, rebuild: bool = True, bind=engine):
+    """
+    COPY the generated tables into the (empty) tables of the configured database.
+
+    Secondary indexes and foreign keys are dropped first and recreated once the
+    data is in: building an index in one pass and validating a foreign key with
+    one join are much faster than maintaining them row by row. Recreating the
+    foreign keys checks every loaded row against them.
+
+    Args:
+        generator (Generator): The data to load.
+        rebuild (bool): Drop and recreate the secondary indexes and foreign keys around the load.
+        bind (Engine): The database to load (the configured one by default).
+
+    Returns:
+        dict: Rows and seconds per table, and the seconds spent recreating indexes and foreign keys.
+    """
+    indexes = [index for table in TABLES for index in table.indexes] if rebuild else []
+    foreign_keys = []
+    report = {}
+    with bind.begin() as connection:
+        if rebuild:
+            foreign_keys = connection.exec_driver_sql(FOREIGN_KEYS, ([table.name for table in TABLES],)).all()
+        for table, name, _ in foreign_keys:
+            connection.exec_driver_sql(f"ALTER TABLE {table} DROP CONSTRAINT {name}")
+        for index in indexes:
+            index.drop(connection, checkfirst=True)
+    raw = bind.raw_connection()
+    try:
+        cursor = raw.cursor()
+        for table, columns, rows in generator.streams():
+            started, stream = time.perf_counter(), CopyStream(rows)
+            cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", stream, size=COPY_BUFFER_SIZE)
+            raw.commit()
+            report[table] = {"rows": stream.count, "seconds": round(time.perf_counter() - started, 2)}
+        for table in ("users", "tags", "posts", "comments", "likes", "notifications"):
+            cursor.execute(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT coalesce(max(id), 0) + 1 FROM {table}), false)")
+        raw.commit()
+    finally:
+        raw.close()
+    started = time.perf_counter()
+    with bind.begin() as connection:
+        for index in indexes:
+            index.create(connection)
+        for table, name, definition in foreign_keys:
+            connection.exec_driver_sql(f"ALTER TABLE {table} ADD CONSTRAINT {name} {definition}")
+    report["constraints"] = {"indexes": len(indexes), "foreign_keys": len(foreign_keys), "seconds": round(time.perf_counter() - started, 2)}
+    with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.exec_driver_sql("ANALYZE")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk-load a large synthetic data set into the configured database with COPY.")
+    parser.add_argument("--reset", action="store_true", help="Drop and recreate every table first (the tables must be empty otherwise).")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--posts", type=int, default=100000)
+    parser.add_argument("--tags", type=int, default=500)
+    parser.add_argument("--comments", type=int, default=300000)
+    parser.add_argument("--likes", type=int, default=1000000)
+    parser.add_argument("--notifications", type=int, default=100000)
+    parser.add_argument("--author-skew", type=float, default=1.0, help="Power-law exponent of posts per author (0 for uniform).")
+    parser.add_argument("--like-skew", type=float, default=1.2, help="Power-law exponent of likes per post (0 for uniform).")
+    parser.add_argument("--comment-skew", type=float, default=1.0, help="Power-law exponent of comments per post (0 for uniform).")
+    parser.add_argument("--words", type=int, nargs=2, default=(30, 300), metavar=("MIN", "MAX"), help="Range of words per post (longer posts load slower: Postgres computes their search vector).")
+    parser.add_argument("--keep-constraints", action="store_true", help="Keep secondary indexes and foreign keys in place during the load (slower).")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    if args.reset:
+        drop_tables()
+        create_tables()
+    started = time.perf_counter()
+    generator = Generator(
+        args.users, args.posts, args.tags, args.comments, args.likes, args.notifications,
+        args.author_skew, args.like_skew, args.comment_skew, args.words, args.seed,
+    )
+    tables = load(generator, not args.keep_constraints)
+    print(json.dumps({"seed": args.seed, "tables": tables, "seconds": round(time.perf_counter() - started, 2)}, indent=2))
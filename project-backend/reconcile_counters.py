@@ -0,0 +1,48 @@
+import argparse
+from sqlalchemy import func, select, update
+from create_tables import SessionLocal
+from app import models
+
+# Posts recomputed per transaction: keeps row locks short on a live database
+DEFAULT_BATCH_SIZE = 1000
+
+def reconcile_counters(db, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Recompute `like_count` and `comment_count` of every post from the likes and comments tables.
+
+    Posts are processed in id order, one batch per transaction, and only rows whose
+    counters drifted are written.
+
+    Args:
+        db (Session): The database session.
+        batch_size (int): The number of posts recomputed per transaction.
+
+    Returns:
+        int: The number of posts whose counters were corrected.
+    """
+    likes = select(func.count()).where(models.Like.post_id == models.BlogPost.id).scalar_subquery()
+    comments = select(func.count()).where(models.Comment.post_id == models.BlogPost.id).scalar_subquery()
+
+    corrected = 0
+    last_id = 0
+    while True:
+        ids = db.scalars(select(models.BlogPost.id).where(models.BlogPost.id > last_id).order_by(models.BlogPost.id).limit(batch_size)).all()
+        if not ids:
+            return corrected
+        stmt = (
+            update(models.BlogPost)
+            .where(models.BlogPost.id.between(ids[0], ids[-1]))
+            .where((models.BlogPost.like_count != likes) | (models.BlogPost.comment_count != comments))
+            .values(like_count=likes, comment_count=comments)
+            .execution_options(synchronize_session=False)
+        )
+        corrected += db.execute(stmt).rowcount
+        db.commit()
+        last_id = ids[-1]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute the denormalized like and comment counters of posts.")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+    with SessionLocal() as db:
+        print(f"Corrected counters of {reconcile_counters(db, args.batch_size)} posts")